@@ -6,11 +6,51 @@ allowing you to create, read, update, and delete student records
 through a user-friendly web interface.
 """
 
+from functools import partial
+
+from django import forms
 from django.contrib import admin
 # admin module provides the admin site functionality
 
-from .models import Student
-# Import the Student model we defined in models.py
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.functional import cached_property
+
+from .models import Job, Student
+# Import the Student and Job models we defined in models.py
+
+from .export import export_response
+# Streaming CSV export (see export.py)
+
+from .counters import get_total
+# Pre-computed student counts (see counters.py)
+
+from .search import fts_enabled, search_students
+# Full-text search helpers (see search.py)
+
+from .write_queue import run_write
+# Student writes go through the writer queue (see write_queue.py)
+
+from . import jobs, profiling, rollover
+# Saved request profiles, listed under Students -> Profiles (see profiling.py)
+# Background jobs, queued and cancelled from the Job pages (see jobs.py)
+# Year-end rollover of ages and grades (see rollover.py)
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator that reads the maintained total instead of running COUNT(*)
+    when the changelist is not filtered or searched.
+    """
+    
+    @cached_property
+    def count(self):
+        # An empty WHERE clause means "all students"
+        if not self.object_list.query.where:
+            return get_total()
+        return super().count
 
 
 # The @admin.register decorator registers the StudentAdmin class with the admin site
@@ -54,6 +94,98 @@ class StudentAdmin(admin.ModelAdmin):
         'phone_number',          # Search by phone number
     ]
     
+    # actions adds entries to the "Action" dropdown above the list
+    actions = ['export_csv', 'rollover_students']
+    
+    @admin.action(description='Export selected students to CSV')
+    def export_csv(self, request, queryset):
+        """
+        Stream the selected students as a CSV download.
+        """
+        return export_response(queryset, 'csv')
+    
+    @admin.action(description='Roll over selected students (ages and grade transitions)')
+    def rollover_students(self, request, queryset):
+        """
+        Recompute the ages and apply STUDENT_GRADE_TRANSITIONS, with
+        set-based UPDATEs instead of saving students one by one.
+        """
+        result = rollover.rollover(queryset)
+        self.message_user(request, f"Rolled over {result['updated']} student(s).")
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Use the full-text index for the admin search box.
+        
+        Falls back to Django's default search_fields lookups when the
+        FTS5 index isn't available.
+        """
+        if not search_term.strip() or not fts_enabled():
+            return super().get_search_results(request, queryset, search_term)
+        # The second value tells Django whether results may contain duplicates
+        return search_students(queryset, search_term), False
+    
+    # The admin wraps each change in its own transaction, so run_write()
+    # saves directly there; routing through it keeps one path for all writes
+    def save_model(self, request, obj, form, change):
+        run_write(partial(super().save_model, request, obj, form, change))
+    
+    def delete_model(self, request, obj):
+        run_write(partial(super().delete_model, request, obj))
+    
+    def delete_queryset(self, request, queryset):
+        run_write(partial(super().delete_queryset, request, queryset))
+    
+    # get_urls adds pages under /admin/student_app/student/ next to the
+    # changelist: the saved request profiles and their files
+    def get_urls(self):
+        return [
+            path('profiles/', self.admin_site.admin_view(self.profiles_view),
+                 name='student_app_student_profiles'),
+            path('profiles/<str:profile_id>/', self.admin_site.admin_view(self.profile_view),
+                 name='student_app_student_profile'),
+            path('profiles/<str:profile_id>/download/<str:kind>/', self.admin_site.admin_view(self.profile_download),
+                 name='student_app_student_profile_download'),
+        ] + super().get_urls()
+    
+    def profiles_view(self, request):
+        """
+        List the recent request profiles, newest first.
+        """
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Request profiles',
+            'profiles': profiling.list_profiles(),
+        }
+        return TemplateResponse(request, 'admin/student_app/student/profiles.html', context)
+    
+    def profile_view(self, request, profile_id):
+        """
+        One profile: its queries with their plans and the slowest functions.
+        """
+        record = profiling.load_profile(profile_id)
+        if record is None:
+            raise Http404('No such profile.')
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Profile of {record['method']} {record['path']}",
+            'profile': record,
+            'slowest_queries': sorted(record['queries'], key=lambda query: query['ms'], reverse=True),
+            'functions': profiling.top_functions(profile_id),
+        }
+        return TemplateResponse(request, 'admin/student_app/student/profile.html', context)
+    
+    def profile_download(self, request, profile_id, kind):
+        """
+        Download the .prof (pstats) or .collapsed (flame graph) file.
+        """
+        file_path = profiling.profile_file(profile_id, f'.{kind}')
+        if file_path is None or kind == 'json':
+            raise Http404('No such profile file.')
+        return FileResponse(file_path.open('rb'), as_attachment=True, filename=file_path.name)
+    
     # fieldsets organizes fields in the student form/detail view
     # Groups related fields together for better organization
     fieldsets = (
@@ -105,6 +237,13 @@ class StudentAdmin(admin.ModelAdmin):
     # '-date_of_registration' means sort by registration date, newest first
     ordering = ['-date_of_registration']
     
+    # Use the counter-backed paginator for the changelist
+    paginator = CountedPaginator
+    
+    # show_full_result_count=False stops the admin running a second
+    # COUNT(*) over the whole table when a filter is applied
+    show_full_result_count = False
+    
     # list_per_page sets how many records to show per page
     # Helps with performance for large datasets
     list_per_page = 20
@@ -112,3 +251,50 @@ class StudentAdmin(admin.ModelAdmin):
     # date_hierarchy adds date-based navigation above the list
     # Allows drilling down by registration date
     date_hierarchy = 'date_of_registration'
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    JobAdmin lists the background jobs with their progress.
+    
+    Reload a job's page to follow its progress. New jobs can be queued from
+    "Add job"; everything else is filled in by the worker.
+    """
+    
+    list_display = ['id', 'kind', 'status', 'progress', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    actions = ['cancel_jobs']
+    
+    readonly_fields = [
+        'status', 'progress', 'message', 'attempts', 'cancel_requested', 'result', 'error',
+        'created_at', 'run_after', 'started_at', 'finished_at', 'worker', 'heartbeat_at',
+    ]
+    
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        if obj.percent is not None:
+            return f'{obj.percent}% ({obj.progress_done} of {obj.progress_total})'
+        return f'{obj.progress_done}' if obj.progress_done else '-'
+    
+    @admin.action(description='Cancel selected jobs')
+    def cancel_jobs(self, request, queryset):
+        cancelled = sum(jobs.cancel(pk) for pk in queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Cancelled {cancelled} job(s).')
+    
+    def get_fields(self, request, obj=None):
+        # Adding: what to run. Viewing: what happened as well
+        if obj is None:
+            return ['kind', 'params', 'max_attempts']
+        return ['kind', 'params', 'max_attempts', *self.readonly_fields]
+    
+    def get_readonly_fields(self, request, obj=None):
+        if obj is None:
+            return []
+        return ['kind', 'params', 'max_attempts', *self.readonly_fields]
+    
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        # Offer the registered job kinds instead of a free text box
+        if db_field.name == 'kind':
+            return forms.ChoiceField(choices=[(kind, kind) for kind in sorted(jobs.REGISTRY)])
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
@@ -0,0 +1,390 @@
+"""
+JSON API for students.
+
+Endpoints (see urls.py):
+
+    GET    /api/students/          one page of students
+    POST   /api/students/          create a batch:  [{...}, {...}]
+    PATCH  /api/students/          update a batch:  [{"id": 1, ...}, ...]
+    DELETE /api/students/          delete a batch:  [1, 2, ...] or [{"id": 1}, ...]
+    GET    /api/students/<id>/     one student
+
+Reading:
+
+- ?fields=id,first_name,email returns only those fields, and only those
+  columns are read: rows come from values() as dicts, so no Student
+  objects are created;
+- pages are keyset paginated in list order (see pagination.py); ?limit=
+  sets the page size (up to MAX_LIMIT) and the "next"/"previous" links
+  carry the ?cursor= for the neighbouring pages;
+- ?search= is the same search as the student list page.
+
+Writing: a batch holds up to STUDENT_API_MAX_BATCH records. Every record is
+validated with the StudentForm rules first; uniqueness of email and
+roll_number is checked with one query for the whole batch (and between the
+records of the batch). If any record is invalid nothing is written and the
+response lists the errors of each one by its position:
+
+    {"errors": [{"index": 2, "errors": {"email": ["..."]}}]}
+
+Otherwise the whole batch is written in one transaction, through the
+writer queue (write_queue.py), with one INSERT, UPDATE or DELETE statement
+per batch instead of one per record.
+
+Responses are encoded with orjson when it is installed (pip install
+orjson), otherwise with the standard json module.
+
+The write endpoints take a JSON body (Content-Type: application/json), which
+a browser form on another site cannot send, so they don't need a CSRF token.
+"""
+
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Q
+from django.http import HttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
+
+from . import trigram
+from .management.commands.import_students import UPDATE_FIELDS, ImportStudentForm, normalise_is_active
+from .models import Student
+from .pagination import KeysetPaginator
+from .response_cache import invalidate_students
+from .search import search_students
+from .write_queue import run_write, unique_field
+
+try:
+    import orjson
+except ImportError:  # optional; the json module is used instead
+    orjson = None
+
+
+# Fields a response can contain, in order (the default for ?fields=)
+API_FIELDS = (
+    'id', 'roll_number', 'first_name', 'last_name', 'email', 'grade', 'age',
+    'date_of_birth', 'address', 'phone_number', 'is_active',
+    'date_of_registration', 'updated_at',
+)
+
+# Fields a client can set
+WRITABLE_FIELDS = frozenset(ImportStudentForm.base_fields)
+
+# Page size without ?limit=, and the largest one allowed
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Records per batch request, unless settings.STUDENT_API_MAX_BATCH says otherwise
+DEFAULT_MAX_BATCH = 500
+
+
+def _plain(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    def encode(data):
+        return orjson.dumps(data)
+else:
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_plain).encode
+
+
+def json_response(data, status=200):
+    return HttpResponse(encode(data), status=status, content_type='application/json')
+
+
+def error_response(message, status=400):
+    return json_response({'error': message}, status=status)
+
+
+class ApiError(Exception):
+    """
+    A request that can't be served; turned into an error response.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def max_batch():
+    return getattr(settings, 'STUDENT_API_MAX_BATCH', DEFAULT_MAX_BATCH)
+
+
+def requested_fields(request):
+    """
+    The fields named by ?fields= (all of API_FIELDS without it).
+    """
+    value = request.GET.get('fields')
+    if not value:
+        return API_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in API_FIELDS]
+    if unknown or not fields:
+        raise ApiError(f"Unknown field(s) in ?fields=: {', '.join(unknown) or value}. "
+                       f"Choose from: {', '.join(API_FIELDS)}.")
+    return fields
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def read_batch(request):
+    """
+    Return the JSON array in the request body.
+    """
+    if request.content_type != 'application/json':
+        raise ApiError('Send the records as JSON with Content-Type: application/json.', 415)
+    try:
+        items = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ApiError(f'Invalid JSON: {exc}')
+    if not isinstance(items, list):
+        raise ApiError('Send a JSON array of records.')
+    if not items:
+        raise ApiError('The array is empty.')
+    if len(items) > max_batch():
+        raise ApiError(f'At most {max_batch()} records per request; got {len(items)}.', 413)
+    return items
+
+
+def student_values(student):
+    return {field: getattr(student, field) for field in API_FIELDS}
+
+
+# ---------------------------------------------------------------------------
+# Views
+# ---------------------------------------------------------------------------
+
+@csrf_exempt
+@require_http_methods(['GET', 'HEAD', 'POST', 'PATCH', 'DELETE'])
+def students(request):
+    """
+    List students (GET) or create, update or delete a batch of them.
+    """
+    handlers = {'POST': create_students, 'PATCH': update_students, 'DELETE': delete_students}
+    try:
+        return handlers.get(request.method, list_students)(request)
+    except ApiError as exc:
+        return error_response(exc.message, exc.status)
+
+
+@require_GET
+def student(request, pk):
+    """
+    One student, with ?fields= like the list.
+    """
+    try:
+        fields = requested_fields(request)
+    except ApiError as exc:
+        return error_response(exc.message, exc.status)
+    row = Student.objects.filter(pk=pk).values(*fields).first()
+    if row is None:
+        return error_response('Student not found.', 404)
+    return json_response(row)
+
+
+def list_students(request):
+    fields = requested_fields(request)
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError('?limit= must be a whole number.')
+    limit = min(max(limit, 1), MAX_LIMIT)
+
+    queryset = Student.objects.all()
+    search_query = request.GET.get('search', '')
+    if search_query:
+        queryset = search_students(queryset, search_query)
+
+    # The cursor needs the sort key of every row, asked for or not
+    selected = tuple(dict.fromkeys((*fields, 'date_of_registration', 'id')))
+    page = KeysetPaginator(queryset.values(*selected), per_page=limit).get_page(request.GET.get('cursor'))
+    rows = page.object_list
+    if len(selected) != len(fields):
+        rows = [{field: row[field] for field in fields} for row in rows]
+
+    return json_response({
+        'results': rows,
+        'next': page_link(request, page.next_cursor),
+        'previous': page_link(request, page.prev_cursor),
+    })
+
+
+def create_students(request):
+    items = read_batch(request)
+    new_students, errors = validate_batch(items)
+    if errors:
+        return json_response({'errors': errors}, status=400)
+
+    def write():
+        Student.objects.bulk_create(new_students)
+        return new_students
+
+    saved = write_batch(write)
+    return json_response({'results': [student_values(s) for s in saved]}, status=201)
+
+
+def update_students(request):
+    items = read_batch(request)
+    ids = [item.get('id') for item in items if isinstance(item, dict)]
+    # Current values of the students in the batch; a record only has to
+    # contain the fields it changes
+    existing = {
+        row['id']: row
+        for row in Student.objects.filter(pk__in=[pk for pk in ids if is_id(pk)])
+        .values('id', 'date_of_registration', *WRITABLE_FIELDS)
+    }
+    changed, errors = validate_batch(items, existing)
+    if errors:
+        return json_response({'errors': errors}, status=400)
+
+    def write():
+        now = timezone.now()
+        for student in changed:
+            # bulk_update() doesn't fill in auto_now fields
+            student.updated_at = now
+        Student.objects.bulk_update(changed, ['roll_number', *UPDATE_FIELDS])
+        return changed
+
+    saved = write_batch(write)
+    return json_response({'results': [student_values(s) for s in saved]})
+
+
+def delete_students(request):
+    items = read_batch(request)
+    ids = [item.get('id') if isinstance(item, dict) else item for item in items]
+    found = set(Student.objects.filter(pk__in=[pk for pk in ids if is_id(pk)]).values_list('pk', flat=True))
+    # is_id() comes first: a list or object can't be looked up in a set,
+    # and true or 1.0 would match student 1
+    errors = [
+        {'index': index, 'errors': {'id': ['Student not found.' if is_id(pk) else 'Expected a student id.']}}
+        for index, pk in enumerate(ids)
+        if not is_id(pk) or pk not in found
+    ]
+    if errors:
+        return json_response({'errors': errors}, status=400)
+
+    # QuerySet.delete() sends post_delete for each student, which keeps the
+    # page cache and the trigram index up to date
+    deleted, _ = run_write(lambda: Student.objects.filter(pk__in=ids).delete())
+    return json_response({'deleted': deleted})
+
+
+# ---------------------------------------------------------------------------
+# Validation and writing
+# ---------------------------------------------------------------------------
+
+def is_id(value):
+    # bool is a subclass of int, but true is not a student id
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def validate_batch(items, existing=None):
+    """
+    Validate a batch against the StudentForm rules.
+
+    existing is {id: current values} for an update batch and None for a
+    create batch. Returns (unsaved Student objects, per-record errors).
+    """
+    allowed = WRITABLE_FIELDS if existing is None else WRITABLE_FIELDS | {'id'}
+    form = ImportStudentForm(data={})
+    students, errors = [], []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'errors': {'__all__': ['Expected an object.']}})
+            continue
+        item_errors = {name: ['Unknown field.'] for name in item if name not in allowed}
+        current = None
+        if existing is not None:
+            current = existing.get(item.get('id')) if is_id(item.get('id')) else None
+            if current is None:
+                item_errors['id'] = ['Student not found.']
+        if item_errors:
+            errors.append({'index': index, 'errors': item_errors})
+            continue
+
+        form.rebind(normalise_is_active({**(current or {}), **item}))
+        if not form.is_valid():
+            errors.append({'index': index, 'errors': {
+                field: list(messages) for field, messages in form.errors.items()
+            }})
+            continue
+        student = form.save(commit=False)
+        if current is not None:
+            student.pk = current['id']
+            student.date_of_registration = current['date_of_registration']
+        students.append((index, student))
+
+    errors.extend(unique_errors(students))
+    errors.sort(key=lambda error: error['index'])
+    return [student for _, student in students], errors
+
+
+def unique_errors(indexed_students):
+    """
+    Per-record errors for emails and roll numbers that are taken, by other
+    students or by an earlier record of the batch. Uses one query.
+    """
+    emails = [student.email for _, student in indexed_students]
+    rolls = [student.roll_number for _, student in indexed_students]
+    owners = Student.objects.filter(Q(email__in=emails) | Q(roll_number__in=rolls)).values_list(
+        'pk', 'email', 'roll_number')
+    email_owner, roll_owner = {}, {}
+    for pk, email, roll_number in owners:
+        email_owner[email] = pk
+        roll_owner[roll_number] = pk
+
+    errors = []
+    seen_emails, seen_rolls = set(), set()
+    for index, student in indexed_students:
+        record_errors = {}
+        if student.email in seen_emails:
+            record_errors['email'] = ['Repeated earlier in the batch.']
+        elif email_owner.get(student.email, student.pk) != student.pk:
+            record_errors['email'] = list(student.unique_error_message(Student, ['email']))
+        if student.roll_number in seen_rolls:
+            record_errors['roll_number'] = ['Repeated earlier in the batch.']
+        elif roll_owner.get(student.roll_number, student.pk) != student.pk:
+            record_errors['roll_number'] = list(student.unique_error_message(Student, ['roll_number']))
+        seen_emails.add(student.email)
+        seen_rolls.add(student.roll_number)
+        if record_errors:
+            errors.append({'index': index, 'errors': record_errors})
+    return errors
+
+
+def write_batch(write):
+    """
+    Run write() (which returns the students it saved) in one transaction.
+    """
+    def write_and_index():
+        saved = write()
+        # Bulk writes send no post_save signals: update the trigram index
+        # the way the signal handler would, once the transaction commits
+        for student in saved:
+            trigram.student_saved(Student, student)
+        return saved
+
+    try:
+        saved = run_write(write_and_index)
+    except IntegrityError as exc:
+        # Another request took an email or roll number after validation
+        field = unique_field(exc)
+        if field is None:
+            raise
+        raise ApiError(f'A {field} in the batch was taken by another request; nothing was saved.', 409)
+    invalidate_students([student.pk for student in saved])
+    return saved
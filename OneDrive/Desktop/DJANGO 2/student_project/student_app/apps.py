@@ -24,3 +24,38 @@ class StudentAppConfig(AppConfig):
     # verbose_name: human-readable name for the app
     # Used in Django admin and other places
     verbose_name = 'Student Management'
+    
+    def ready(self):
+        """
+        Called once Django has loaded all apps.
+        Used to connect signal handlers.
+        """
+        from django.core import checks
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_migrate, post_save
+        from . import (
+            changelog, counters, instrumentation, response_cache, search, sqlite_profile, static_files, trigram,
+        )
+        from .models import Student
+        
+        # Apply the SQLITE_PRAGMAS setting to every new database connection
+        connection_created.connect(sqlite_profile.configure_connection)
+        
+        # Let request timing and the profiler see every connection's queries
+        connection_created.connect(instrumentation.install_sql_hooks)
+        
+        # Keep the full-text search, counter and change feed triggers in place after every migrate
+        post_migrate.connect(search.ensure_triggers, sender=self)
+        post_migrate.connect(counters.ensure_triggers, sender=self)
+        post_migrate.connect(changelog.ensure_triggers, sender=self)
+        
+        # Keep the optional trigram index in step with saved/deleted students
+        post_save.connect(trigram.student_saved, sender=Student)
+        post_delete.connect(trigram.student_deleted, sender=Student)
+        
+        # Warn when the self-hosted Bootstrap/Font Awesome haven't been downloaded
+        checks.register(static_files.check_vendored_assets, checks.Tags.staticfiles)
+        
+        # Retire cached pages that showed a student when it changes
+        post_save.connect(response_cache.student_changed, sender=Student)
+        post_delete.connect(response_cache.student_changed, sender=Student)
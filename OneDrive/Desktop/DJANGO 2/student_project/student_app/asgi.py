@@ -0,0 +1,23 @@
+"""
+The ASGI handler that serves the async student views.
+
+student_project/asgi.py creates the application from this class; the
+benchmarks import it directly (importing student_project.asgi would set
+Django up a second time).
+"""
+
+from django.core.handlers.asgi import ASGIHandler
+
+
+class StudentASGIHandler(ASGIHandler):
+    """
+    Django's ASGI handler, resolving URLs with the async URL patterns
+    (student_project/urls_asgi.py) instead of ROOT_URLCONF.
+    """
+
+    urlconf = 'student_project.urls_asgi'
+
+    async def get_response_async(self, request):
+        # Django resolves the URL with request.urlconf when it is set
+        request.urlconf = self.urlconf
+        return await super().get_response_async(request)
@@ -0,0 +1,105 @@
+"""
+Async versions of the student read views, used when running under ASGI.
+
+Under an ASGI server (uvicorn, daphne, ...) Django runs a synchronous view
+by handing the whole request to a worker thread of its own and waiting for
+it, so every request in progress holds a thread, however long it waits.
+These views are coroutines instead: they run on the event loop and only
+hand the individual database calls to a thread, so the rest of the work
+(templates, cached pages, headers) needs no thread at all.
+
+asgi.py switches to the URL patterns in urls_async.py, which use these
+views for student_list (including search), student_detail and cache_stats.
+The pages are identical to the sync views' (same templates, ETags and page
+cache); the create/update/delete forms stay synchronous.
+
+Django 4.2's async ORM and cache methods (aiterator, acount, aget,
+aget_many, ...) still run the sync code in a thread, so each call costs a
+hop; the views keep it to a few per request.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+
+from . import response_cache
+from .conditional import student_detail_condition_async, student_list_condition_async
+from .counters import get_counts
+from .lean_rows import LIST_FIELDS, render_list_page
+from .models import Student
+from .pagination import KeysetPaginator
+from .response_cache import cache_student_detail_async, cache_student_list_async
+from .row_cache import arender_rows
+from .search import search_students
+
+
+def _list_queryset(search_query):
+    """
+    The (lazy) queryset of students to list, and the current counts.
+
+    Building a search can look at the database schema and the trigram
+    index, and the counts are one query, so both run in a single hop.
+    """
+    students = Student.objects.all()
+    if search_query:
+        students = search_students(students, search_query)
+    return students, get_counts()
+
+
+@student_list_condition_async
+@cache_student_list_async
+async def student_list(request):
+    """
+    Async student_list: one page of students, optionally searched.
+    """
+    search_query = request.GET.get('search', '')
+    students, counts = await sync_to_async(_list_queryset)(search_query)
+
+    lean = getattr(settings, 'STUDENT_LEAN_ROWS', True)
+    rows = students.values(*LIST_FIELDS) if lean else students
+    page = await KeysetPaginator(rows).aget_page(request.GET.get('cursor'))
+    context = {
+        'students': page.object_list,
+        'page_obj': page,
+        'search_query': search_query,
+        'total_students': counts['total'],
+        'result_count': await students.acount() if search_query else counts['total'],
+    }
+    # Rendering needs no queries: the rows are already loaded
+    if lean:
+        return render_list_page(
+            request, 'student_app/student_list.html', context, page.object_list, asynchronous=True,
+        )
+    context['student_rows'] = await arender_rows(page.object_list)
+    return render(request, 'student_app/student_list.html', context)
+
+
+@student_detail_condition_async
+@cache_student_detail_async
+async def student_detail(request, pk):
+    """
+    Async student_detail.
+    """
+    try:
+        student = await Student.objects.aget(pk=pk)
+    except Student.DoesNotExist:
+        raise Http404('No Student matches the given query.')
+    return render(request, 'student_app/student_detail.html', {'student': student})
+
+
+def _is_staff(request):
+    # request.user loads the session (a query) on first use
+    user = request.user
+    return user.is_active and user.is_staff
+
+
+async def cache_stats(request):
+    """
+    Async cache_stats (staff only, like the sync view).
+    """
+    if not await sync_to_async(_is_staff)(request):
+        return redirect_to_login(request.get_full_path(), reverse('admin:login'))
+    return JsonResponse(response_cache.stats())
@@ -0,0 +1,369 @@
+"""
+Load-test scenarios for the student pages.
+
+Each scenario sends one kind of request (list, search, detail, create,
+update, admin changelist) through Django's test client - the full middleware
+and view stack, without a network in between - from several threads at once.
+run_scenario() measures every request and returns its latency percentiles,
+requests per second, SQL queries per request and the process's peak memory.
+
+Used by `python manage.py bench`, which seeds the data and writes the
+results as JSON so runs can be compared between commits.
+
+run_server_mode() sends the same read-only requests straight to a real
+WSGI or ASGI handler instead (no test client), from threads or coroutines,
+to compare how each server interface copes with many requests at once;
+see `python manage.py bench_asgi`.
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections
+from django.forms.models import model_to_dict
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .asgi import StudentASGIHandler
+from .forms import StudentForm
+from .models import Student
+from .synthetic import SEARCH_QUERIES
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+BENCH_USER = 'bench-admin'
+
+
+def peak_rss_mb():
+    """
+    Highest memory use of this process so far, in MB (None if unknown).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def percentiles(samples):
+    """
+    Return p50/p95/p99 of a list of milliseconds.
+    """
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {'p50': value, 'p95': value, 'p99': value}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+def form_data(student, **changes):
+    """
+    POST data for StudentForm, as the edit page would submit it.
+    """
+    data = model_to_dict(student, fields=StudentForm.base_fields)
+    data.update(changes)
+    data = {key: value for key, value in data.items() if value is not None}
+    if not data.get('is_active'):
+        # An unticked checkbox is simply missing from the POST
+        data.pop('is_active', None)
+    return data
+
+
+class BenchContext:
+    """
+    Shared state for one run: the students to pick from and fresh roll numbers.
+    """
+
+    def __init__(self, seed=0):
+        self.pks = list(Student.objects.values_list('pk', flat=True))
+        if not self.pks:
+            raise RuntimeError('Add some students before running the benchmark.')
+        self.template = Student.objects.get(pk=self.pks[0])
+        self.roll_numbers = count(50_000_000 + seed * 1_000_000)
+        self.lock = threading.Lock()
+
+    def next_roll_number(self):
+        with self.lock:
+            return next(self.roll_numbers)
+
+
+# ---------------------------------------------------------------------------
+# Scenarios: each takes (rng, context) and returns the request to send as
+# (method, url, data). Any lookups they need happen before the clock starts.
+# ---------------------------------------------------------------------------
+
+def list_page(rng, context):
+    return 'get', reverse('student_list'), None
+
+
+def list_search(rng, context):
+    return 'get', reverse('student_list'), {'search': rng.choice(SEARCH_QUERIES)}
+
+
+def detail(rng, context):
+    return 'get', reverse('student_detail', args=[rng.choice(context.pks)]), None
+
+
+def create(rng, context):
+    n = context.next_roll_number()
+    data = form_data(
+        context.template, roll_number=n, email=f'bench{n}@example.com', first_name='Bench',
+    )
+    return 'post', reverse('student_create'), data
+
+
+def update(rng, context):
+    pk = rng.choice(context.pks)
+    data = form_data(Student.objects.get(pk=pk), age=18 + rng.randrange(10))
+    return 'post', reverse('student_update', args=[pk]), data
+
+
+def admin_changelist(rng, context):
+    return 'get', reverse('admin:student_app_student_changelist'), None
+
+
+SCENARIOS = {
+    'list': list_page,
+    'list_search': list_search,
+    'detail': detail,
+    'create': create,
+    'update': update,
+    'admin_changelist': admin_changelist,
+}
+
+# Scenarios that need a logged-in staff user
+STAFF_SCENARIOS = {'admin_changelist'}
+
+
+def bench_user():
+    user_model = get_user_model()
+    user = user_model.objects.filter(username=BENCH_USER).first()
+    if user is None:
+        user = user_model.objects.create_superuser(BENCH_USER, 'bench@example.com', None)
+    return user
+
+
+def run_scenario(name, requests, concurrency, context, seed=0):
+    """
+    Send `requests` requests of one scenario from `concurrency` threads.
+
+    With concurrency 1 the requests run in the calling thread.
+    """
+    scenario = SCENARIOS[name]
+    user = bench_user() if name in STAFF_SCENARIOS else None
+    shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+    def worker(number):
+        rng = random.Random(seed * 1000 + number)
+        client = Client(raise_request_exception=False)
+        if user is not None:
+            client.force_login(user)
+        latencies, queries, statuses = [], [], Counter()
+        try:
+            for _ in range(shares[number]):
+                method, url, data = scenario(rng, context)
+                send = getattr(client, method)
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = send(url, data)
+                    elapsed = (time.perf_counter() - start) * 1000
+                latencies.append(elapsed)
+                queries.append(len(captured))
+                statuses[response.status_code] += 1
+        finally:
+            if concurrency > 1:
+                # Each thread opened its own connection
+                connections.close_all()
+        return latencies, queries, statuses
+
+    start = time.perf_counter()
+    if concurrency == 1:
+        finished = [worker(0)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            finished = list(pool.map(worker, range(concurrency)))
+    seconds = time.perf_counter() - start
+
+    latencies, queries, statuses = [], [], Counter()
+    for worker_latencies, worker_queries, worker_statuses in finished:
+        latencies.extend(worker_latencies)
+        queries.extend(worker_queries)
+        statuses.update(worker_statuses)
+
+    errors = sum(n for status, n in statuses.items() if status >= 400)
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'seconds': round(seconds, 3),
+        'requests_per_sec': round(len(latencies) / seconds, 1) if seconds else 0.0,
+        'latency_ms': {key: round(value, 2) for key, value in percentiles(latencies).items()},
+        'queries_per_request': round(statistics.mean(queries), 2) if queries else 0.0,
+        'max_queries': max(queries, default=0),
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'errors': errors,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# WSGI vs ASGI
+#
+# The same GET requests sent to the handler a server would call: from
+# `concurrency` threads for WSGI (like a threaded WSGI worker), and as
+# `concurrency` concurrent tasks on one event loop for ASGI (like one
+# uvicorn worker). Only read-only scenarios are used, so every mode sees the
+# same data.
+# ---------------------------------------------------------------------------
+
+SERVER_SCENARIOS = ('list', 'list_search', 'detail')
+
+# Host header sent with the requests (must be in ALLOWED_HOSTS)
+SERVER_HOST = 'localhost'
+
+
+def server_modes():
+    """
+    Return {mode name: function returning a fresh handler}.
+    """
+    return {
+        'wsgi': WSGIHandler,              # sync views, one thread per request in progress
+        'asgi_sync_views': ASGIHandler,   # ASGI, but the same sync views
+        'asgi_async_views': StudentASGIHandler,
+    }
+
+
+def server_requests(names, requests, context, seed=0):
+    """
+    Return `requests` (path, query string) pairs, cycling through scenarios.
+    """
+    rng = random.Random(seed)
+    pairs = []
+    for n in range(requests):
+        _method, url, data = SCENARIOS[names[n % len(names)]](rng, context)
+        pairs.append((url, urlencode(data or {})))
+    return pairs
+
+
+def wsgi_request(handler, path, query):
+    """
+    Call a WSGI handler like a server would; returns the status code.
+    """
+    environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': SERVER_HOST}
+    setup_testing_defaults(environ)
+    status = []
+    body = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+    try:
+        for _chunk in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_request(app, path, query):
+    """
+    Call an ASGI application like a server would; returns the status code.
+    """
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+        'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', SERVER_HOST.encode())],
+        'client': ('127.0.0.1', 50000), 'server': (SERVER_HOST, 80),
+    }
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]['status']
+
+
+def _summary(latencies, statuses, seconds, concurrency):
+    errors = sum(n for status, n in statuses.items() if status >= 400)
+    return {
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'seconds': round(seconds, 3),
+        'requests_per_sec': round(len(latencies) / seconds, 1) if seconds else 0.0,
+        'latency_ms': {key: round(value, 2) for key, value in percentiles(latencies).items()},
+        'statuses': {str(status): n for status, n in sorted(statuses.items())},
+        'errors': errors,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _run_wsgi(handler, pairs, concurrency):
+    shares = [pairs[i::concurrency] for i in range(concurrency)]
+
+    def worker(share):
+        latencies, statuses = [], Counter()
+        try:
+            for path, query in share:
+                start = time.perf_counter()
+                statuses[wsgi_request(handler, path, query)] += 1
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            connections.close_all()
+        return latencies, statuses
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        finished = list(pool.map(worker, shares))
+    seconds = time.perf_counter() - start
+
+    latencies, statuses = [], Counter()
+    for worker_latencies, worker_statuses in finished:
+        latencies.extend(worker_latencies)
+        statuses.update(worker_statuses)
+    return latencies, statuses, seconds
+
+
+async def _run_asgi(app, pairs, concurrency):
+    # `concurrency` requests in flight at any time, like that many open connections
+    queue = iter(pairs)
+    latencies, statuses = [], Counter()
+
+    async def client():
+        for path, query in queue:
+            start = time.perf_counter()
+            statuses[await asgi_request(app, path, query)] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def run_server_mode(mode, pairs, concurrency):
+    """
+    Send the (path, query) pairs through one of server_modes().
+    """
+    handler = server_modes()[mode]()
+    if mode == 'wsgi':
+        latencies, statuses, seconds = _run_wsgi(handler, pairs, concurrency)
+    else:
+        latencies, statuses, seconds = asyncio.run(_run_asgi(handler, pairs, concurrency))
+    return _summary(latencies, statuses, seconds, concurrency)
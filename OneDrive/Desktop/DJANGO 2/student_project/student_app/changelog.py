@@ -0,0 +1,253 @@
+"""
+Change feed of the student table, for systems that keep a copy of it.
+
+On SQLite, triggers on student_app_student add a StudentChange entry
+(sequence number, student id, insert/update/delete) in the same
+transaction as every write - including bulk_create(), bulk_update() and
+queryset.update(), which skip Model.save() and send no signals. A
+consumer remembers the last sequence number it has applied and asks for
+what came after it:
+
+    GET /changes?since=1041&limit=5000
+    python manage.py student_changes --since 1041
+
+The answer is streamed as NDJSON, one change per line, in seq order:
+
+    {"seq":1042,"op":"update","id":7,"student":{"id":7,"first_name":...}}
+    {"seq":1043,"op":"delete","id":9}
+
+Inserts and updates carry the student's values at the time the feed is
+read, not at the time of the change, so the entries only need to store
+which student changed. Entries are read CHUNK_SIZE at a time, together with
+their students (values() rows, no Student objects), and a response ends at
+the last entry that existed when it started (the X-Changes-Head header), so
+a consumer is up to date when the last seq it received equals that head.
+
+Reading from ?since=0 gives every current student (the migration that
+created the feed added an entry for each existing one), so that is also
+how a new consumer makes its first copy.
+
+`python manage.py student_changes --compact` (run it e.g. nightly) keeps
+the table small:
+
+- only the latest entry of each student is kept: the older ones would give
+  a consumer the same current values;
+- delete entries older than STUDENT_CHANGES_RETENTION_DAYS are dropped.
+  A consumer whose last seq is older than the newest dropped delete (the
+  "horizon") could have missed it, so the feed answers it with 410 Gone;
+  it should read again from ?since=0 and replace its copy.
+
+On databases other than SQLite the triggers don't exist and the feed stays
+empty.
+"""
+
+import itertools
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .api import API_FIELDS, encode
+from .models import Student, StudentChange, StudentCounter
+
+
+CHANGE_TABLE = StudentChange._meta.db_table
+
+# Entries (and students) read from the database at a time
+CHUNK_SIZE = 1000
+
+# Default for settings.STUDENT_CHANGES_RETENTION_DAYS
+DEFAULT_RETENTION_DAYS = 30
+
+# StudentCounter row holding the horizon (see the module docstring);
+# counters.reconcile() leaves it alone
+HORIZON_NAME = 'changelog:horizon'
+
+# 'I' -> 'insert', ...: the "op" of a change in the feed
+OP_NAMES = {code: label.lower() for code, label in StudentChange.OP_CHOICES}
+
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+TRIGGER_SQL = {
+    'student_app_change_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_change_ai AFTER INSERT ON student_app_student BEGIN
+            INSERT INTO {CHANGE_TABLE}(student_id, op, changed_at) VALUES (new.id, 'I', {_NOW});
+        END
+    """,
+    'student_app_change_au': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_change_au AFTER UPDATE ON student_app_student BEGIN
+            INSERT INTO {CHANGE_TABLE}(student_id, op, changed_at) VALUES (new.id, 'U', {_NOW});
+        END
+    """,
+    'student_app_change_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_change_ad AFTER DELETE ON student_app_student BEGIN
+            INSERT INTO {CHANGE_TABLE}(student_id, op, changed_at) VALUES (old.id, 'D', {_NOW});
+        END
+    """,
+}
+
+
+class FeedExpired(Exception):
+    """
+    The requested position is older than the horizon; read from 0 again.
+    """
+
+
+def triggers_enabled(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def get_head():
+    """
+    Return the newest sequence number (0 when there are no entries).
+    """
+    return StudentChange.objects.aggregate(head=Max('seq'))['head'] or 0
+
+
+def get_horizon():
+    """
+    Return the sequence number of the newest delete entry compaction dropped.
+    """
+    return StudentCounter.objects.filter(name=HORIZON_NAME).values_list('value', flat=True).first() or 0
+
+
+def iter_changes(since=0, limit=None, head=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of change dicts after `since`, up to `head` (default: the
+    newest entry now) and at most `limit` entries.
+
+    Raises FeedExpired (before yielding anything) when 0 < since < horizon.
+    """
+    if 0 < since < get_horizon():
+        raise FeedExpired(since)
+    if head is None:
+        head = get_head()
+    remaining = limit
+    while since < head and remaining != 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        entries = list(
+            StudentChange.objects.filter(seq__gt=since, seq__lte=head)
+            .order_by('seq').values_list('seq', 'student_id', 'op')[:size]
+        )
+        if not entries:
+            break
+        since = entries[-1][0]
+        if remaining is not None:
+            remaining -= len(entries)
+        yield _changes(entries)
+
+
+def _changes(entries):
+    # A student changed twice in one chunk is sent once, at its later seq
+    latest = {student_id: seq for seq, student_id, _op in entries}
+    upserted = [student_id for _seq, student_id, op in entries if op != 'D']
+    students = {
+        row['id']: row
+        for row in Student.objects.filter(pk__in=upserted).values(*API_FIELDS)
+    } if upserted else {}
+
+    changes = []
+    for seq, student_id, op in entries:
+        if latest[student_id] != seq:
+            continue
+        student = students.get(student_id) if op != 'D' else None
+        if student is None:
+            # Deleted since (its delete entry follows): send the delete now
+            changes.append({'seq': seq, 'op': OP_NAMES['D'], 'id': student_id})
+        else:
+            changes.append({'seq': seq, 'op': OP_NAMES[op], 'id': student_id, 'student': student})
+    return changes
+
+
+def stream_ndjson(chunks):
+    # An empty first chunk gets the response headers out immediately
+    yield b''
+    for changes in chunks:
+        # encode() gives bytes with orjson, str without
+        lines = (encode(change) for change in changes)
+        yield b''.join(
+            (line if isinstance(line, bytes) else line.encode()) + b'\n' for line in lines
+        )
+
+
+def changes_response(since=0, limit=None):
+    """
+    Return a StreamingHttpResponse of the changes after `since` as NDJSON.
+
+    Raises FeedExpired when `since` is older than the horizon.
+    """
+    head = get_head()
+    chunks = iter_changes(since, limit, head)
+    # Read the first chunk now: the horizon check runs while an error
+    # response can still be sent
+    first = next(chunks, None)
+    if first is not None:
+        chunks = itertools.chain([first], chunks)
+    response = StreamingHttpResponse(stream_ndjson(chunks), content_type='application/x-ndjson')
+    response['X-Changes-Head'] = head
+    return response
+
+
+def retention_days():
+    return getattr(settings, 'STUDENT_CHANGES_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+
+
+def compact(days=None):
+    """
+    Drop superseded entries and delete entries older than `days` (default
+    STUDENT_CHANGES_RETENTION_DAYS); see the module docstring.
+
+    Returns {'superseded': n, 'expired': n, 'horizon': seq}.
+    """
+    if days is None:
+        days = retention_days()
+    with transaction.atomic():
+        latest = StudentChange.objects.values('student_id').annotate(latest=Max('seq')).values('latest')
+        superseded, _ = StudentChange.objects.exclude(seq__in=latest).delete()
+
+        expired = StudentChange.objects.filter(op='D', changed_at__lt=timezone.now() - timedelta(days=days))
+        newest_expired = expired.aggregate(seq=Max('seq'))['seq']
+        horizon = get_horizon()
+        removed = 0
+        if newest_expired is not None:
+            removed, _ = expired.delete()
+            horizon = max(horizon, newest_expired)
+            StudentCounter.objects.update_or_create(name=HORIZON_NAME, defaults={'value': horizon})
+    return {'superseded': superseded, 'expired': removed, 'horizon': horizon}
+
+
+def record_inserts(after_id, using=DEFAULT_DB_ALIAS):
+    """
+    Add an insert entry for every student with an id above after_id, as
+    the triggers would. For bulk loads that run with the triggers dropped.
+    """
+    student_table = Student._meta.db_table
+    # With parameters, a literal % in the SQL (strftime's) must be doubled
+    now = _NOW.replace('%', '%%')
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {CHANGE_TABLE}(student_id, op, changed_at) "
+            f"SELECT id, 'I', {now} FROM {student_table} WHERE id > %s ORDER BY id",
+            [after_id],
+        )
+
+
+def ensure_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate handler: (re-)create the change feed triggers.
+
+    Django drops a SQLite table's triggers whenever it rebuilds the table
+    during a migration, so they are put back after every migrate.
+    """
+    using = connections[using]
+    if not triggers_enabled(using) or CHANGE_TABLE not in using.introspection.table_names():
+        return
+    with using.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        for name, sql in TRIGGER_SQL.items():
+            if name not in existing:
+                cursor.execute(sql)
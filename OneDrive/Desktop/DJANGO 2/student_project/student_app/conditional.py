@@ -0,0 +1,159 @@
+"""
+ETag / Last-Modified support for the student pages.
+
+Browsers and API clients that already have a page can send back the ETag or
+Last-Modified value they got with it (If-None-Match / If-Modified-Since).
+If nothing has changed, the view answers "304 Not Modified" with an empty
+body - without loading the student or rendering the template.
+
+- Detail pages use the student's (pk, updated_at), read with one
+  primary-key lookup.
+- The list page uses the table-level change watermark kept by the
+  triggers in counters.py, plus the search and cursor parameters.
+
+Usage:
+    @student_detail_condition
+    def student_detail(request, pk): ...
+
+The async views (async_views.py) use student_detail_condition_async and
+student_list_condition_async, which read the same values with the async ORM
+first and then answer exactly like the sync decorators.
+"""
+
+import datetime
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.messages import get_messages
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import condition
+
+from .counters import get_watermark
+from .models import Student
+
+
+def has_pending_messages(request):
+    # A page carrying a one-time message must be rendered, not served from cache.
+    # len() doesn't mark the messages as read.
+    return len(get_messages(request)) > 0
+
+
+def _student_updated_at(request, pk):
+    """
+    Look up a student's updated_at once per request (None if not found).
+    """
+    cache = request.__dict__.setdefault('_student_updated_at', {})
+    if pk not in cache:
+        cache[pk] = Student.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    return cache[pk]
+
+
+def detail_stamp(request, pk):
+    """
+    The student's updated_at (None if not found), which the detail ETag is
+    built from. response_cache.py stores it with the cached page.
+    """
+    return _student_updated_at(request, pk)
+
+
+def detail_etag(request, pk):
+    if has_pending_messages(request):
+        return None
+    updated_at = _student_updated_at(request, pk)
+    if updated_at is None:
+        # Let the view return its 404
+        return None
+    return f'student-{pk}-{updated_at.timestamp():.6f}'
+
+
+def detail_last_modified(request, pk):
+    if has_pending_messages(request):
+        return None
+    return _student_updated_at(request, pk)
+
+
+def _watermark(request):
+    if not hasattr(request, '_student_watermark'):
+        request._student_watermark = get_watermark()
+    return request._student_watermark
+
+
+def list_stamp(request):
+    """
+    The change number of the list watermark, which the list ETag is built
+    from. response_cache.py stores it with the cached page.
+    """
+    return _watermark(request)[0]
+
+
+def list_etag(request):
+    if has_pending_messages(request):
+        return None
+    changes, _changed_at = _watermark(request)
+    # The page also depends on which search/page was asked for
+    params = request.GET.urlencode()
+    digest = hashlib.sha1(f'{changes}|{params}'.encode()).hexdigest()[:20]
+    return f'students-{digest}'
+
+
+def list_last_modified(request):
+    if has_pending_messages(request):
+        return None
+    return _watermark(request)[1]
+
+
+async def prefetch_updated_at(request, pk):
+    cache = request.__dict__.setdefault('_student_updated_at', {})
+    if pk not in cache:
+        cache[pk] = await Student.objects.filter(pk=pk).values_list('updated_at', flat=True).afirst()
+
+
+async def prefetch_watermark(request):
+    if not hasattr(request, '_student_watermark'):
+        # get_watermark() picks between the trigger-kept counters and the
+        # table itself; one hop to the ORM thread runs either
+        request._student_watermark = await sync_to_async(get_watermark)()
+
+
+def async_condition(prefetch, etag_func, last_modified_func):
+    """
+    Django's condition() for async views.
+
+    prefetch(request, ...) is awaited first and stores what etag_func and
+    last_modified_func need on the request, so they run without queries.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            await prefetch(request, *args, **kwargs)
+            etag = etag_func(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag is not None else None
+            last_modified = last_modified_func(request, *args, **kwargs)
+            if last_modified:
+                if not timezone.is_aware(last_modified):
+                    last_modified = timezone.make_aware(last_modified, datetime.timezone.utc)
+                last_modified = int(last_modified.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            return response
+        return inner
+    return decorator
+
+
+# Decorators for the views
+student_detail_condition = condition(etag_func=detail_etag, last_modified_func=detail_last_modified)
+student_list_condition = condition(etag_func=list_etag, last_modified_func=list_last_modified)
+
+# ... and for the async views
+student_detail_condition_async = async_condition(prefetch_updated_at, detail_etag, detail_last_modified)
+student_list_condition_async = async_condition(prefetch_watermark, list_etag, list_last_modified)
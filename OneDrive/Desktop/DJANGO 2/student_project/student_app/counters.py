@@ -0,0 +1,239 @@
+"""
+Maintained student counts (total, per grade and per active status).
+
+The StudentCounter table holds one row per count. On SQLite, triggers on
+student_app_student adjust those rows in the same transaction as the write
+that changed the students, so the counts can never drift from the data -
+including bulk_create() and queryset.update(), which skip Model.save().
+
+Reading the counts is a single query on a handful of rows, however big the
+student table gets. `python manage.py reconcile_student_counters` recomputes
+them from scratch and reports any difference; run it periodically (e.g. from
+cron) as a safety net.
+
+The same triggers also keep a table-level change watermark (a write
+sequence number and the time of the last write), which the list page uses
+to answer conditional GET requests; see get_watermark().
+
+On databases without the triggers, get_counts() falls back to counting.
+"""
+
+from datetime import datetime, timezone
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Count, Max, Q
+
+from .models import Student, StudentCounter
+from .sqlite_profile import lock_for_write
+
+
+COUNTER_TABLE = StudentCounter._meta.db_table
+
+# One upsert per trigger: each row in VALUES adds its delta to a counter,
+# creating the counter row if it doesn't exist yet
+TRIGGER_SQL = {
+    'student_app_counter_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_counter_ai AFTER INSERT ON student_app_student BEGIN
+            INSERT INTO {COUNTER_TABLE}(name, value) VALUES
+                ('total', 1), ('grade:' || new.grade, 1), ('active:' || new.is_active, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;
+        END
+    """,
+    'student_app_counter_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_counter_ad AFTER DELETE ON student_app_student BEGIN
+            INSERT INTO {COUNTER_TABLE}(name, value) VALUES
+                ('total', -1), ('grade:' || old.grade, -1), ('active:' || old.is_active, -1)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;
+        END
+    """,
+    'student_app_counter_au': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_counter_au AFTER UPDATE OF grade, is_active ON student_app_student
+        WHEN old.grade IS NOT new.grade OR old.is_active IS NOT new.is_active BEGIN
+            INSERT INTO {COUNTER_TABLE}(name, value) VALUES
+                ('grade:' || old.grade, -1), ('active:' || old.is_active, -1),
+                ('grade:' || new.grade, 1), ('active:' || new.is_active, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;
+        END
+    """,
+    # Table-level change watermark: 'changes' goes up by one on every write
+    # and 'changed_at' records when (Unix seconds). Used for list ETags.
+    'student_app_watermark_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_watermark_ai AFTER INSERT ON student_app_student BEGIN
+            {{watermark}}
+        END
+    """,
+    'student_app_watermark_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_watermark_ad AFTER DELETE ON student_app_student BEGIN
+            {{watermark}}
+        END
+    """,
+    'student_app_watermark_au': f"""
+        CREATE TRIGGER IF NOT EXISTS student_app_watermark_au AFTER UPDATE ON student_app_student BEGIN
+            {{watermark}}
+        END
+    """,
+}
+
+WATERMARK_SQL = f"""
+            INSERT INTO {COUNTER_TABLE}(name, value) VALUES ('changes', 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;
+            INSERT INTO {COUNTER_TABLE}(name, value) VALUES ('changed_at', CAST(strftime('%s', 'now') AS INTEGER))
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value;
+"""
+for _name, _sql in TRIGGER_SQL.items():
+    TRIGGER_SQL[_name] = _sql.replace('{watermark}', WATERMARK_SQL.strip())
+
+# Counters that reconcile() recomputes (the watermark is not a count)
+WATERMARK_NAMES = ('changes', 'changed_at')
+
+# Rows of the counter table that reconcile() leaves alone: the watermark
+# and the change feed's horizon (see changelog.py)
+NOT_COUNTS = (*WATERMARK_NAMES, 'changelog:horizon')
+
+
+def triggers_enabled(using=connection):
+    """
+    Return True when the counter triggers can exist on this database.
+    """
+    return using.vendor == 'sqlite'
+
+
+def compute_counts():
+    """
+    Count the students table directly (one aggregate query).
+
+    Returns a dict of counter name -> value, including zero counters for
+    every grade and status.
+    """
+    # aggregate() needs identifier-style aliases, so map them to counter names
+    aggregates = {
+        'total': Count('pk'),
+        'active_1': Count('pk', filter=Q(is_active=True)),
+        'active_0': Count('pk', filter=Q(is_active=False)),
+    }
+    names = {'total': 'total', 'active_1': 'active:1', 'active_0': 'active:0'}
+    for code, _label in Student.GRADE_CHOICES:
+        aggregates[f'grade_{code}'] = Count('pk', filter=Q(grade=code))
+        names[f'grade_{code}'] = f'grade:{code}'
+
+    result = Student.objects.aggregate(**aggregates)
+    return {names[alias]: value for alias, value in result.items()}
+
+
+def get_counts():
+    """
+    Return the current counts as a dict:
+        {'total': 120, 'active': 118, 'inactive': 2, 'by_grade': {'A': 40, ...}}
+    """
+    if triggers_enabled():
+        raw = dict(StudentCounter.objects.values_list('name', 'value'))
+        if 'total' not in raw:
+            # Counters have never been initialised on this database
+            reconcile()
+            raw = dict(StudentCounter.objects.values_list('name', 'value'))
+    else:
+        raw = compute_counts()
+
+    return {
+        'total': raw.get('total', 0),
+        'active': raw.get('active:1', 0),
+        'inactive': raw.get('active:0', 0),
+        'by_grade': {
+            code: raw.get(f'grade:{code}', 0)
+            for code, _label in Student.GRADE_CHOICES
+        },
+    }
+
+
+def get_total():
+    """
+    Return the total number of students.
+    """
+    return get_counts()['total']
+
+
+def get_watermark():
+    """
+    Return (changes, changed_at) for the student table.
+
+    changes is a number that increases with every insert, update or delete;
+    changed_at is the datetime of the last such write (or None if unknown).
+    On databases without the triggers both are computed from the table.
+    """
+    if not triggers_enabled():
+        latest = Student.objects.aggregate(changed_at=Max('updated_at'), total=Count('pk'))
+        changed_at = latest['changed_at']
+        changes = f"{latest['total']}-{changed_at.timestamp() if changed_at else 0}"
+        return changes, changed_at
+
+    raw = dict(StudentCounter.objects.filter(name__in=WATERMARK_NAMES).values_list('name', 'value'))
+    changed_at = raw.get('changed_at')
+    if changed_at is not None:
+        changed_at = datetime.fromtimestamp(changed_at, tz=timezone.utc)
+    return raw.get('changes', 0), changed_at
+
+
+def reconcile():
+    """
+    Recompute every counter from the student table and store the result.
+
+    Returns a dict of counter name -> (stored, actual) for every counter
+    that was wrong, so callers can report drift.
+    """
+    with transaction.atomic():
+        # Counting first and writing afterwards would fail with "database
+        # is locked" if a student write committed in between
+        lock_for_write(COUNTER_TABLE)
+        actual = compute_counts()
+        stored = dict(
+            StudentCounter.objects.select_for_update()
+            .exclude(name__in=NOT_COUNTS)
+            .values_list('name', 'value')
+        )
+        drift = {
+            name: (stored.get(name), value)
+            for name, value in actual.items()
+            if stored.get(name) != value
+        }
+        # Counters for values no longer in GRADE_CHOICES are dropped
+        StudentCounter.objects.exclude(name__in=actual).exclude(name__in=NOT_COUNTS).delete()
+        StudentCounter.objects.bulk_create(
+            [StudentCounter(name=name, value=value) for name, value in actual.items()],
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=['value'],
+        )
+    return drift
+
+
+def bump_watermark(using=DEFAULT_DB_ALIAS):
+    """
+    Record a write in the change watermark, as the triggers would.
+
+    For bulk loads that run with the triggers dropped.
+    """
+    with connections[using].cursor() as cursor:
+        for statement in WATERMARK_SQL.split(';'):
+            if statement.strip():
+                cursor.execute(statement)
+
+
+def ensure_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate handler: (re-)create the counter triggers.
+
+    Django drops a SQLite table's triggers whenever it rebuilds the table
+    during a migration, so they are put back after every migrate and the
+    counters are reconciled if any had been missing.
+    """
+    using = connections[using]
+    if not triggers_enabled(using) or COUNTER_TABLE not in using.introspection.table_names():
+        return
+    with using.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGER_SQL if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGER_SQL[name])
+    if missing and using.alias == DEFAULT_DB_ALIAS:
+        reconcile()
@@ -0,0 +1,206 @@
+"""
+Streaming export of students as CSV, NDJSON or XLSX.
+
+Rows are read with values_list().iterator(), so the database hands them over
+in chunks and no Student objects are created. Each format turns a chunk of
+tuples into text (or zip bytes for XLSX) and yields it straight into a
+StreamingHttpResponse, so memory use stays flat however many students there
+are, and the first bytes (the header) are sent before the first query runs.
+
+Usage:
+    response = export_response(Student.objects.all(), 'csv')
+"""
+
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+
+# Columns in every export, in order
+EXPORT_FIELDS = [
+    'id', 'roll_number', 'first_name', 'last_name', 'email', 'grade', 'age',
+    'date_of_birth', 'address', 'phone_number', 'is_active',
+    'date_of_registration', 'updated_at',
+]
+
+# Rows fetched from the database (and written out) at a time
+CHUNK_SIZE = 2000
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def iter_chunks(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Yield lists of up to chunk_size value tuples from the queryset.
+    """
+    rows = queryset.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _plain(value):
+    # JSON/CSV friendly form of dates and datetimes
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def stream_csv(queryset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+    for chunk in iter_chunks(queryset):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+
+def stream_ndjson(queryset):
+    # An empty first chunk gets the response headers out immediately
+    yield ''
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for chunk in iter_chunks(queryset):
+        yield ''.join(
+            encode(dict(zip(EXPORT_FIELDS, map(_plain, row)))) + '\n'
+            for row in chunk
+        )
+
+
+# ---------------------------------------------------------------------------
+# XLSX
+#
+# An .xlsx file is a zip of XML documents. zipfile can write to a stream it
+# cannot seek in, so the worksheet is written row by row into a buffer that
+# is emptied after every chunk. Strings are stored inline, which avoids the
+# shared-strings table (that would need every value in memory).
+# ---------------------------------------------------------------------------
+
+XLSX_STATIC_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Students" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+class _ChunkBuffer:
+    """
+    Write-only file object that collects bytes until drain() is called.
+
+    It has no tell()/seek(), which makes zipfile use streaming mode.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(str(_plain(value)))}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return '<row>' + ''.join(map(_xlsx_cell, values)) + '</row>'
+
+
+def stream_xlsx(queryset):
+    buffer = _ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_STATIC_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(EXPORT_FIELDS).encode())
+            for chunk in iter_chunks(queryset):
+                sheet.write(''.join(map(_xlsx_row, chunk)).encode())
+                yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    # Closing the archive writes the zip directory
+    yield buffer.drain()
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'ndjson': stream_ndjson,
+    'xlsx': stream_xlsx,
+}
+
+
+def export_response(queryset, fmt, filename='students'):
+    """
+    Return a StreamingHttpResponse exporting queryset in format fmt
+    ('csv', 'ndjson' or 'xlsx'). Raises KeyError for other formats.
+    """
+    streamer = STREAMERS[fmt]
+    response = StreamingHttpResponse(streamer(queryset), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
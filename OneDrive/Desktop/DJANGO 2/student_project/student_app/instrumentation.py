@@ -0,0 +1,275 @@
+"""
+Per-request cost: SQL queries, template rendering and view time.
+
+RequestTimingMiddleware measures a sample of requests (STUDENT_TIMING_SAMPLE_RATE,
+0.0-1.0) and for each one:
+
+- adds a Server-Timing header, which browser dev tools show in the
+  network panel, e.g.
+      Server-Timing: db;dur=3.1;desc="4 queries", tpl;dur=5.2, view;dur=9.8, total;dur=11.0
+- writes one JSON log line to the "student_app.requests" logger, and a
+  warning when the same query ran many times (a likely N+1: a query per
+  row of a list, e.g. from a relation read inside a template loop).
+
+Queries are seen through sql_hook(): every connection runs its queries
+through one execute_wrapper (installed when it connects), which calls the
+hooks active in the current context - and only those, so requests that
+aren't sampled pass straight through. The hooks live in a ContextVar, so
+they also see the queries an async view runs in sync_to_async() threads,
+which have database connections of their own.
+Streaming responses are measured up to the point the response is returned.
+The middleware works for sync and async requests alike (under ASGI no
+thread is spent on it).
+
+collect() gives the same numbers for any block of code:
+    with collect() as stats:
+        render_rows(students)
+    print(stats.queries, stats.n_plus_one())
+"""
+
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+
+logger = logging.getLogger('student_app.requests')
+
+# The same SQL this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+# Stats of the request being measured in this thread/task (None if not sampled)
+_current = ContextVar('student_request_stats', default=None)
+
+# execute_wrapper() callables active in this thread/task (see sql_hook())
+_sql_hooks = ContextVar('student_sql_hooks', default=())
+
+
+class RequestStats:
+    """
+    What one request (or collect() block) spent its time on.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.view_started = None
+        self.view_seconds = 0.0
+        # SQL text with placeholders -> times run, and exact (sql, params) repeats
+        self.statements = Counter()
+        self.exact = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.queries += 1
+            self.statements[sql] += 1
+            if not many:
+                self.exact[(sql, repr(params))] += 1
+
+    @property
+    def duplicates(self):
+        """
+        Queries that repeated an earlier query exactly (same SQL and params).
+        """
+        return sum(n - 1 for n in self.exact.values() if n > 1)
+
+    def n_plus_one(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """
+        Return {sql: times} for statements run at least `threshold` times.
+        """
+        return {sql: n for sql, n in self.statements.items() if n >= threshold}
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f'tpl;dur={self.template_seconds * 1000:.1f}, '
+            f'view;dur={self.view_seconds * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+
+
+def current_stats():
+    """
+    RequestStats of the request being measured, or None if it isn't sampled.
+    """
+    return _current.get()
+
+
+def _run_sql_hooks(execute, sql, params, many, context):
+    hooks = _sql_hooks.get()
+    if not hooks:
+        return execute(sql, params, many, context)
+    # The first hook added is the outermost, as with execute_wrapper()
+    for hook in reversed(hooks):
+        execute = partial(hook, execute)
+    return execute(sql, params, many, context)
+
+
+def install_sql_hooks(sender=None, connection=None, **kwargs):
+    """
+    connection_created receiver: pass the connection's queries to sql_hook()s.
+    """
+    if _run_sql_hooks not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_run_sql_hooks)
+
+
+@contextmanager
+def sql_hook(hook):
+    """
+    Call hook - an execute_wrapper() callable - for every query run in this
+    context until the block ends, on any connection and in any thread that
+    sync_to_async() hands the work to.
+    """
+    # Connections opened before the receiver was connected
+    for connection in connections.all():
+        install_sql_hooks(connection=connection)
+    token = _sql_hooks.set(_sql_hooks.get() + (hook,))
+    try:
+        yield hook
+    finally:
+        _sql_hooks.reset(token)
+
+
+@contextmanager
+def collect():
+    """
+    Record queries and template time for the block; yields RequestStats.
+    """
+    _instrument_templates()
+    stats = RequestStats()
+    token = _current.set(stats)
+    try:
+        with sql_hook(stats):
+            yield stats
+    finally:
+        _current.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# Template timing
+#
+# Django has no hook around template rendering outside the test runner, so
+# Template.render is wrapped once per process. Only the outermost render is
+# timed (includes and {% for %} bodies are part of it), and only while a
+# request is being measured.
+# ---------------------------------------------------------------------------
+
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    stats = _current.get()
+    if stats is None or stats.template_depth:
+        return _original_render(self, context)
+    stats.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        stats.template_depth -= 1
+        stats.template_seconds += time.perf_counter() - start
+
+
+def _instrument_templates():
+    if Template.render is not _timed_render:
+        Template.render = _timed_render
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+class RequestTimingMiddleware:
+    """
+    Measure a sample of requests; see the module docstring.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Django runs a sync process_view() in a thread under ASGI
+            self.process_view = self.aprocess_view
+        _instrument_templates()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        with collect() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        with collect() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, stats)
+
+    def sampled(self):
+        rate = getattr(settings, 'STUDENT_TIMING_SAMPLE_RATE', 1.0)
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def finish(self, request, response, stats):
+        total = time.perf_counter() - stats.started
+        if stats.view_started is not None:
+            stats.view_seconds = time.perf_counter() - stats.view_started
+
+        response['Server-Timing'] = stats.server_timing(total)
+        self.log(request, response, stats, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.view_starting()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.view_starting()
+
+    def view_starting(self):
+        stats = _current.get()
+        if stats is not None:
+            stats.view_started = time.perf_counter()
+
+    def log(self, request, response, stats, total):
+        suspects = stats.n_plus_one()
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'view_ms': round(stats.view_seconds * 1000, 2),
+            'template_ms': round(stats.template_seconds * 1000, 2),
+            'db_ms': round(stats.sql_seconds * 1000, 2),
+            'queries': stats.queries,
+            'duplicate_queries': stats.duplicates,
+        }
+        if suspects:
+            record['n_plus_one'] = [{'sql': sql, 'count': n} for sql, n in suspects.items()]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
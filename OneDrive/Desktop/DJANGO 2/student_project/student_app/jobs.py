@@ -0,0 +1,438 @@
+"""
+Background jobs: long student operations run outside the web request.
+
+A view (or the admin, or the shell) queues a job instead of doing the work:
+
+    job = enqueue('export_students', {'format': 'xlsx', 'search': 'kumar'})
+
+and `python manage.py run_jobs` runs it. The queue is the Job table, so no
+separate broker (Redis, RabbitMQ, ...) is needed and queued jobs survive a
+restart:
+
+- the worker claims the oldest due job with a conditional UPDATE, so
+  several run_jobs processes can share the queue without running a job
+  twice; each process runs up to --threads jobs at once in a thread pool;
+- a job function receives a JobContext and calls context.progress(done,
+  total) as it goes. Progress is written to the Job row (at most every
+  PROGRESS_INTERVAL seconds), where GET /jobs/<id>/ and the admin read it;
+- a job that raises is retried after STUDENT_JOB_RETRY_DELAY seconds,
+  doubling each time, until it has been tried max_attempts times (default
+  STUDENT_JOB_MAX_ATTEMPTS). Raising JobFailed fails it without retrying;
+- cancel() stops a queued job at once; a running job stops at its next
+  progress() call (work it has already committed stays);
+- the worker refreshes the heartbeat of its running jobs every poll. A
+  running job whose heartbeat is older than STALE_AFTER seconds (its worker
+  was killed) is put back in the queue when a worker starts.
+
+Threads rather than processes, because SQLite takes one writer at a time
+and the jobs spend their time in the database: more processes would mostly
+wait for each other. Run another run_jobs process for more.
+
+Jobs are functions registered with @job('name'); the built-in ones are at
+the end of this module. Files a job writes (exports) go to STUDENT_JOB_DIR
+and are downloaded from /jobs/<id>/file/; files the import_students job
+reads must be in STUDENT_IMPORT_DIR.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Job, Student
+from .sqlite_profile import lock_for_write
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress writes of one job
+PROGRESS_INTERVAL = 0.5
+
+# A running job without a heartbeat for this long has lost its worker
+STALE_AFTER = 300
+
+# Defaults for settings.STUDENT_JOB_MAX_ATTEMPTS / STUDENT_JOB_RETRY_DELAY
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_DELAY = 30
+
+# Job kind -> function(context, **params)
+REGISTRY = {}
+
+
+def job(name):
+    """
+    Decorator registering a function as the job kind `name`.
+    """
+    def register(func):
+        REGISTRY[name] = func
+        return func
+    return register
+
+
+class JobCancelled(Exception):
+    """
+    Raised by JobContext.progress() when the job has been cancelled.
+    """
+
+
+class JobFailed(Exception):
+    """
+    Raise in a job to fail it without retrying (e.g. for bad parameters).
+    """
+
+
+def job_dir():
+    return Path(getattr(settings, 'STUDENT_JOB_DIR', Path(settings.BASE_DIR) / 'jobs'))
+
+
+def import_dir():
+    return Path(getattr(settings, 'STUDENT_IMPORT_DIR', Path(settings.BASE_DIR) / 'imports'))
+
+
+def import_path(path):
+    """
+    The file `path` names inside STUDENT_IMPORT_DIR (relative to it, or
+    absolute); JobFailed for anything that resolves outside it.
+
+    Jobs are queued over HTTP, so an import must not read arbitrary files
+    of the server (settings, the database, /etc/...). Symlinks and ".."
+    are resolved before the check.
+    """
+    root = import_dir().resolve()
+    resolved = (root / path).resolve()
+    if not resolved.is_relative_to(root):
+        raise JobFailed(f'{path} is outside STUDENT_IMPORT_DIR.')
+    if not resolved.is_file():
+        raise JobFailed(f'No such file in STUDENT_IMPORT_DIR: {path}')
+    return resolved
+
+
+class JobContext:
+    """
+    Handed to a job function: progress reporting and cancellation.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self._last_write = 0.0
+
+    def progress(self, done, total=None, message=None, force=False):
+        """
+        Record progress; raises JobCancelled if the job has been cancelled.
+
+        Only writes to the database every PROGRESS_INTERVAL seconds, so it
+        is cheap to call often.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        changes = {'progress_done': done, 'heartbeat_at': timezone.now()}
+        if total is not None:
+            changes['progress_total'] = total
+        if message is not None:
+            changes['message'] = message[:200]
+        Job.objects.filter(pk=self.job.pk).update(**changes)
+        if Job.objects.filter(pk=self.job.pk, cancel_requested=True).exists():
+            raise JobCancelled(self.job.pk)
+
+
+# ---------------------------------------------------------------------------
+# Queue operations
+# ---------------------------------------------------------------------------
+
+def enqueue(kind, params=None, max_attempts=None):
+    """
+    Queue a job and return it. Raises ValueError for an unknown kind.
+    """
+    if kind not in REGISTRY:
+        raise ValueError(f'Unknown job kind: {kind}')
+    if max_attempts is None:
+        max_attempts = getattr(settings, 'STUDENT_JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    return Job.objects.create(kind=kind, params=params or {}, max_attempts=max_attempts)
+
+
+def cancel(job_id):
+    """
+    Cancel a job: a queued one at once, a running one at its next progress
+    report. Returns False if the job has already finished (or doesn't exist).
+    """
+    now = timezone.now()
+    if Job.objects.filter(pk=job_id, status=Job.QUEUED).update(status=Job.CANCELLED, finished_at=now):
+        return True
+    return bool(Job.objects.filter(pk=job_id, status=Job.RUNNING).update(cancel_requested=True))
+
+
+def claim(worker):
+    """
+    Mark the oldest due queued job as running for this worker and return
+    it, or None if there is none.
+    """
+    while True:
+        now = timezone.now()
+        pk = (Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+              .order_by('run_after', 'pk').values_list('pk', flat=True).first())
+        if pk is None:
+            return None
+        # Only one worker's UPDATE can still find the job queued
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, attempts=F('attempts') + 1,
+            started_at=now, heartbeat_at=now, finished_at=None,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+
+def requeue_stale(stale_after=STALE_AFTER):
+    """
+    Put running jobs whose worker stopped sending heartbeats back in the
+    queue (or fail them when they are out of attempts). Returns the count.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=timezone.now(), error='The worker running this job stopped.')
+    requeued = stale.update(status=Job.QUEUED, run_after=timezone.now())
+    return failed + requeued
+
+
+def run_job(job, retry_delay=None):
+    """
+    Run one claimed job and record how it ended.
+    """
+    if retry_delay is None:
+        retry_delay = getattr(settings, 'STUDENT_JOB_RETRY_DELAY', DEFAULT_RETRY_DELAY)
+    context = JobContext(job)
+    try:
+        func = REGISTRY.get(job.kind)
+        if func is None:
+            raise JobFailed(f'Unknown job kind: {job.kind}')
+        result = func(context, **job.params)
+    except JobCancelled:
+        finish(job, Job.CANCELLED)
+    except Exception as exc:
+        logger.exception('Job %s (%s) failed', job.pk, job.kind)
+        error = traceback.format_exc()
+        # A TypeError here is usually a wrong parameter: trying again won't help
+        permanent = isinstance(exc, (JobFailed, TypeError)) or job.attempts >= job.max_attempts
+        if Job.objects.filter(pk=job.pk, cancel_requested=True).exists():
+            finish(job, Job.CANCELLED, error=error)
+        elif permanent:
+            finish(job, Job.FAILED, error=error)
+        else:
+            # Wait longer after each failed attempt
+            delay = retry_delay * 2 ** (job.attempts - 1)
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED, error=error, worker='',
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+    else:
+        finish(job, Job.SUCCEEDED, result=result)
+
+
+def finish(job, status, result=None, error=''):
+    changes = {'status': status, 'finished_at': timezone.now(), 'result': result}
+    if error:
+        changes['error'] = error
+    if status == Job.SUCCEEDED:
+        # A finished job is complete, whatever it last reported
+        changes['progress_done'] = Coalesce('progress_total', 'progress_done')
+    Job.objects.filter(pk=job.pk).update(**changes)
+
+
+def job_status(job):
+    """
+    The job as a JSON-ready dict, for the status endpoint.
+    """
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': {'done': job.progress_done, 'total': job.progress_total, 'percent': job.percent},
+        'message': job.message,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'cancel_requested': job.cancel_requested,
+        'result': job.result,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at and job.started_at.isoformat(),
+        'finished_at': job.finished_at and job.finished_at.isoformat(),
+    }
+
+
+class Worker:
+    """
+    Runs queued jobs in a thread pool until stopped; see the module docstring.
+    """
+
+    def __init__(self, threads=2, poll=1.0, name=None):
+        self.threads = threads
+        self.poll = poll
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = threading.Event()
+
+    def stop(self):
+        """
+        Start no more jobs; run() returns once the running ones finish.
+        """
+        self.stopping.set()
+
+    def run(self, once=False):
+        """
+        Run jobs. With once=True, return when the queue is empty.
+        Returns the number of jobs run.
+        """
+        requeue_stale()
+        count = 0
+        running = {}
+        with ThreadPoolExecutor(self.threads, thread_name_prefix='student-job') as pool:
+            while True:
+                while len(running) < self.threads and not self.stopping.is_set():
+                    job = claim(self.name)
+                    if job is None:
+                        break
+                    running[pool.submit(self._run, job)] = job.pk
+                    count += 1
+                if not running and (once or self.stopping.is_set()):
+                    return count
+                if running:
+                    done, _ = wait(running, timeout=self.poll, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        del running[future]
+                    Job.objects.filter(pk__in=running.values()).update(heartbeat_at=timezone.now())
+                else:
+                    self.stopping.wait(self.poll)
+
+    def _run(self, job):
+        try:
+            run_job(job)
+        finally:
+            # Each pool thread has its own connection
+            connections.close_all()
+
+
+# ---------------------------------------------------------------------------
+# Built-in jobs
+# ---------------------------------------------------------------------------
+
+@job('import_students')
+def import_students(context, path, format=None, batch_size=1000, dry_run=False):
+    """
+    Import a CSV or NDJSON file from STUDENT_IMPORT_DIR, as
+    `manage.py import_students` does.
+    """
+    from .management.commands.import_students import Command, read_csv, read_ndjson
+
+    path = import_path(path)
+    fmt = format or ('ndjson' if path.suffix in ('.ndjson', '.jsonl') else 'csv')
+    with path.open('rb') as counting:
+        total = sum(1 for _ in counting) - (1 if fmt == 'csv' else 0)
+
+    def counted(reader):
+        for rows, row in enumerate(reader, start=1):
+            context.progress(min(rows, total), total, f'{rows} rows read')
+            yield row
+
+    with path.open(newline='', encoding='utf-8') as stream:
+        reader = read_ndjson(stream) if fmt == 'ndjson' else read_csv(stream)
+        return Command().run(counted(reader), batch_size, dry_run, None)
+
+
+@job('export_students')
+def export_students(context, format='csv', search=''):
+    """
+    Write an export file (see export.py) to STUDENT_JOB_DIR.
+    """
+    from .counters import get_total
+    from .export import CHUNK_SIZE, STREAMERS
+    from .search import search_students
+
+    if format not in STREAMERS:
+        raise JobFailed(f'Unknown export format: {format}')
+    students = Student.objects.all()
+    if search:
+        students = search_students(students, search)
+    total = students.count() if search else get_total()
+
+    directory = job_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    target = directory / f'job-{context.job.pk}-students.{format}'
+    with target.open('wb') as output:
+        # Every piece after the first (the header) holds up to CHUNK_SIZE rows
+        for pieces, data in enumerate(STREAMERS[format](students)):
+            output.write(data if isinstance(data, bytes) else data.encode())
+            context.progress(min(pieces * CHUNK_SIZE, total), total)
+    return {'file': target.name, 'bytes': target.stat().st_size, 'rows': total}
+
+
+@job('update_grades')
+def update_grades(context, grade, from_grade=None, ids=None, chunk_size=5000):
+    """
+    Set the grade of many students (those with ids, or with from_grade, or
+    all), one transaction per chunk.
+    """
+    from .response_cache import invalidate_all_students
+
+    if grade not in dict(Student.GRADE_CHOICES):
+        raise JobFailed(f'Unknown grade: {grade}')
+    students = Student.objects.all()
+    if ids is not None:
+        students = students.filter(pk__in=ids)
+    if from_grade is not None:
+        students = students.filter(grade=from_grade)
+    pks = list(students.order_by('pk').values_list('pk', flat=True))
+
+    updated = 0
+    now = timezone.now()
+    try:
+        for start in range(0, len(pks), chunk_size):
+            chunk = pks[start:start + chunk_size]
+            with transaction.atomic():
+                # The search index trigger reads before it writes: take the
+                # lock first so web processes' commits can't fail the chunk
+                lock_for_write(Student._meta.db_table)
+                # One UPDATE per chunk; triggers keep counters and the change feed
+                updated += Student.objects.filter(pk__in=chunk).update(grade=grade, updated_at=now)
+            context.progress(start + len(chunk), len(pks))
+    finally:
+        # Also when cancelled or failed part way: the chunks before are
+        # committed. One cache write retires every page, instead of a
+        # version bump per student (see rollover.py)
+        if updated:
+            invalidate_all_students()
+    return {'updated': updated}
+
+
+@job('student_report')
+def student_report(context):
+    """
+    Summary counts: per grade and status, per age, and registrations per month.
+    """
+    from .counters import get_counts
+
+    context.progress(0, 3, 'Counting', force=True)
+    report = {'counts': get_counts()}
+    context.progress(1, 3, 'Ages', force=True)
+    report['by_age'] = {
+        row['age']: row['students']
+        for row in Student.objects.order_by('age').values('age').annotate(students=Count('pk'))
+    }
+    context.progress(2, 3, 'Registrations', force=True)
+    report['registrations_by_month'] = {
+        row['month'].strftime('%Y-%m'): row['students']
+        for row in Student.objects.order_by().annotate(month=TruncMonth('date_of_registration'))
+        .values('month').annotate(students=Count('pk')).order_by('month')
+    }
+    return report
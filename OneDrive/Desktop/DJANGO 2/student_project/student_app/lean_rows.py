@@ -0,0 +1,199 @@
+"""
+Lean rendering of the student list rows.
+
+The row template (_student_row.html) is easy to read but costly per row:
+each row is a full Student instance (every column, including the long
+address), three {% url %} reversals, get_grade_display() and the date
+filter, all through the template engine.
+
+This module renders the same table row from a values() projection of just
+the displayed columns (LIST_FIELDS):
+
+- grade labels come from a dict built once from Student.GRADE_CHOICES;
+- the detail/edit/delete URLs are "<prefix><pk><suffix>", with the prefix
+  and suffix found by reversing each URL once (per script prefix/URLconf);
+- dates are formatted with the month names of the active language;
+- each row is one str.format() of ROW_HTML, with html.escape() on the text
+  columns (the same escaping as the template's autoescape).
+
+Usage:
+    rows = Student.objects.values(*LIST_FIELDS)[:100]
+    html = render_rows(rows)             # one string
+    for chunk in iter_rows(rows): ...    # or piece by piece, for streaming
+
+render_list_page() renders the whole list page. Pages of at least
+STUDENT_LIST_STREAM_ROWS rows are streamed: the top of the page goes out
+first, then the rows in chunks, so a very long page starts arriving at once
+and is never held in memory as one string. Streamed pages are not stored in
+the page cache (response_cache.py only keeps ordinary responses).
+
+`python manage.py bench_lean_rows` compares it with the template.
+"""
+
+from html import escape
+from itertools import chain
+from secrets import token_hex
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import get_script_prefix, get_urlconf, reverse
+from django.utils.dates import MONTHS_3
+from django.utils.safestring import mark_safe
+from django.utils.text import capfirst
+
+from .models import Student
+
+
+# Columns the list table shows, plus the keys pagination and caching need
+LIST_FIELDS = (
+    'id', 'roll_number', 'first_name', 'last_name', 'email', 'grade', 'age',
+    'is_active', 'date_of_registration', 'updated_at',
+)
+
+# grade -> escaped label, as get_grade_display() would give
+GRADE_LABELS = {value: escape(str(label)) for value, label in Student.GRADE_CHOICES}
+
+# Rows joined per chunk by iter_rows()
+CHUNK_ROWS = 500
+
+# Pages with this many rows are streamed (STUDENT_LIST_STREAM_ROWS overrides)
+DEFAULT_STREAM_ROWS = 1000
+
+# Stands in for the pk when reversing a row URL once
+_PK_PLACEHOLDER = 9182736450
+
+# (script prefix, urlconf) -> {url name: (prefix, suffix)}
+_url_templates = {}
+
+# The markup of _student_row.html, without its comments and indentation
+ROW_HTML = (
+    '<tr>'
+    '<td><strong>{roll_number}</strong></td>'
+    '<td><a href="{detail}">{first_name}</a></td>'
+    '<td>{last_name}</td>'
+    '<td><a href="mailto:{email}">{email}</a></td>'
+    '<td><span class="badge bg-primary">{grade}</span></td>'
+    '<td>{age}</td>'
+    '<td>{status}</td>'
+    '<td>{registered}</td>'
+    '<td>'
+    '<a href="{detail}" class="btn btn-sm btn-info" title="View details"><i class="fas fa-eye"></i></a>\n'
+    '<a href="{update}" class="btn btn-sm btn-warning" title="Edit student"><i class="fas fa-edit"></i></a>\n'
+    '<a href="{delete}" class="btn btn-sm btn-danger" title="Delete student"><i class="fas fa-trash"></i></a>'
+    '</td>'
+    '</tr>\n'
+)
+
+STATUS_HTML = {
+    True: '<span class="badge bg-success">Active</span>',
+    False: '<span class="badge bg-danger">Inactive</span>',
+}
+
+
+def url_templates():
+    """
+    Return {url name: (prefix, suffix)} for the three row links.
+
+    Reversing is the slowest part of a templated row, and only the pk
+    changes between rows, so each URL is reversed once with a placeholder
+    pk and split around it. Cached per script prefix and URLconf, which
+    is all reverse() depends on here.
+    """
+    key = (get_script_prefix(), get_urlconf())
+    templates = _url_templates.get(key)
+    if templates is None:
+        templates = {}
+        for name in ('student_detail', 'student_update', 'student_delete'):
+            prefix, _, suffix = reverse(name, args=[_PK_PLACEHOLDER]).partition(str(_PK_PLACEHOLDER))
+            templates[name] = (prefix, suffix)
+        _url_templates[key] = templates
+    return templates
+
+
+def _month_names():
+    # "M" of the date filter: the abbreviated month in the active language
+    return {number: capfirst(str(name)) for number, name in MONTHS_3.items()}
+
+
+def iter_rows(rows, chunk_rows=CHUNK_ROWS):
+    """
+    Return an iterator of the HTML of the table rows, chunk_rows rows at a time.
+
+    rows are dicts with (at least) the LIST_FIELDS keys, in display order.
+    The URLs and month names are looked up now, while the request's URLconf
+    and language are active, not when a streamed response is sent.
+    """
+    return _iter_rows(rows, url_templates(), _month_names(), chunk_rows)
+
+
+def _iter_rows(rows, urls, months, chunk_rows):
+    detail_prefix, detail_suffix = urls['student_detail']
+    update_prefix, update_suffix = urls['student_update']
+    delete_prefix, delete_suffix = urls['student_delete']
+    grades = GRADE_LABELS
+    fmt = ROW_HTML.format
+
+    parts = []
+    for row in rows:
+        pk = row['id']
+        registered = row['date_of_registration']
+        grade = row['grade']
+        parts.append(fmt(
+            roll_number=row['roll_number'],
+            first_name=escape(row['first_name']),
+            last_name=escape(row['last_name']),
+            email=escape(row['email']),
+            grade=grades.get(grade) or escape(grade),
+            age=row['age'],
+            status=STATUS_HTML[bool(row['is_active'])],
+            registered=f'{months[registered.month]} {registered.day:02d}, {registered.year}',
+            detail=f'{detail_prefix}{pk}{detail_suffix}',
+            update=f'{update_prefix}{pk}{update_suffix}',
+            delete=f'{delete_prefix}{pk}{delete_suffix}',
+        ))
+        if len(parts) == chunk_rows:
+            yield ''.join(parts)
+            parts = []
+    if parts:
+        yield ''.join(parts)
+
+
+def render_rows(rows):
+    """
+    Return the HTML of all the table rows, marked safe for a template.
+    """
+    return mark_safe(''.join(iter_rows(rows)))
+
+
+def render_list_page(request, template_name, context, rows, asynchronous=False):
+    """
+    render() for a list page whose table rows are rows (see the module docstring).
+
+    The rows go into the template as context['student_rows']. Pass
+    asynchronous=True from an async view, so a streamed page is sent
+    without a thread.
+    """
+    threshold = getattr(settings, 'STUDENT_LIST_STREAM_ROWS', DEFAULT_STREAM_ROWS)
+    if len(rows) < threshold:
+        html = render_to_string(template_name, {**context, 'student_rows': render_rows(rows)}, request)
+        return HttpResponse(html)
+
+    # Render the page around a marker, then send the rows in its place
+    marker = f'<!--student-rows-{token_hex(8)}-->'
+    html = render_to_string(template_name, {**context, 'student_rows': mark_safe(marker)}, request)
+    head, _, tail = html.partition(marker)
+    chunks = iter_rows(rows)
+    if asynchronous:
+        content = _achain(head, chunks, tail)
+    else:
+        content = chain([head], chunks, [tail])
+    return StreamingHttpResponse(content, content_type='text/html; charset=utf-8')
+
+
+async def _achain(head, chunks, tail):
+    # Under ASGI a plain iterator would be read through a thread, chunk by chunk
+    yield head
+    for chunk in chunks:
+        yield chunk
+    yield tail
@@ -0,0 +1 @@
+# Management commands for student_app live in the commands/ package
@@ -0,0 +1 @@
+# Each module in this package is a "python manage.py <name>" command
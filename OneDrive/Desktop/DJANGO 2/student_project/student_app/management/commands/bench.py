@@ -0,0 +1,123 @@
+"""
+Load-test the student pages and write the numbers as JSON.
+
+Usage:
+    python manage.py bench
+    python manage.py bench --rows 50000 --requests 500 --concurrency 16
+    python manage.py bench --scenarios list detail --output bench.json
+    python manage.py bench --output new.json --compare old.json
+
+Seeds a fresh database file with synthetic students from synthetic.py (the
+real database is never touched), then runs each scenario from benchmarks.py:
+student_list with and without search, student_detail, student_create, student_update and
+the admin changelist. For each it reports p50/p95/p99 latency, requests per
+second, SQL queries per request and peak memory. --output saves the results
+with the git commit they were measured on; --compare prints the change
+against an earlier file.
+"""
+
+import json
+import platform
+import sqlite3
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from student_app.benchmarks import SCENARIOS, BenchContext, run_scenario
+from student_app.management.commands.bench_sqlite_concurrency import temporary_database
+from student_app.synthetic import load_students
+
+
+def git_revision():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the student list/detail/create/update pages and the admin changelist.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help='Synthetic students to seed.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic students.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads sending requests.')
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Earlier JSON results to compare against.')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('bench seeds a temporary SQLite database; it needs the SQLite backend.')
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1.')
+        previous = self.load(options['compare']) if options['compare'] else None
+
+        with tempfile.TemporaryDirectory() as directory, temporary_database(Path(directory) / 'bench.sqlite3'):
+            call_command('migrate', verbosity=0)
+            loaded = load_students(options['rows'], seed=options['seed'])
+            self.stdout.write(f"Seeded {options['rows']:,} students in {loaded['seconds']:.1f}s")
+
+            context = BenchContext()
+            results = {}
+            for name in options['scenarios']:
+                results[name] = run_scenario(name, options['requests'], options['concurrency'], context)
+                self.report(name, results[name], previous)
+
+        report = {
+            'meta': {
+                'commit': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'rows': options['rows'],
+                'seed': options['seed'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def load(self, path):
+        try:
+            return json.loads(Path(path).read_text())['scenarios']
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+
+    def report(self, name, result, previous):
+        latency = result['latency_ms']
+        line = (
+            f"{name:<17}{result['requests_per_sec']:>8.1f} req/s  "
+            f"p50 {latency['p50']:>7.1f}ms  p95 {latency['p95']:>7.1f}ms  p99 {latency['p99']:>7.1f}ms  "
+            f"{result['queries_per_request']:>5.1f} queries"
+        )
+        if result['peak_rss_mb'] is not None:
+            line += f"  {result['peak_rss_mb']:>6.0f} MB"
+        if result['errors']:
+            line += f"  {result['errors']} errors {result['statuses']}"
+        self.stdout.write(line)
+
+        before = (previous or {}).get(name)
+        if before:
+            def change(new, old):
+                return f'{(new - old) / old:+.0%}' if old else 'n/a'
+            self.stdout.write(
+                f"{'':<17}vs earlier: req/s {change(result['requests_per_sec'], before['requests_per_sec'])}, "
+                f"p95 {change(latency['p95'], before['latency_ms']['p95'])}, "
+                f"queries {change(result['queries_per_request'], before['queries_per_request'])}"
+            )
@@ -0,0 +1,100 @@
+"""
+Compare the WSGI and ASGI paths as the number of concurrent requests grows.
+
+Usage:
+    python manage.py bench_asgi
+    python manage.py bench_asgi --rows 50000 --concurrency 1 16 64 --requests 2000
+    python manage.py bench_asgi --scenarios detail --output asgi.json
+
+Seeds a fresh database file with synthetic students (the real database is
+never touched) and sends the same mix of list, search and detail requests
+through three handlers at each concurrency level:
+
+- wsgi              Django's WSGI handler from that many threads
+- asgi_sync_views   Django's ASGI handler with the usual sync views
+- asgi_async_views  student_project.asgi's handler with the async views
+
+and prints requests per second and p50/p95/p99 latency for each, so you
+can see which one keeps its throughput as concurrency goes up.
+"""
+
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from student_app.benchmarks import (
+    SERVER_HOST, SERVER_SCENARIOS, BenchContext, run_server_mode, server_modes, server_requests,
+)
+from student_app.management.commands.bench import git_revision
+from student_app.management.commands.bench_sqlite_concurrency import temporary_database
+from student_app.synthetic import load_students
+
+
+class Command(BaseCommand):
+    help = 'Benchmark WSGI against ASGI (sync and async views) at several concurrency levels.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help='Synthetic students to seed.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per mode and level.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64])
+        parser.add_argument('--scenarios', nargs='+', choices=SERVER_SCENARIOS, default=list(SERVER_SCENARIOS))
+        parser.add_argument('--modes', nargs='+', choices=list(server_modes()), default=list(server_modes()))
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('bench_asgi seeds a temporary SQLite database; it needs the SQLite backend.')
+        if options['requests'] < 1 or min(options['concurrency']) < 1:
+            raise CommandError('--requests and --concurrency must be at least 1.')
+
+        # One log line per request would drown the results
+        request_log = logging.getLogger('student_app.requests')
+        hosts = [*settings.ALLOWED_HOSTS, SERVER_HOST]
+        results = {}
+        with tempfile.TemporaryDirectory() as directory, \
+                temporary_database(Path(directory) / 'bench.sqlite3'), \
+                override_settings(ALLOWED_HOSTS=hosts):
+            call_command('migrate', verbosity=0)
+            load_students(options['rows'])
+            pairs = server_requests(options['scenarios'], options['requests'], BenchContext())
+
+            request_log.disabled = True
+            try:
+                self.stdout.write(f"{'mode':<18}{'conc':>5}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+                for concurrency in options['concurrency']:
+                    for mode in options['modes']:
+                        result = run_server_mode(mode, pairs, concurrency)
+                        results.setdefault(mode, {})[str(concurrency)] = result
+                        self.report(mode, result)
+            finally:
+                request_log.disabled = False
+
+        if options['output']:
+            report = {
+                'meta': {
+                    'commit': git_revision(),
+                    'rows': options['rows'],
+                    'requests': options['requests'],
+                    'scenarios': options['scenarios'],
+                },
+                'modes': results,
+            }
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def report(self, mode, result):
+        latency = result['latency_ms']
+        line = (
+            f"{mode:<18}{result['concurrency']:>5}{result['requests_per_sec']:>9.1f}"
+            f"{latency['p50']:>8.1f}ms{latency['p95']:>7.1f}ms{latency['p99']:>7.1f}ms"
+        )
+        if result['errors']:
+            line += f"  {result['errors']} errors {result['statuses']}"
+        self.stdout.write(line)
@@ -0,0 +1,69 @@
+"""
+Benchmark building the student list rows: row template vs lean projection.
+
+Usage:
+    python manage.py bench_lean_rows
+    python manage.py bench_lean_rows --rows 20000 --repeat 5
+
+Each timing covers fetching one page of --rows students and producing the
+HTML of their table rows:
+
+- template         Student objects through _student_row.html, no caching
+- row cache, warm  Student objects, every row already in the fragment cache
+- lean             a values() projection through lean_rows.render_rows()
+
+Synthetic students are inserted inside a transaction that is rolled back,
+so the real data is never changed.
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import engines
+
+from student_app.lean_rows import LIST_FIELDS, render_rows as render_lean_rows
+from student_app.management.commands.bench_row_cache import UNCACHED_TEMPLATE
+from student_app.models import Student
+from student_app.pagination import ORDERING
+from student_app.row_cache import render_rows
+from student_app.synthetic import load_students
+
+
+class Command(BaseCommand):
+    help = 'Compare student list row building: row template vs row cache vs lean projection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.bench(options['rows'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def bench(self, rows, repeat):
+        load_students(rows)
+        students = Student.objects.order_by(*ORDERING)[:rows]
+        projection = Student.objects.order_by(*ORDERING).values(*LIST_FIELDS)[:rows]
+        template = engines['django'].from_string(UNCACHED_TEMPLATE)
+
+        def timed(func):
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func()
+                samples.append((time.perf_counter() - start) * 1000)
+            return statistics.median(samples)
+
+        render_rows(list(students))  # fill the row cache
+        results = {
+            'template': timed(lambda: template.render({'students': list(students)})),
+            'row cache, warm': timed(lambda: render_rows(list(students))),
+            'lean': timed(lambda: render_lean_rows(list(projection))),
+        }
+        self.stdout.write(f'{rows} rows (fetch + render), median of {repeat} runs:')
+        for name, ms in results.items():
+            speedup = results['template'] / ms if ms else 0
+            self.stdout.write(f'  {name:<16} {ms:9.1f} ms  {speedup:5.1f}x')
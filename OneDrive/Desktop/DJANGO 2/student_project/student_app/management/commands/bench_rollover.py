@@ -0,0 +1,88 @@
+"""
+Benchmark the year-end rollover and check it row by row.
+
+Usage:
+    python manage.py bench_rollover
+    python manage.py bench_rollover --rows 100000 --map F=D --chunk-size 5000
+
+Loads --rows synthetic students into a fresh database file in a temporary
+directory (the real database is never touched), with ages computed one year
+before today, so every age is stale. Then:
+
+1. rollover.rollover() brings the ages to today and applies --map;
+2. rollover.verify() recomputes every student in Python (age_on() and the
+   mapping) and compares;
+3. counters.reconcile() recounts the table and compares with the counters
+   the triggers maintained;
+4. a second rollover with no transitions must find nothing to update.
+
+Exits with status 1 when any check fails.
+"""
+
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from student_app import rollover
+from student_app.counters import reconcile
+from student_app.management.commands.bench_sqlite_concurrency import temporary_database
+from student_app.synthetic import load_students
+
+
+class Command(BaseCommand):
+    help = 'Time the set-based rollover on a large synthetic table and verify it against Python.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--map', default='F=D,D=C', help='Grade transitions, OLD=NEW pairs.')
+        parser.add_argument('--chunk-size', type=int, default=rollover.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('This benchmark is for SQLite only.')
+        try:
+            transitions = rollover.parse_transitions(options['map'])
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with temporary_database(Path(directory) / 'rollover.sqlite3'):
+                failures = self.run(options['rows'], transitions, options['chunk_size'])
+        if failures:
+            raise CommandError(f'{failures} check(s) failed.', returncode=1)
+
+    def run(self, rows, transitions, chunk_size):
+        today = date.today()
+        call_command('migrate', verbosity=0)
+        loaded = load_students(rows, today=today - timedelta(days=365))
+        self.stdout.write(f"Loaded {loaded['count']:,} students in {loaded['seconds']:.1f}s")
+
+        before = rollover.snapshot()
+        result = rollover.rollover(transitions=transitions, today=today, chunk_size=chunk_size)
+        rate = result['updated'] / result['seconds'] if result['seconds'] else 0
+        self.stdout.write(
+            f"rollover: {result['updated']:,} updated in {result['chunks']} chunks, "
+            f"{result['seconds']:.2f}s ({rate:,.0f} rows/s)"
+        )
+
+        started = time.perf_counter()
+        checked = rollover.verify(before, transitions, today)
+        self.stdout.write(
+            f"verify:   {checked['checked']:,} students recomputed in Python in "
+            f"{time.perf_counter() - started:.2f}s, {checked['wrong']} wrong value(s)"
+        )
+        for pk, field, expected, actual in checked['examples']:
+            self.stdout.write(f'  student {pk}: {field} is {actual}, expected {expected}')
+
+        drift = reconcile()
+        self.stdout.write(f'counters: {len(drift)} wrong {sorted(drift.items()) if drift else ""}')
+
+        again = rollover.rollover(transitions={}, today=today, chunk_size=chunk_size)
+        self.stdout.write(f"second run without transitions: {again['updated']} updated")
+
+        return checked['wrong'] + len(drift) + again['updated']
@@ -0,0 +1,66 @@
+"""
+Benchmark rendering of the student list rows with and without the row cache.
+
+Usage:
+    python manage.py bench_row_cache
+    python manage.py bench_row_cache --rows 5000 --repeat 5
+
+Synthetic students are inserted inside a transaction that is rolled back,
+so the real data is never changed. Times are reported per 1,000 rows.
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import engines
+
+from student_app.models import Student
+from student_app.row_cache import get_row_cache, render_rows
+from student_app.synthetic import load_students
+
+
+# The list loop as it was before row caching: every row rendered every time
+UNCACHED_TEMPLATE = (
+    "{% for student in students %}{% include 'student_app/_student_row.html' %}{% endfor %}"
+)
+
+
+class Command(BaseCommand):
+    help = 'Compare student list row render time: uncached loop vs cold vs warm row cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.bench(options['rows'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def bench(self, rows, repeat):
+        load_students(rows)
+        students = list(Student.objects.order_by('-date_of_registration', '-id')[:rows])
+        per_1k = 1000 / len(students)
+        uncached = engines['django'].from_string(UNCACHED_TEMPLATE)
+
+        def timed(func, before=None):
+            samples = []
+            for _ in range(repeat):
+                if before:
+                    before()
+                start = time.perf_counter()
+                func()
+                samples.append((time.perf_counter() - start) * 1000 * per_1k)
+            return statistics.median(samples)
+
+        cache = get_row_cache()
+        results = {
+            'uncached loop': timed(lambda: uncached.render({'students': students})),
+            'row cache, cold': timed(lambda: render_rows(students), before=cache.clear),
+            'row cache, warm': timed(lambda: render_rows(students)),
+        }
+        self.stdout.write(f'{len(students)} rows, median of {repeat} runs:')
+        for name, ms in results.items():
+            self.stdout.write(f'  {name:<16} {ms:8.2f} ms per 1k rows')
@@ -0,0 +1,81 @@
+"""
+Benchmark student search: icontains scan vs FTS5 vs trigram index.
+
+Usage:
+    python manage.py bench_search
+    python manage.py bench_search --rows 10000 100000 --repeat 20
+
+For each table size, synthetic students are inserted inside a transaction
+that is rolled back at the end, so the real data is never changed.
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from student_app.models import Student
+from student_app.search import TRIGRAM_MAX_CANDIDATES, icontains_filter, search_students
+from student_app.synthetic import SEARCH_QUERIES, load_students
+from student_app.trigram import INDEXED_FIELDS, TrigramIndex
+
+
+def timed(func, repeat):
+    """
+    Run func `repeat` times and return the median time in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = 'Compare icontains, FTS5 and trigram search latency at several table sizes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=10)
+
+    def handle(self, *args, **options):
+        for rows in options['rows']:
+            with transaction.atomic():
+                self.bench(rows, options['repeat'])
+                # Throw the synthetic rows away
+                transaction.set_rollback(True)
+
+    def bench(self, rows, repeat):
+        seeded = load_students(rows)['seconds']
+
+        index = TrigramIndex()
+        start = time.perf_counter()
+        index.build(Student.objects.values_list('pk', *INDEXED_FIELDS).iterator(chunk_size=10000))
+        built = time.perf_counter() - start
+
+        self.stdout.write(f'\n{rows:,} rows (seeded in {seeded:.1f}s, trigram index built in {built:.1f}s)')
+        self.stdout.write(f'{"query":<12}{"icontains":>12}{"fts5":>12}{"trigram":>12}{"matches":>10}')
+
+        base = Student.objects.all()
+        for query in SEARCH_QUERIES:
+            def scan():
+                return list(icontains_filter(base, query).values_list('pk', flat=True))
+
+            def fts():
+                return list(search_students(base, query).values_list('pk', flat=True))
+
+            def tri():
+                # The same two steps search_students() performs with the index on
+                candidates = index.candidates(query)
+                queryset = base
+                if len(candidates) <= TRIGRAM_MAX_CANDIDATES:
+                    queryset = base.filter(pk__in=candidates)
+                return list(icontains_filter(queryset, query).values_list('pk', flat=True))
+
+            matches = len(scan())
+            self.stdout.write(
+                f'{query:<12}{timed(scan, repeat):>10.2f}ms{timed(fts, repeat):>10.2f}ms'
+                f'{timed(tri, repeat):>10.2f}ms{matches:>10}'
+            )
@@ -0,0 +1,224 @@
+"""
+Benchmark concurrent creates, updates and list reads on SQLite.
+
+Usage:
+    python manage.py bench_sqlite_concurrency
+    python manage.py bench_sqlite_concurrency --workers 16 --seconds 20 --profile tuned
+
+Runs the same mixed workload with SQLite's defaults ("baseline": rollback
+journal, Python's 5 second lock timeout), with the SQLITE_PRAGMAS from
+settings ("tuned"), and with those pragmas plus the single writer thread of
+write_queue.py ("queued"). Each run uses a fresh database file in a
+temporary directory, so the real database is never touched.
+
+Each worker is a separate process, as with a web server's worker processes:
+its own interpreter, its own connection to the database file, and (for
+"queued") its own writer thread, so the processes compete for SQLite's
+file lock the way production workers do. The operations mirror the views:
+a create is one INSERT, an update reads the student and then saves it, a
+list read fetches the first page and the counters.
+"""
+
+import multiprocessing
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date
+from itertools import count
+from pathlib import Path
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test.utils import override_settings
+
+from student_app.sqlite_profile import current_pragmas
+from student_app.synthetic import load_students
+
+
+# Share of each operation in the workload
+MIX = {'list': 0.6, 'update': 0.25, 'create': 0.15}
+
+# Roll numbers created by worker n start at ROLL_NUMBER_BLOCK * (n + 1)
+ROLL_NUMBER_BLOCK = 10_000_000
+
+# Set in each worker process by _start_worker()
+_worker = {}
+
+
+@contextmanager
+def temporary_database(path):
+    """
+    Point the default database at another SQLite file, for every thread.
+    """
+    settings_dict = connections['default'].settings_dict
+    original = settings_dict['NAME']
+    connections.close_all()
+    settings_dict['NAME'] = str(path)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        settings_dict['NAME'] = original
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and "database is locked" errors under concurrent load, baseline vs tuned SQLite.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=10)
+        parser.add_argument('--rows', type=int, default=5000, help='Students in the database before the run.')
+        parser.add_argument('--profile', choices=['baseline', 'tuned', 'queued', 'all'], default='all')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('This benchmark is for SQLite only.')
+        profiles = ['baseline', 'tuned', 'queued'] if options['profile'] == 'all' else [options['profile']]
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in profiles:
+                path = Path(directory) / f'{profile}.sqlite3'
+                pragmas = {} if profile == 'baseline' else None
+                with temporary_database(path), self.pragmas(pragmas):
+                    results.append(self.run(profile, options, pragmas, queued=profile == 'queued'))
+
+        self.stdout.write(
+            f'\n{"profile":<10}{"ops/sec":>10}{"ops":>9}{"locked":>9}{"lock %":>9}'
+            f'{"list p95":>11}{"update p95":>12}{"create p95":>12}'
+        )
+        for result in results:
+            p95 = result['p95']
+            self.stdout.write(
+                f"{result['profile']:<10}{result['ops'] / result['seconds']:>10,.0f}{result['ops']:>9}"
+                f"{result['locked']:>9}{result['lock_rate']:>8.2%}"
+                f"{p95['list']:>9.1f}ms{p95['update']:>10.1f}ms{p95['create']:>10.1f}ms"
+            )
+
+    @contextmanager
+    def pragmas(self, value):
+        # None keeps the SQLITE_PRAGMAS from settings
+        if value is None:
+            yield
+        else:
+            with override_settings(SQLITE_PRAGMAS=value):
+                yield
+
+    def run(self, profile, options, pragmas, queued=False):
+        # Imported here: this module is also imported by worker processes
+        # before they set up Django (see _start_worker())
+        from student_app.models import Student
+
+        call_command('migrate', verbosity=0)
+        load_students(options['rows'])
+        pks = list(Student.objects.values_list('pk', flat=True))
+        journal = current_pragmas(connections['default'], ['journal_mode', 'synchronous', 'busy_timeout'])
+        self.stdout.write(f'{profile}: {journal}, {options["workers"]} worker processes for {options["seconds"]:g}s')
+        connections.close_all()
+
+        workers = options['workers']
+        settings_dict = connections['default'].settings_dict
+        # "spawn" starts clean interpreters: forking a process that has an
+        # open database connection is not safe with SQLite
+        context = multiprocessing.get_context('spawn')
+        # The workers start their clocks together, once all are set up
+        barrier = context.Barrier(workers)
+        initargs = (settings_dict['NAME'], pragmas, barrier, pks, options['seconds'], queued)
+        with context.Pool(workers, initializer=_start_worker, initargs=initargs) as pool:
+            finished = pool.map(_run_worker, range(workers), chunksize=1)
+
+        latencies = {name: [] for name in MIX}
+        outcomes = Counter()
+        for worker_latencies, worker_outcomes, _seconds in finished:
+            outcomes.update(worker_outcomes)
+            for name, samples in worker_latencies.items():
+                latencies[name].extend(samples)
+
+        attempts = outcomes['ok'] + outcomes['locked']
+        return {
+            'profile': profile,
+            'seconds': max(seconds for _latencies, _outcomes, seconds in finished),
+            'ops': outcomes['ok'],
+            'locked': outcomes['locked'],
+            'lock_rate': outcomes['locked'] / attempts if attempts else 0.0,
+            'p95': {name: self.p95(samples) for name, samples in latencies.items()},
+        }
+
+    @staticmethod
+    def p95(samples):
+        if len(samples) < 2:
+            return samples[0] if samples else 0.0
+        return statistics.quantiles(samples, n=20)[-1]
+
+
+def _start_worker(name, pragmas, barrier, pks, seconds, queued):
+    """
+    Pool initializer: set up Django in the new process, on the benchmark's
+    database file and with the profile's pragmas (None keeps the settings).
+    """
+    django.setup()
+    connections['default'].settings_dict['NAME'] = name
+    if pragmas is not None:
+        override_settings(SQLITE_PRAGMAS=pragmas).enable()
+    _worker.update(barrier=barrier, pks=pks, seconds=seconds, queued=queued)
+
+
+def _run_worker(number):
+    """
+    Run the MIX for the benchmark's duration in this process.
+    Returns ({operation: [latency ms]}, Counter of ok/locked, seconds).
+    """
+    from student_app.counters import get_counts
+    from student_app.models import Student
+    from student_app.write_queue import get_write_queue, run_write
+
+    rng = random.Random(number)
+    pks = _worker['pks']
+    roll_numbers = count(ROLL_NUMBER_BLOCK * (number + 1))
+    # Save in this process, or hand the save to this process's writer thread
+    write = run_write if _worker['queued'] else (lambda save: save())
+    operations = rng.choices(list(MIX), weights=list(MIX.values()), k=100_000)
+    latencies = {name: [] for name in MIX}
+    outcomes = Counter()
+
+    _worker['barrier'].wait()
+    started = time.monotonic()
+    deadline = started + _worker['seconds']
+    try:
+        for name in operations:
+            if time.monotonic() >= deadline:
+                break
+            start = time.perf_counter()
+            try:
+                if name == 'list':
+                    list(Student.objects.order_by('-date_of_registration', '-id')[:25])
+                    get_counts()
+                elif name == 'update':
+                    student = Student.objects.get(pk=rng.choice(pks))
+                    student.age = 18 + rng.randrange(10)
+                    write(student.save)
+                else:
+                    n = next(roll_numbers)
+                    write(Student(
+                        first_name='Bench', last_name='Worker', email=f'bench{n}@example.com',
+                        roll_number=n, grade='A', age=20, date_of_birth=date(2005, 1, 1),
+                        address='1 Main Road', phone_number='9000000000',
+                    ).save)
+            except OperationalError as exc:
+                if 'locked' not in str(exc) and 'busy' not in str(exc):
+                    raise
+                outcomes['locked'] += 1
+                continue
+            latencies[name].append((time.perf_counter() - start) * 1000)
+            outcomes['ok'] += 1
+        seconds = time.monotonic() - started
+    finally:
+        if _worker['queued']:
+            get_write_queue().stop()
+        connections.close_all()
+    return latencies, outcomes, seconds
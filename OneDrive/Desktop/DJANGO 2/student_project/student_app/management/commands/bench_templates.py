@@ -0,0 +1,127 @@
+"""
+Report what minifying the templates saves on each page.
+
+Usage:
+    python manage.py bench_templates
+    python manage.py bench_templates --rows 500 --repeat 20
+
+Seeds a fresh database file with synthetic students (the real database is
+never touched) and requests each page with STUDENT_MINIFY_TEMPLATES off and
+on (see template_loader.py). For each page it prints the size of the HTML
+sent and the median template render time (the "tpl" part of the
+Server-Timing header), plus the size of the template sources and the time
+to load and compile them all.
+"""
+
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.template import engines
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from student_app.management.commands.bench_sqlite_concurrency import temporary_database
+from student_app.models import Student
+from student_app.response_cache import get_response_cache
+from student_app.synthetic import load_students
+
+
+# Templates of the pages below, compiled by the "compile" line
+PAGE_TEMPLATES = (
+    'student_app/student_list.html', 'student_app/student_detail.html',
+    'student_app/student_form.html', 'student_app/student_confirm_delete.html',
+    'student_app/_student_row.html', 'home.html',
+)
+
+
+def reset_templates():
+    # Forget compiled templates, so the next request loads them again
+    for loader in engines['django'].engine.template_loaders:
+        loader.reset()
+
+
+def template_ms(response):
+    for metric in response['Server-Timing'].split(','):
+        name, _, duration = metric.strip().partition(';dur=')
+        if name == 'tpl':
+            return float(duration.split(';')[0])
+    return 0.0
+
+
+class Command(BaseCommand):
+    help = 'Compare page size and template render time without and with template minifying.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200, help='Synthetic students to seed.')
+        parser.add_argument('--repeat', type=int, default=30, help='Requests per page and setting.')
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('bench_templates seeds a temporary SQLite database; it needs the SQLite backend.')
+
+        with tempfile.TemporaryDirectory() as directory, \
+                temporary_database(Path(directory) / 'bench.sqlite3'), \
+                override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                                  STUDENT_TIMING_SAMPLE_RATE=1.0):
+            call_command('migrate', verbosity=0)
+            load_students(options['rows'])
+            pk = Student.objects.values_list('pk', flat=True).first()
+            pages = {
+                'student_list': reverse('student_list'),
+                'student_detail': reverse('student_detail', args=[pk]),
+                'student_create': reverse('student_create'),
+                'student_update': reverse('student_update', args=[pk]),
+                'student_delete': reverse('student_delete', args=[pk]),
+            }
+
+            # One log line per request would drown the results
+            request_log = logging.getLogger('student_app.requests')
+            request_log.disabled = True
+            results = {}
+            try:
+                for minify in (False, True):
+                    with override_settings(STUDENT_MINIFY_TEMPLATES=minify):
+                        results[minify] = self.measure(pages, options['repeat'])
+            finally:
+                request_log.disabled = False
+                reset_templates()
+
+        plain, minified = results[False], results[True]
+        self.stdout.write(f"{'page':<16}{'bytes':>9}{'minified':>10}{'saved':>8}{'tpl ms':>9}{'minified':>10}")
+        for name in [*pages, 'compile']:
+            before, after = plain[name], minified[name]
+            saved = 1 - after['bytes'] / before['bytes'] if before['bytes'] else 0
+            self.stdout.write(
+                f"{name:<16}{before['bytes']:>9}{after['bytes']:>10}{saved:>8.0%}"
+                f"{before['ms']:>9.2f}{after['ms']:>10.2f}"
+            )
+
+    def measure(self, pages, repeat):
+        engine = engines['django'].engine
+        samples = []
+        for _ in range(repeat):
+            reset_templates()
+            start = time.perf_counter()
+            sizes = sum(len(engine.get_template(name).source.encode()) for name in PAGE_TEMPLATES)
+            samples.append((time.perf_counter() - start) * 1000)
+        results = {'compile': {'bytes': sizes, 'ms': statistics.median(samples)}}
+
+        client = Client()
+        cache = get_response_cache()
+        for name, url in pages.items():
+            samples = []
+            for _ in range(repeat):
+                # The page cache would skip rendering
+                cache.clear()
+                response = client.get(url)
+                samples.append(template_ms(response))
+            results[name] = {'bytes': len(response.content), 'ms': statistics.median(samples)}
+        return results
@@ -0,0 +1,51 @@
+"""
+Show the SQLite query plan of every query the student pages and admin run.
+
+Usage:
+    python manage.py explain_student_queries
+    python manage.py explain_student_queries --rows 5000 --verbose
+
+Synthetic students are added inside a transaction that is rolled back, so
+the real data is never changed. Exits with status 1 if any query reads the
+whole student table or sorts without an index.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from student_app.query_plans import collect_plans
+from student_app.synthetic import load_students
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN QUERY PLAN on the queries issued by student views and admin; flag full scans.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Synthetic students to add first.')
+        parser.add_argument('--verbose', action='store_true', help='Print every plan, not only problems.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            load_students(options['rows'])
+            results = collect_plans()
+            transaction.set_rollback(True)
+
+        failures = 0
+        for result in results:
+            if not result['problems'] and not options['verbose']:
+                continue
+            style = self.style.ERROR if result['problems'] else self.style.SUCCESS
+            self.stdout.write(style(f"[{result['scenario']}]"))
+            self.stdout.write(f"  {result['sql']}")
+            for line in result['plan']:
+                self.stdout.write(f'    {line}')
+            for problem in result['problems']:
+                self.stdout.write(self.style.ERROR(f'  !! {problem}'))
+            for note in result['notes']:
+                self.stdout.write(f'  -- {note}')
+            failures += bool(result['problems'])
+
+        summary = f'{len(results)} queries checked, {failures} with problems.'
+        if failures:
+            raise CommandError(summary, returncode=1)
+        self.stdout.write(summary)
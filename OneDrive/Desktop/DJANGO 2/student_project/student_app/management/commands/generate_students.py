@@ -0,0 +1,54 @@
+"""
+Add synthetic students to the database, quickly and repeatably.
+
+Usage:
+    python manage.py generate_students 100000
+    python manage.py generate_students 1000000 --seed 42 --processes 4
+    python manage.py generate_students 5000 --as-of 2024-06-01
+
+The same --seed and --as-of always produce the same students. Roll numbers
+continue from the highest existing one (or --start). See
+student_app/synthetic.py for how the data is made and loaded.
+"""
+
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app.synthetic import load_students
+
+
+class Command(BaseCommand):
+    help = 'Insert synthetic students (deterministic per seed) using bulk inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('count', type=int, help='Number of students to add.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--start', type=int, help='First roll number (default: after the highest existing).')
+        parser.add_argument(
+            '--processes', type=int, default=min(4, os.cpu_count() or 1),
+            help='Processes generating rows while the main process inserts them.',
+        )
+        parser.add_argument(
+            '--as-of', type=date.fromisoformat,
+            help='Date ages and registration dates are counted from (YYYY-MM-DD, default today).',
+        )
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError('count must be at least 1.')
+        result = load_students(
+            options['count'],
+            seed=options['seed'],
+            start=options['start'],
+            today=options['as_of'],
+            processes=options['processes'],
+        )
+        count = result['count']
+        self.stdout.write(
+            f"Added {count:,} students (roll numbers {result['start']}-{result['start'] + count - 1}) "
+            f"in {result['seconds']:.1f}s: {count / result['seconds']:,.0f} rows/sec overall, "
+            f"{count / result['insert_seconds']:,.0f} rows/sec generating and inserting, "
+            f"{result['rebuild_seconds']:.1f}s rebuilding indexes and counters."
+        )
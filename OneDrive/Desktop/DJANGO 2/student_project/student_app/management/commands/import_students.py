@@ -0,0 +1,234 @@
+"""
+Bulk import students from a CSV or NDJSON file (or stdin).
+
+Usage:
+    python manage.py import_students enrolment.csv
+    python manage.py import_students enrolment.ndjson --batch-size 5000
+    cat enrolment.csv | python manage.py import_students - --format csv
+    python manage.py import_students enrolment.csv --rejects rejects.csv
+
+Each row is validated with the same rules as StudentForm. Rows are matched
+to existing students by roll_number: a known roll number updates that
+student, a new one creates a student. A row is rejected (and reported) if it
+fails validation, repeats a roll number or email seen earlier in the file,
+or uses an email that belongs to a different student.
+
+The file is read as a stream and written in batches, one transaction per
+batch, so memory use doesn't grow with the file. Existing roll numbers and
+emails are loaded once up front instead of being queried row by row.
+"""
+
+import csv
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from student_app import trigram
+from student_app.forms import StudentForm
+from student_app.models import Student
+from student_app.response_cache import invalidate_all_students
+from student_app.sqlite_profile import lock_for_write
+
+
+# Columns written on update (date_of_registration keeps its original value)
+UPDATE_FIELDS = [
+    'first_name', 'last_name', 'email', 'grade', 'age', 'date_of_birth',
+    'address', 'phone_number', 'is_active', 'updated_at',
+]
+
+# Text values that mean False in a CSV is_active column
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off'}
+
+
+class ImportStudentForm(StudentForm):
+    """
+    StudentForm without the per-row uniqueness queries.
+
+    Uniqueness of roll_number and email is checked by the command against
+    keys loaded once at the start, which is much faster for big files.
+
+    Building a form deep-copies every field and widget, which costs more
+    than validating a row, so one form is created and re-bound per row.
+    """
+
+    def validate_unique(self):
+        pass
+
+    def rebind(self, data):
+        """
+        Point this form at a new row of data and a fresh Student instance.
+        """
+        self.data = data
+        self.is_bound = True
+        self.instance = Student()
+        # Forget the previous row's validation results. Bound fields can be
+        # kept: they read their value from self.data each time.
+        self._errors = None
+        return self
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield row
+
+
+def read_ndjson(stream):
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            # Passed on as a row with an error so it is reported, not fatal
+            yield {'__error__': f'line {line_number}: invalid JSON ({exc.msg})'}
+
+
+def normalise_is_active(row):
+    """
+    Turn the many spellings of a boolean into True/False (default True).
+    """
+    value = row.get('is_active')
+    if value is None or value == '':
+        row['is_active'] = True
+    elif isinstance(value, str):
+        row['is_active'] = value.strip().lower() not in FALSE_VALUES
+    else:
+        row['is_active'] = bool(value)
+    return row
+
+
+class Command(BaseCommand):
+    help = 'Import students from a CSV or NDJSON file, creating or updating by roll_number.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' to read from stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format (default: from the file extension).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per transaction.')
+        parser.add_argument('--rejects', help='Write rejected rows and their errors to this CSV file.')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only; write nothing.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            if path == '-':
+                raise CommandError('--format is required when reading from stdin.')
+            fmt = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        rejects_file = open(options['rejects'], 'w', newline='', encoding='utf-8') if options['rejects'] else None
+        try:
+            reader = read_ndjson(stream) if fmt == 'ndjson' else read_csv(stream)
+            stats = self.run(reader, options['batch_size'], options['dry_run'], rejects_file)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects_file:
+                rejects_file.close()
+
+        elapsed = stats['seconds'] or 1e-9
+        self.stdout.write(
+            f"Read {stats['rows']} rows in {stats['seconds']:.2f}s "
+            f"({stats['rows'] / elapsed:,.0f} rows/sec): "
+            f"{stats['created']} created, {stats['updated']} updated, {stats['rejected']} rejected."
+        )
+        if options['dry_run']:
+            self.stdout.write('Dry run: nothing was written.')
+
+    def run(self, reader, batch_size, dry_run, rejects_file):
+        start = time.perf_counter()
+        stats = {'rows': 0, 'created': 0, 'updated': 0, 'rejected': 0}
+
+        # Load every existing key once: email -> roll_number, plus roll numbers
+        email_owner = dict(Student.objects.values_list('email', 'roll_number'))
+        existing_rolls = set(email_owner.values())
+        # Keys already used earlier in this file
+        seen_rolls, seen_emails = set(), set()
+
+        rejects = csv.writer(rejects_file) if rejects_file else None
+        if rejects:
+            rejects.writerow(['row', 'roll_number', 'email', 'errors'])
+
+        def reject(row_number, row, message):
+            stats['rejected'] += 1
+            if rejects:
+                rejects.writerow([row_number, row.get('roll_number', ''), row.get('email', ''), message])
+            elif stats['rejected'] <= 20:
+                self.stderr.write(f'Row {row_number}: {message}')
+
+        form = ImportStudentForm(data={})
+        batch = []
+        for row_number, row in enumerate(reader, start=1):
+            stats['rows'] += 1
+            if '__error__' in row:
+                reject(row_number, {}, row['__error__'])
+                continue
+
+            form.rebind(normalise_is_active(row))
+            if not form.is_valid():
+                errors = '; '.join(
+                    f'{field}: {" ".join(messages)}' for field, messages in form.errors.items()
+                )
+                reject(row_number, row, errors)
+                continue
+
+            student = form.save(commit=False)
+            email = student.email
+            if student.roll_number in seen_rolls:
+                reject(row_number, row, 'roll_number: repeated earlier in the file.')
+                continue
+            if email in seen_emails:
+                reject(row_number, row, 'email: repeated earlier in the file.')
+                continue
+            owner = email_owner.get(email)
+            if owner is not None and owner != student.roll_number:
+                reject(row_number, row, f'email: already used by roll number {owner}.')
+                continue
+
+            seen_rolls.add(student.roll_number)
+            seen_emails.add(email)
+            if student.roll_number in existing_rolls:
+                stats['updated'] += 1
+            else:
+                stats['created'] += 1
+            batch.append(student)
+
+            if len(batch) >= batch_size:
+                self.write_batch(batch, dry_run)
+                batch = []
+
+        if batch:
+            self.write_batch(batch, dry_run)
+
+        stats['seconds'] = time.perf_counter() - start
+        return stats
+
+    def write_batch(self, batch, dry_run):
+        """
+        Insert or update one batch of students in a single transaction.
+        """
+        if dry_run:
+            return
+        with transaction.atomic():
+            # See sqlite_profile.lock_for_write(): the search index trigger
+            # would otherwise fail the batch when the site commits meanwhile
+            lock_for_write(Student._meta.db_table)
+            Student.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['roll_number'],
+                update_fields=UPDATE_FIELDS,
+            )
+        # bulk_create sends no signals, so retire cached pages and update
+        # the trigram index here. An upsert leaves the pks unset, so the
+        # updated students' detail pages can't be picked out: retire every
+        # page with one cache write, and find the rows again by roll number
+        # for the index
+        invalidate_all_students()
+        trigram.reindex(Student.objects.filter(roll_number__in=[student.roll_number for student in batch]))
@@ -0,0 +1,28 @@
+"""
+Recompute the maintained student counts and report any drift.
+
+Usage:
+    python manage.py reconcile_student_counters
+
+The counters are kept up to date by database triggers, so drift should
+never happen; this command is a cheap safety net to run periodically
+(for example nightly from cron). It exits with status 1 when it had to
+correct something, so monitoring can notice.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute student counters (total, per grade, per status) from the student table.'
+
+    def handle(self, *args, **options):
+        drift = reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Student counters are correct.'))
+            return
+        for name, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'{name}: stored {stored}, actual {actual}')
+        raise CommandError(f'Corrected {len(drift)} counter(s).', returncode=1)
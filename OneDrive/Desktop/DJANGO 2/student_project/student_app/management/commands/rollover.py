@@ -0,0 +1,86 @@
+"""
+Recompute every student's age and apply grade transitions (year-end rollover).
+
+Usage:
+    python manage.py rollover
+    python manage.py rollover --map F=D,D=C
+    python manage.py rollover --as-of 2025-06-01 --dry-run
+    python manage.py rollover --verify
+
+Ages are recomputed from date_of_birth as of --as-of (default today). The
+grade transitions come from --map, or STUDENT_GRADE_TRANSITIONS without it;
+each run applies them once more, so run it once per year. See
+student_app/rollover.py for how the updates are done.
+
+--dry-run only reports how many students would change. --verify also
+checks every student against a per-row Python computation afterwards, and
+the maintained counters against a fresh count; it exits with status 1 when
+anything is wrong.
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app import rollover
+from student_app.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute student ages from date of birth and apply grade transitions, in set-based chunks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--map', help='Grade transitions as OLD=NEW pairs, e.g. F=D,D=C.')
+        parser.add_argument(
+            '--as-of', type=date.fromisoformat,
+            help='Date ages are counted to (YYYY-MM-DD, default today).',
+        )
+        parser.add_argument('--chunk-size', type=int, default=rollover.CHUNK_SIZE, help='Ids per UPDATE.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change; write nothing.')
+        parser.add_argument('--verify', action='store_true', help='Check the result row by row afterwards.')
+
+    def handle(self, *args, **options):
+        try:
+            if options['map'] is None:
+                transitions = rollover.grade_transitions()
+            else:
+                transitions = rollover.parse_transitions(options['map'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        today = options['as_of'] or date.today()
+        mapping = ', '.join(f'{old}->{new}' for old, new in transitions.items()) or 'none'
+
+        if options['dry_run']:
+            result = rollover.pending(transitions=transitions, today=today)
+            grades = ', '.join(f'{old}: {count}' for old, count in result['grades'].items()) or '-'
+            self.stdout.write(
+                f"As of {today}: {result['ages']} stale age(s); grade transitions ({mapping}): {grades}."
+            )
+            return
+
+        before = rollover.snapshot() if options['verify'] else None
+        result = rollover.rollover(transitions=transitions, today=today, chunk_size=options['chunk_size'])
+        self.stdout.write(
+            f"Updated {result['updated']} student(s) in {result['chunks']} chunk(s) "
+            f"in {result['seconds']:.2f}s (as of {today}; grade transitions: {mapping})."
+        )
+        if before is None:
+            return
+
+        checked = rollover.verify(before, transitions, today)
+        drift = reconcile()
+        for pk, field, expected, actual in checked['examples']:
+            self.stdout.write(f'Student {pk}: {field} is {actual}, expected {expected}')
+        for name, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'Counter {name}: stored {stored}, actual {actual}')
+        if checked['wrong'] or drift:
+            raise CommandError(
+                f"{checked['wrong']} wrong value(s) in {checked['checked']} students; "
+                f"{len(drift)} counter(s) corrected.",
+                returncode=1,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Verified {checked['checked']} students and the counters."
+        ))
@@ -0,0 +1,61 @@
+"""
+Run queued background jobs (see student_app/jobs.py).
+
+Usage:
+    python manage.py run_jobs                 # run jobs until stopped (Ctrl+C)
+    python manage.py run_jobs --threads 4     # up to 4 jobs at once
+    python manage.py run_jobs --once          # run what is queued, then exit
+    python manage.py run_jobs --enqueue student_report
+    python manage.py run_jobs --enqueue update_grades --params '{"grade": "B", "from_grade": "C"}'
+
+Keep one running next to the web server (e.g. as a systemd service).
+Several can run at once, on one machine or more sharing the database: each
+job is claimed by exactly one of them. Ctrl+C (or SIGTERM) starts no new
+jobs and waits for the running ones to finish.
+"""
+
+import json
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in a thread pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Jobs run at the same time.')
+        parser.add_argument('--poll', type=float, default=1.0, help='Seconds between looks at the queue.')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty.')
+        parser.add_argument('--enqueue', metavar='KIND', choices=sorted(jobs.REGISTRY),
+                            help='Queue a job of this kind instead of running jobs.')
+        parser.add_argument('--params', default='{}', help='JSON object of parameters for --enqueue.')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            try:
+                params = json.loads(options['params'])
+            except json.JSONDecodeError as exc:
+                raise CommandError(f'--params is not valid JSON: {exc}')
+            job = jobs.enqueue(options['enqueue'], params)
+            self.stdout.write(f'Queued job {job.pk} ({job.kind}).')
+            return
+
+        if options['threads'] < 1:
+            raise CommandError('--threads must be at least 1.')
+        worker = jobs.Worker(threads=options['threads'], poll=options['poll'])
+
+        def stop(signum, frame):
+            self.stdout.write('Stopping: waiting for running jobs to finish...')
+            worker.stop()
+
+        previous = {signum: signal.signal(signum, stop) for signum in (signal.SIGINT, signal.SIGTERM)}
+        self.stdout.write(f'Worker {worker.name} running up to {worker.threads} job(s) at once.')
+        try:
+            count = worker.run(once=options['once'])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(f'Ran {count} job(s).')
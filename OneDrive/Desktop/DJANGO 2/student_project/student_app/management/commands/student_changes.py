@@ -0,0 +1,50 @@
+"""
+Print the student change feed, or compact it.
+
+Usage:
+    python manage.py student_changes --since 1041 > changes.ndjson
+    python manage.py student_changes --since 0 --limit 10000
+    python manage.py student_changes --compact
+    python manage.py student_changes --compact --retention-days 7
+
+Without --compact, writes the changes after --since as NDJSON, one per
+line, exactly as GET /changes?since= sends them (see changelog.py), and
+reports the head it read up to on stderr.
+
+--compact keeps only the latest entry of each student and drops delete
+entries older than --retention-days (default STUDENT_CHANGES_RETENTION_DAYS).
+Run it periodically, e.g. nightly from cron.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_app.changelog import FeedExpired, compact, get_head, iter_changes, stream_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Write the student changes after a sequence number as NDJSON, or compact the change feed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=int, default=0, help='Last sequence number already applied.')
+        parser.add_argument('--limit', type=int, help='Most changes to write.')
+        parser.add_argument('--compact', action='store_true', help='Compact the feed instead of printing it.')
+        parser.add_argument('--retention-days', type=int, help='Days delete entries are kept (with --compact).')
+
+    def handle(self, *args, **options):
+        if options['compact']:
+            result = compact(options['retention_days'])
+            self.stdout.write(
+                f"Removed {result['superseded']} superseded and {result['expired']} expired entries; "
+                f"horizon is {result['horizon']}."
+            )
+            return
+
+        head = get_head()
+        try:
+            for data in stream_ndjson(iter_changes(options['since'], options['limit'], head)):
+                self.stdout.write(data.decode(), ending='')
+        except FeedExpired:
+            raise CommandError(
+                f"Changes after {options['since']} have been compacted away; read again from --since 0."
+            )
+        self.stderr.write(f'Head: {head}')
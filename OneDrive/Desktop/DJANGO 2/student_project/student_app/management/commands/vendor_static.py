@@ -0,0 +1,118 @@
+"""
+Download the third-party CSS/JS the pages use into static/vendor/.
+
+Usage:
+    python manage.py vendor_static            # fetch what is missing
+    python manage.py vendor_static --force    # fetch everything again
+    python manage.py vendor_static --check    # only list what is missing
+
+The pages load Bootstrap and Font Awesome from our own static files, so the
+site works without any outside network. Run this once on a machine that
+can reach the CDNs and commit the files it writes (they are committed
+already for the versions below; run it again after changing ASSETS).
+The deployment itself never downloads anything. A file that is missing
+is linked from its CDN URL instead (see static_files.vendor_url()).
+
+Files a downloaded stylesheet or script refers to (url(...) fonts and
+images, sourceMappingURL maps) are fetched too, next to it:
+ManifestStaticFilesStorage rewrites those references to hashed names at
+collectstatic time and fails if one is missing.
+"""
+
+import posixpath
+import re
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Pinned versions: (CDN URL, path under static/vendor/)
+ASSETS = [
+    ('https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+     'bootstrap-5.1.3/css/bootstrap.min.css'),
+    # Bootstrap's dropdowns and tooltips need Popper loaded before it
+    ('https://cdn.jsdelivr.net/npm/@popperjs/core@2.10.2/dist/umd/popper.min.js',
+     'popper-2.10.2/umd/popper.min.js'),
+    ('https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.min.js',
+     'bootstrap-5.1.3/js/bootstrap.min.js'),
+    ('https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+     'fontawesome-6.0.0/css/all.min.css'),
+]
+
+# References inside a downloaded file that must be fetched as well
+REFERENCES = re.compile(
+    r'''url\(\s*['"]?(?P<url>[^'")]+?)['"]?\s*\)'''
+    r'''|sourceMappingURL=(?P<map>[^\s*'"]+)'''
+)
+
+TIMEOUT = 30
+
+
+def vendor_dir():
+    return Path(settings.BASE_DIR) / 'static' / 'vendor'
+
+
+def missing_assets():
+    """
+    The vendored files (paths under static/vendor/) that are not there yet.
+    """
+    directory = vendor_dir()
+    return [path for _, path in ASSETS if not (directory / path).is_file()]
+
+
+class Command(BaseCommand):
+    help = 'Download Bootstrap and Font Awesome into static/vendor/ so no CDN is needed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Download files that already exist.')
+        parser.add_argument('--check', action='store_true', help='Only report missing files.')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            missing = missing_assets()
+            for path in missing:
+                self.stdout.write(f'missing: static/vendor/{path}')
+            if missing:
+                raise CommandError(f'{len(missing)} vendored file(s) missing; run manage.py vendor_static.')
+            self.stdout.write('All vendored files are present.')
+            return
+
+        self.fetched = set()
+        for url, path in ASSETS:
+            self.fetch(url, vendor_dir() / path, options['force'])
+
+    def fetch(self, url, target, force):
+        if url in self.fetched:
+            return
+        self.fetched.add(url)
+
+        if target.is_file() and not force:
+            content = target.read_bytes()
+        else:
+            try:
+                with urlopen(url, timeout=TIMEOUT) as response:
+                    content = response.read()
+            except OSError as exc:
+                raise CommandError(f'Could not download {url}: {exc}') from exc
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+            self.stdout.write(f'{url} -> {target} ({len(content)} bytes)')
+
+        if target.suffix in ('.css', '.js'):
+            root = vendor_dir().resolve()
+            for reference in self.references(content.decode('utf-8', 'replace')):
+                # Relative references only, kept inside static/vendor/
+                destination = (target.parent / reference).resolve()
+                if destination.is_relative_to(root):
+                    self.fetch(urljoin(url, reference), destination, force)
+
+    @staticmethod
+    def references(text):
+        for match in REFERENCES.finditer(text):
+            reference = (match.group('url') or match.group('map')).split('#')[0].split('?')[0]
+            if not reference or reference.startswith(('data:', '/')) or urlsplit(reference).scheme:
+                continue
+            yield posixpath.normpath(reference)
@@ -0,0 +1,40 @@
+"""
+Pre-render the student list rows into the fragment cache.
+
+Usage:
+    python manage.py warm_student_rows
+    python manage.py warm_student_rows --chunk-size 5000
+
+Useful after a deploy (the row template hash changes, so old rows are no
+longer used) or after clearing the cache.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from student_app.models import Student
+from student_app.row_cache import render_rows
+
+
+class Command(BaseCommand):
+    help = 'Render every student list row into the fragment cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        start = time.perf_counter()
+        total = 0
+        chunk = []
+        for student in Student.objects.order_by('pk').iterator(chunk_size=chunk_size):
+            chunk.append(student)
+            if len(chunk) == chunk_size:
+                render_rows(chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            render_rows(chunk)
+            total += len(chunk)
+        self.stdout.write(f'Warmed {total} rows in {time.perf_counter() - start:.2f}s.')
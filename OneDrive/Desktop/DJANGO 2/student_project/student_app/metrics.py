@@ -0,0 +1,430 @@
+"""
+Prometheus-style metrics for the student pages, served at /metrics.
+
+MetricsMiddleware records, per URL name (student_list, student_detail,
+student_create, student_update, student_delete, ...; every admin page counts
+as "admin" and unknown URLs as "unmatched"):
+
+- student_http_requests_total            requests by method and status
+- student_http_request_duration_seconds  latency histogram
+- student_http_requests_in_flight        requests being handled right now
+- student_db_queries_per_request         histogram of SQL queries per request
+                                         (requests sampled by
+                                         RequestTimingMiddleware only)
+
+plus the page cache counters from response_cache.py and their hit ratio.
+
+Recording a request is a few dict and list updates under a lock in this
+process's memory - about a microsecond or two - and nothing is formatted
+until /metrics is read.
+
+Several worker processes: set STUDENT_METRICS_DIR to a directory all of
+them can write. A background thread in each process then writes its numbers
+to <pid>.json there once a second, and /metrics adds up every file, so any
+worker can answer a scrape with the totals. Counters of workers that have
+exited stay in the totals (as they should: a counter never goes down);
+their in-flight gauges are dropped once the file is STALE_AFTER seconds old.
+Empty the directory when the whole server restarts.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import response_cache
+from .instrumentation import current_stats
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets (Prometheus "le"), seconds and queries
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Seconds between writes of this process's numbers to STUDENT_METRICS_DIR
+FLUSH_INTERVAL = 1.0
+
+# A file not rewritten for this long belongs to a process that has exited
+STALE_AFTER = 10.0
+
+# Anything else (e.g. made-up methods) is counted as "OTHER", so a client
+# can't create an unbounded number of series
+METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+# name -> (type, help text)
+FAMILIES = {
+    'student_http_requests_total': (
+        'counter', 'Requests handled, by URL name, method and status.'),
+    'student_http_request_duration_seconds': (
+        'histogram', 'Time from the request reaching the app to the response leaving it.'),
+    'student_http_requests_in_flight': (
+        'gauge', 'Requests being handled right now.'),
+    'student_db_queries_per_request': (
+        'histogram', 'SQL queries per request (requests sampled by RequestTimingMiddleware).'),
+    'student_response_cache_total': (
+        'counter', 'Whole-page cache lookups by outcome.'),
+    'student_response_cache_hit_ratio': (
+        'gauge', 'Share of page cache lookups answered from the cache (hit or stale).'),
+}
+
+
+def view_label(request):
+    """
+    The URL name a request is counted under.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    if 'admin' in match.namespaces:
+        return 'admin'
+    return match.url_name or 'unnamed'
+
+
+class Histogram:
+    """
+    Bucket counts and a running sum (count is the total of the buckets).
+    """
+
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket plus the last one for +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """
+    This process's numbers.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()    # (view, method, status) -> count
+        self.in_flight = Counter()   # view -> count
+        self.latency = {}            # view -> Histogram
+        self.queries = {}            # view -> Histogram
+
+    def started(self, view):
+        with self.lock:
+            self.in_flight[view] += 1
+
+    def finished(self, view, method, status, seconds, queries=None, in_flight=True):
+        with self.lock:
+            if in_flight:
+                self.in_flight[view] -= 1
+            self.requests[view, method, status] += 1
+            latency = self.latency.get(view)
+            if latency is None:
+                latency = self.latency[view] = Histogram(LATENCY_BUCKETS)
+            latency.observe(seconds)
+            if queries is not None:
+                histogram = self.queries.get(view)
+                if histogram is None:
+                    histogram = self.queries[view] = Histogram(QUERY_BUCKETS)
+                histogram.observe(queries)
+
+    def snapshot(self):
+        """
+        Return the numbers as JSON-ready data:
+            {'counters': {name: [[labels, value], ...]},
+             'gauges': {...}, 'histograms': {name: [[labels, counts, sum], ...]}}
+        """
+        with self.lock:
+            requests = [
+                [{'view': view, 'method': method, 'status': str(status)}, n]
+                for (view, method, status), n in self.requests.items()
+            ]
+            in_flight = [[{'view': view}, n] for view, n in self.in_flight.items()]
+            histograms = {
+                'student_http_request_duration_seconds': [
+                    [{'view': view}, list(h.counts), h.sum] for view, h in self.latency.items()
+                ],
+                'student_db_queries_per_request': [
+                    [{'view': view}, list(h.counts), h.sum] for view, h in self.queries.items()
+                ],
+            }
+        cache = response_cache.stats()
+        return {
+            'counters': {
+                'student_http_requests_total': requests,
+                'student_response_cache_total': [
+                    [{'outcome': outcome}, cache[outcome]]
+                    for outcome in ('hit', 'miss', 'stale', 'wait', 'bypass')
+                ],
+            },
+            'gauges': {'student_http_requests_in_flight': in_flight},
+            'histograms': histograms,
+        }
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+def reset():
+    """
+    Start this process's numbers from zero (tests, and new worker processes).
+    """
+    global _metrics
+    _metrics = Metrics()
+
+
+# ---------------------------------------------------------------------------
+# Sharing between worker processes
+# ---------------------------------------------------------------------------
+
+def metrics_dir():
+    directory = getattr(settings, 'STUDENT_METRICS_DIR', None)
+    return Path(directory) if directory else None
+
+
+def write_snapshot(directory):
+    """
+    Write this process's numbers to <directory>/<pid>.json.
+
+    The file is replaced in one step, so readers never see half of it.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'{os.getpid()}.json'
+    temporary = path.with_name(f'.{path.name}.tmp')
+    temporary.write_text(json.dumps(_metrics.snapshot()))
+    os.replace(temporary, path)
+
+
+class _Flusher:
+    """
+    Background thread writing the snapshot every FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def ensure_started(self):
+        if self.thread is not None or metrics_dir() is None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='student-metrics', daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        directory = metrics_dir()
+        if directory is None:
+            return
+        try:
+            write_snapshot(directory)
+        except OSError:
+            logger.exception('Could not write metrics to %s', directory)
+
+
+_flusher = _Flusher()
+
+
+def _after_fork():
+    # A forked worker starts with its own empty numbers and flusher; the
+    # parent's counts are already in the parent's file
+    global _flusher
+    reset()
+    _flusher = _Flusher()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def _read_snapshots(directory):
+    """
+    Yield (snapshot, is_live) for every other process's file.
+    """
+    own = f'{os.getpid()}.json'
+    now = time.time()
+    for path in directory.glob('*.json'):
+        if path.name == own:
+            continue
+        try:
+            age = now - path.stat().st_mtime
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            # Gone (or being replaced) since the glob; skip it this time
+            continue
+        yield data, age < STALE_AFTER
+
+
+def aggregate(directory=None):
+    """
+    Add up this process's numbers and those of the other workers.
+
+    Returns {(kind, name): {labels tuple: value}}, where a histogram's value
+    is [counts, sum].
+    """
+    if directory is None:
+        directory = metrics_dir()
+    snapshots = [(_metrics.snapshot(), True)]
+    if directory is not None and directory.is_dir():
+        snapshots.extend(_read_snapshots(directory))
+
+    totals = {}
+    for snapshot, live in snapshots:
+        for kind in ('counters', 'gauges'):
+            if kind == 'gauges' and not live:
+                continue
+            for name, samples in snapshot.get(kind, {}).items():
+                series = totals.setdefault((kind, name), {})
+                for labels, value in samples:
+                    key = tuple(sorted(labels.items()))
+                    series[key] = series.get(key, 0) + value
+        for name, samples in snapshot.get('histograms', {}).items():
+            series = totals.setdefault(('histograms', name), {})
+            for labels, counts, total in samples:
+                key = tuple(sorted(labels.items()))
+                if key in series:
+                    merged = series[key]
+                    merged[0] = [a + b for a, b in zip(merged[0], counts)]
+                    merged[1] += total
+                else:
+                    series[key] = [list(counts), total]
+    return totals
+
+
+# ---------------------------------------------------------------------------
+# Text exposition format
+# ---------------------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _bounds(name):
+    if name == 'student_db_queries_per_request':
+        return QUERY_BUCKETS
+    return LATENCY_BUCKETS
+
+
+def render(directory=None):
+    """
+    Return all metrics in the Prometheus text format (version 0.0.4).
+    """
+    totals = aggregate(directory)
+
+    # The hit ratio is worked out from the summed counters, not averaged
+    cache = {dict(key)['outcome']: n for key, n in totals.get(('counters', 'student_response_cache_total'), {}).items()}
+    lookups = sum(cache.get(outcome, 0) for outcome in ('hit', 'miss', 'stale', 'wait'))
+    ratio = (cache.get('hit', 0) + cache.get('stale', 0)) / lookups if lookups else 0.0
+    totals[('gauges', 'student_response_cache_hit_ratio')] = {(): ratio}
+
+    lines = []
+    for name, (kind, help_text) in FAMILIES.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            bounds = _bounds(name)
+            for key, (counts, total) in sorted(totals.get(('histograms', name), {}).items()):
+                cumulative = 0
+                for bound, count in zip(bounds + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(key + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{_labels(key)} {_number(total)}')
+                lines.append(f'{name}_count{_labels(key)} {cumulative}')
+        else:
+            kind_key = 'counters' if kind == 'counter' else 'gauges'
+            for key, value in sorted(totals.get((kind_key, name), {}).items()):
+                lines.append(f'{name}{_labels(key)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+class MetricsMiddleware:
+    """
+    Count every request; see the module docstring.
+
+    Goes after RequestTimingMiddleware in MIDDLEWARE so the query counts of
+    sampled requests are available when the response comes back.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # Django runs a sync process_view() in a thread under ASGI
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, response, time.perf_counter() - start)
+
+    def record(self, request, response, seconds):
+        # process_view() ran (and marked the request in flight) unless the
+        # URL didn't resolve or an earlier middleware answered
+        view = getattr(request, '_metrics_view', None)
+        in_flight = view is not None
+        if view is None:
+            view = view_label(request)
+        method = request.method if request.method in METHODS else 'OTHER'
+        stats = current_stats()
+        queries = stats.queries if stats is not None else None
+
+        _metrics.finished(view, method, response.status_code, seconds, queries, in_flight)
+        _flusher.ensure_started()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.view_starting(request)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.view_starting(request)
+
+    def view_starting(self, request):
+        request._metrics_view = view = view_label(request)
+        _metrics.started(view)
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='student',
+            options={'ordering': ['-date_of_registration', '-id'], 'verbose_name': 'Student', 'verbose_name_plural': 'Students'},
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['-date_of_registration', '-id'], name='student_registration_idx'),
+        ),
+    ]
@@ -0,0 +1,90 @@
+"""
+Create the SQLite FTS5 full-text index used by student_app.search.
+
+The index is an "external content" FTS5 table: it stores only the search
+tokens and points back at student_app_student by rowid. Triggers keep it in
+sync on every INSERT, UPDATE and DELETE, including bulk operations that
+bypass Model.save().
+
+On databases other than SQLite (or SQLite builds without FTS5) this
+migration does nothing and search falls back to icontains lookups.
+"""
+
+from django.db import migrations
+
+
+FTS_TABLE = 'student_app_student_fts'
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        first_name, last_name, email, roll_number, phone_number,
+        content='student_app_student', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON student_app_student BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, email, roll_number, phone_number)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.roll_number, new.phone_number);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON student_app_student BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, email, roll_number, phone_number)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.roll_number, old.phone_number);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF
+        first_name, last_name, email, roll_number, phone_number ON student_app_student BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, email, roll_number, phone_number)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.roll_number, old.phone_number);
+        INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, email, roll_number, phone_number)
+        VALUES (new.id, new.first_name, new.last_name, new.email, new.roll_number, new.phone_number);
+    END
+    """,
+    # Index any students that already exist
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ai',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_ad',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_fts(apps, schema_editor):
+    if not fts5_available(schema_editor.connection):
+        return
+    for statement in CREATE_SQL:
+        schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0002_student_registration_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0003_student_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentCounter',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Student counter',
+                'verbose_name_plural': 'Student counters',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0004_student_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['grade', '-date_of_registration', '-id'], name='student_grade_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['age', '-date_of_registration', '-id'], name='student_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-date_of_registration', '-id'], name='student_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(condition=models.Q(('is_active', False)), fields=['-date_of_registration', '-id'], name='student_inactive_idx'),
+        ),
+    ]
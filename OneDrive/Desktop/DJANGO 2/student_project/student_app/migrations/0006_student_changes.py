@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_app', '0005_student_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('student_id', models.BigIntegerField()),
+                ('op', models.CharField(choices=[('I', 'Insert'), ('U', 'Update'), ('D', 'Delete')], max_length=1)),
+                ('changed_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Student change',
+                'verbose_name_plural': 'Student changes',
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['student_id', 'seq'], name='student_change_idx')],
+            },
+        ),
+        # Start the feed with every existing student, so a consumer that
+        # reads from the beginning (?since=0) gets the whole table
+        migrations.RunSQL(
+            "INSERT INTO student_app_studentchange (student_id, op, changed_at) "
+            "SELECT id, 'I', CURRENT_TIMESTAMP FROM student_app_student ORDER BY id",
+            migrations.RunSQL.noop,
+        ),
+    ]
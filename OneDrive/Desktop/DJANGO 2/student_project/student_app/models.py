@@ -9,6 +9,9 @@ Django automatically creates SQL CREATE TABLE statements based on these models.
 from django.db import models
 # models module provides the base Model class and field types
 
+from django.utils import timezone
+# timezone.now: default start time of a queued Job
+
 
 class Student(models.Model):
     """
@@ -82,10 +85,201 @@ class Student(models.Model):
         verbose_name_plural = 'Students'
         # ordering specifies the default order for queries
         # '-date_of_registration' means newest first (- means descending)
-        ordering = ['-date_of_registration']
+        # '-id' breaks ties between students registered on the same day,
+        # giving keyset pagination a stable, unique sort key
+        ordering = ['-date_of_registration', '-id']
+        # indexes create database indexes for faster lookups
+        indexes = [
+            # Matches the default ordering so list pages are read
+            # straight from the index instead of being sorted
+            models.Index(
+                fields=['-date_of_registration', '-id'],
+                name='student_registration_idx',
+            ),
+            # Admin "grade" and "age" filters: find the matching students
+            # already in list order, and list the distinct ages
+            models.Index(
+                fields=['grade', '-date_of_registration', '-id'],
+                name='student_grade_idx',
+            ),
+            models.Index(
+                fields=['age', '-date_of_registration', '-id'],
+                name='student_age_idx',
+            ),
+            # Admin "active" filter. SQLite compares booleans as a bare
+            # column ("WHERE is_active"), which only a partial index can serve
+            models.Index(
+                fields=['-date_of_registration', '-id'],
+                condition=models.Q(is_active=True),
+                name='student_active_idx',
+            ),
+            models.Index(
+                fields=['-date_of_registration', '-id'],
+                condition=models.Q(is_active=False),
+                name='student_inactive_idx',
+            ),
+        ]
 
     # __str__ method defines how the object appears as a string
     # This is used in admin panel, forms, and Django shell
     # Returns the student's full name
     def __str__(self):
         return f"{self.first_name} {self.last_name} (Roll: {self.roll_number})"
+
+
+
+class StudentCounter(models.Model):
+    """
+    StudentCounter holds pre-computed student counts.
+    
+    Counting rows with COUNT(*) has to read the whole table (or index).
+    Instead, database triggers (see counters.py) add or subtract 1 from these
+    rows whenever a student is inserted, updated or deleted, so reading a
+    count is a single primary-key lookup.
+    
+    Counter names:
+        'total'              all students
+        'grade:A' ... 'grade:F'
+        'active:1'           active students
+        'active:0'           inactive students
+    """
+    
+    # name identifies the counter, e.g. 'grade:A'
+    name = models.CharField(max_length=32, primary_key=True)
+    
+    # value is the current count
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Student counter'
+        verbose_name_plural = 'Student counters'
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+
+class StudentChange(models.Model):
+    """
+    StudentChange is one entry of the student change feed.
+    
+    Database triggers (see changelog.py) add an entry for every insert,
+    update and delete of a student - including bulk_create(), bulk_update()
+    and queryset.update(), which skip Model.save(). Downstream systems read
+    the entries after the last sequence number they have seen
+    (/changes?since=<seq>) instead of copying the whole table again.
+    
+    An entry only says which student changed and how; the feed reads the
+    student's current values when it is served.
+    """
+    
+    # AutoField primary key: the sequence number. On SQLite it is declared
+    # AUTOINCREMENT, so numbers keep going up even after old entries are
+    # deleted by compaction
+    seq = models.BigAutoField(primary_key=True)
+    
+    # The student's id (not a ForeignKey: the student may be deleted)
+    student_id = models.BigIntegerField()
+    
+    # What happened to the student
+    OP_CHOICES = [
+        ('I', 'Insert'),
+        ('U', 'Update'),
+        ('D', 'Delete'),
+    ]
+    op = models.CharField(max_length=1, choices=OP_CHOICES)
+    
+    # When the change was made (set by the trigger)
+    changed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Student change'
+        verbose_name_plural = 'Student changes'
+        ordering = ['seq']
+        indexes = [
+            # Compaction finds the latest entry of each student
+            models.Index(fields=['student_id', 'seq'], name='student_change_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.get_op_display()} student {self.student_id}"
+
+
+
+class Job(models.Model):
+    """
+    Job is one background operation (an import, an export, a mass update,
+    a report) run by `python manage.py run_jobs` instead of a web request.
+    
+    See jobs.py for the job kinds, the worker, retries and cancellation.
+    """
+    
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    
+    # kind names the function that does the work (see jobs.py)
+    kind = models.CharField(max_length=50)
+    
+    # JSONField stores a dict: the job function's keyword arguments
+    params = models.JSONField(default=dict, blank=True)
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    
+    # Progress reported by the job: progress_done out of progress_total
+    # (total is None when the job can't tell in advance)
+    progress_done = models.BigIntegerField(default=0)
+    progress_total = models.BigIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=200, blank=True)
+    
+    # How often the job has been started, and how often it may be
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    
+    # Set by jobs.cancel() on a running job; the job stops at its next
+    # progress report
+    cancel_requested = models.BooleanField(default=False)
+    
+    # What the job returned, or the traceback of its last failure
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    # A queued job is not started before this time (retries wait a while)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    # The worker running the job, and when it last said it was still alive
+    worker = models.CharField(max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+        ordering = ['-id']
+        indexes = [
+            # The worker looks for the oldest queued job that is due
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def percent(self):
+        """
+        Progress as a whole percentage, or None if the total is unknown.
+        """
+        if not self.progress_total:
+            return 100 if self.status == self.SUCCEEDED else None
+        return min(100, int(self.progress_done * 100 / self.progress_total))
@@ -0,0 +1,190 @@
+"""
+Keyset (cursor) pagination for the student_app.
+
+Django's built-in Paginator uses OFFSET, which makes the database walk past
+every skipped row: page 10,000 costs 10,000 times more than page 1.
+
+Keyset pagination remembers the last row shown (its sort key) and asks the
+database for "the next N rows after this key". With a matching index the
+cost of every page is the same, no matter how deep the user goes.
+"""
+
+import base64
+import json
+from datetime import date
+
+from django.conf import settings
+# settings: lets a project override the default page size
+
+from django.db.models import Q
+# Q: builds the "after this key" OR condition
+
+
+# The sort order used by the student list.
+# date_of_registration is not unique, so id is added as a tiebreaker
+# to give every row a distinct, stable position.
+ORDERING = ('-date_of_registration', '-id')
+
+# Default number of students per page (can be changed in settings.py)
+DEFAULT_PER_PAGE = 25
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a cursor token cannot be decoded.
+    """
+
+
+def encode_cursor(registered, pk, direction):
+    """
+    Turn a sort key into an opaque, URL-safe token.
+
+    Args:
+        registered: date_of_registration of the boundary row
+        pk: id of the boundary row
+        direction: 'n' (next page) or 'p' (previous page)
+    """
+    payload = json.dumps([registered.isoformat(), pk, direction], separators=(',', ':'))
+    # urlsafe_b64encode gives a token that can go straight into ?cursor=
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Turn a token made by encode_cursor() back into (date, id, direction).
+
+    Raises InvalidCursor if the token has been mangled.
+    """
+    try:
+        # Restore the '=' padding that encode_cursor() stripped
+        padded = token + '=' * (-len(token) % 4)
+        registered, pk, direction = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in ('n', 'p'):
+            raise ValueError(direction)
+        return date.fromisoformat(registered), int(pk), direction
+    except (ValueError, TypeError, json.JSONDecodeError) as exc:
+        raise InvalidCursor(token) from exc
+
+
+class KeysetPage:
+    """
+    One page of results plus the cursors needed to move forwards and backwards.
+    """
+
+    def __init__(self, object_list, next_cursor, prev_cursor):
+        # object_list: the rows on this page, in display order
+        self.object_list = object_list
+        # next_cursor / prev_cursor: tokens for the neighbouring pages (or None)
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginates a Student queryset by (-date_of_registration, -id).
+
+    Usage:
+        page = KeysetPaginator(Student.objects.all()).get_page(request.GET.get('cursor'))
+    """
+
+    def __init__(self, queryset, per_page=None):
+        self.queryset = queryset
+        if per_page is None:
+            per_page = getattr(settings, 'STUDENT_LIST_PER_PAGE', DEFAULT_PER_PAGE)
+        self.per_page = per_page
+
+    def _key(self, row):
+        # Read the sort key from either a model instance or a values() dict
+        if isinstance(row, dict):
+            return row['date_of_registration'], row['id']
+        return row.date_of_registration, row.pk
+
+    def get_page(self, cursor=None):
+        """
+        Return the KeysetPage for the given cursor token.
+
+        An empty or invalid cursor gives the first page, so stale or
+        hand-edited links never produce an error.
+        """
+        queryset, registered, direction = self._page_query(cursor)
+        # Fetch one extra row to find out whether another page exists
+        rows = list(queryset[:self.per_page + 1])
+        return self._make_page(rows, registered, direction)
+
+    async def aget_page(self, cursor=None):
+        """
+        get_page() for async views: the rows are read with the async ORM.
+        """
+        queryset, registered, direction = self._page_query(cursor)
+        rows = [row async for row in queryset[:self.per_page + 1].aiterator()]
+        return self._make_page(rows, registered, direction)
+
+    def _page_query(self, cursor):
+        """
+        Return (ordered queryset after the cursor, boundary date, direction).
+        """
+        try:
+            registered, pk, direction = decode_cursor(cursor) if cursor else (None, None, 'n')
+        except InvalidCursor:
+            registered, pk, direction = None, None, 'n'
+
+        queryset = self.queryset
+        if direction == 'n':
+            # Forwards: rows strictly "older" than the boundary row
+            if registered is not None:
+                queryset = queryset.filter(
+                    Q(date_of_registration__lt=registered) |
+                    Q(date_of_registration=registered, id__lt=pk)
+                )
+            queryset = queryset.order_by(*ORDERING)
+        else:
+            # Backwards: rows strictly "newer" than the boundary row,
+            # read in ascending order so the index is walked the other way
+            queryset = queryset.filter(
+                Q(date_of_registration__gt=registered) |
+                Q(date_of_registration=registered, id__gt=pk)
+            ).order_by('date_of_registration', 'id')
+        return queryset, registered, direction
+
+    def _make_page(self, rows, registered, direction):
+        """
+        Build the KeysetPage from up to per_page + 1 fetched rows.
+        """
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'p':
+            # Put the rows back into display order
+            rows.reverse()
+
+        next_cursor = prev_cursor = None
+        if rows:
+            first_key = self._key(rows[0])
+            last_key = self._key(rows[-1])
+            if direction == 'n':
+                if has_more:
+                    next_cursor = encode_cursor(*last_key, 'n')
+                if registered is not None:
+                    prev_cursor = encode_cursor(*first_key, 'p')
+            else:
+                # We came from a later page, so there is always a next page
+                next_cursor = encode_cursor(*last_key, 'n')
+                if has_more:
+                    prev_cursor = encode_cursor(*first_key, 'p')
+
+        return KeysetPage(rows, next_cursor, prev_cursor)
@@ -0,0 +1,321 @@
+"""
+On-demand profiling of single requests, for staff users.
+
+Add ?profile=1 to a URL (or send the header "X-Profile: 1") while logged in
+as staff, and ProfilerMiddleware runs that request's view:
+
+- under cProfile, saved as <id>.prof - open it with pstats, snakeviz, ...
+- under a sampling profiler that records the real call stack every
+  SAMPLE_INTERVAL seconds, saved as <id>.collapsed - one "a;b;c count" line
+  per stack, the input of flamegraph.pl and speedscope
+- with every SQL statement recorded (time and parameters), and the query
+  plan of each SELECT from EXPLAIN QUERY PLAN, saved in <id>.json with the
+  request's method, path, status and timings.
+
+Profiles are written to STUDENT_PROFILE_DIR; only the newest
+STUDENT_PROFILE_KEEP are kept. The admin lists them (Students -> Profiles)
+with their slowest functions and queries. The response carries the profile
+id in an X-Profile-Id header.
+
+Profiled requests skip the whole-page cache so the view really runs.
+Profiling makes the request several times slower; compare the functions
+and queries with each other, not the total with an unprofiled request.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .instrumentation import sql_hook
+from .metrics import view_label
+
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = 0.001
+
+# Query string parameter and header that ask for a profile
+QUERY_PARAMETER = 'profile'
+HEADER = 'HTTP_X_PROFILE'
+
+# Files making up one profile
+SUFFIXES = ('.json', '.prof', '.collapsed')
+
+# Profile ids are "<date>-<time>-<url name>-<random>"
+PROFILE_ID = re.compile(r'^\d{8}-\d{6}-[\w-]+-[0-9a-f]{6}$')
+
+
+def profile_dir():
+    return Path(getattr(settings, 'STUDENT_PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def wants_profile(request):
+    """
+    True if a staff user asked for this request to be profiled.
+    """
+    asked = request.GET.get(QUERY_PARAMETER) == '1' or request.META.get(HEADER) == '1'
+    if not asked:
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_active and user.is_staff)
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper() hook keeping each statement, its
+    parameters and how long it took.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': None if many else params,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def explain_queries(queries):
+    """
+    Add the EXPLAIN QUERY PLAN lines to each distinct SELECT.
+
+    Run after the view, so the plans don't count towards its time.
+    """
+    plans = {}
+    for query in queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')) or query['params'] is None:
+            continue
+        key = (query['alias'], sql)
+        if key not in plans:
+            connection = connections[query['alias']]
+            if connection.vendor != 'sqlite':
+                continue
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', query['params'])
+                    plans[key] = [row[-1] for row in cursor.fetchall()]
+            except Exception as exc:
+                plans[key] = [f'(could not explain: {exc})']
+        query['plan'] = plans[key]
+
+
+class StackSampler:
+    """
+    Thread recording the call stack of another thread every `interval`.
+
+    Stacks are cut at `root` (the profiler's own frame), so they start
+    at the middleware and view rather than at the server's main loop.
+    """
+
+    def __init__(self, thread_id, root, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='student-profiler', daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def new_profile_id(request):
+    name = re.sub(r'[^\w-]', '-', view_label(request))
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{secrets.token_hex(3)}"
+
+
+def save_profile(profile_id, profiler, sampler, record):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(directory / f'{profile_id}.prof')
+    (directory / f'{profile_id}.collapsed').write_text(sampler.collapsed())
+    (directory / f'{profile_id}.json').write_text(json.dumps(record, indent=1, default=str))
+    prune(directory)
+
+
+def prune(directory, keep=None):
+    """
+    Delete all but the newest `keep` profiles.
+    """
+    if keep is None:
+        keep = getattr(settings, 'STUDENT_PROFILE_KEEP', 50)
+    # Ids start with the date and time, so names sort oldest first
+    records = sorted(directory.glob('*.json'))
+    for path in records[:max(len(records) - keep, 0)]:
+        for suffix in SUFFIXES:
+            path.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def list_profiles():
+    """
+    Return the saved profiles' records, newest first.
+    """
+    directory = profile_dir()
+    if not directory.is_dir():
+        return []
+    records = (load_profile(path.stem) for path in sorted(directory.glob('*.json'), reverse=True))
+    return [record for record in records if record is not None]
+
+
+def profile_file(profile_id, suffix):
+    """
+    Path of one file of a profile, or None if the id or file is unknown.
+    """
+    if not PROFILE_ID.match(profile_id) or suffix not in SUFFIXES:
+        return None
+    path = profile_dir() / f'{profile_id}{suffix}'
+    return path if path.is_file() else None
+
+
+def load_profile(profile_id):
+    """
+    Return a profile's record, or None if there is no such profile.
+    """
+    path = profile_file(profile_id, '.json')
+    if path is None:
+        return None
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def top_functions(profile_id, limit=30):
+    """
+    pstats report of the functions with the most cumulative time.
+    """
+    path = profile_file(profile_id, '.prof')
+    if path is None:
+        return ''
+    output = io.StringIO()
+    pstats.Stats(str(path), stream=output).strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+class ProfileSession:
+    """
+    What is collected while one request is profiled.
+    """
+
+    def __init__(self):
+        self.recorder = QueryRecorder()
+        self.profiler = cProfile.Profile()
+        self.sampler = None
+        self.response = None
+        self.started = time.perf_counter()
+        self.total = 0.0
+
+
+class ProfilerMiddleware:
+    """
+    Profile requests that ask for it; see the module docstring.
+
+    Goes after AuthenticationMiddleware in MIDDLEWARE (it needs request.user).
+    Under ASGI, cProfile and the sampler see the event loop thread; time an
+    async view spends waiting for the ORM shows up as waiting there.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not wants_profile(request):
+            return self.get_response(request)
+
+        with self.profile(request) as session:
+            session.response = self.get_response(request)
+        return self.save(request, session)
+
+    async def __acall__(self, request):
+        # Loading request.user reads the session from the database, so it
+        # is only done (in the ORM thread) when a profile was asked for
+        asked = request.GET.get(QUERY_PARAMETER) == '1' or request.META.get(HEADER) == '1'
+        if not asked or not await sync_to_async(wants_profile)(request):
+            return await self.get_response(request)
+
+        with self.profile(request) as session:
+            session.response = await self.get_response(request)
+        return await sync_to_async(self.save)(request, session)
+
+    @contextmanager
+    def profile(self, request):
+        request.profiling = True
+        session = ProfileSession()
+        root = sys._getframe(2)
+        with ExitStack() as stack:
+            stack.enter_context(sql_hook(session.recorder))
+            session.sampler = stack.enter_context(StackSampler(threading.get_ident(), root))
+            session.profiler.enable()
+            try:
+                yield session
+            finally:
+                session.profiler.disable()
+                session.total = time.perf_counter() - session.started
+
+    def save(self, request, session):
+        response, recorder, sampler = session.response, session.recorder, session.sampler
+        explain_queries(recorder.queries)
+        profile_id = new_profile_id(request)
+        save_profile(profile_id, session.profiler, sampler, {
+            'id': profile_id,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'user': request.user.get_username(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view_label(request),
+            'status': response.status_code,
+            'total_ms': round(session.total * 1000, 2),
+            'sql_ms': round(sum(query['ms'] for query in recorder.queries), 2),
+            'samples': sum(sampler.stacks.values()),
+            'queries': recorder.queries,
+        })
+        response['X-Profile-Id'] = profile_id
+        return response
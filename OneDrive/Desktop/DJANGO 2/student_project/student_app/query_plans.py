@@ -0,0 +1,161 @@
+"""
+Check the query plans of every query the student pages and admin run.
+
+collect_plans() requests each page through the Django test client, records
+the SQL it sends, and asks SQLite how it would run each statement with
+EXPLAIN QUERY PLAN. A plan that reads the whole student table
+("SCAN student_app_student"), or sorts rows that no index lookup narrowed
+down, is flagged because its cost grows with the number of students.
+
+Used by `python manage.py explain_student_queries` and by the test suite,
+so a change that introduces a full scan fails the tests.
+"""
+
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Student
+from .response_cache import get_response_cache
+
+
+# Plan lines that mean "reads every row" or "sorts every matching row"
+FULL_SCAN = re.compile(r'\bSCAN (student_app_student)\b(?! USING)')
+TEMP_SORT = re.compile(r'USE TEMP B-TREE FOR ORDER BY')
+
+# Worth showing, but not a failure: the admin date hierarchy groups
+# dates with a function, which no index can order
+TEMP_DISTINCT = re.compile(r'USE TEMP B-TREE FOR (GROUP BY|DISTINCT)')
+
+# Tables whose queries are checked (others - sessions, auth - are Django's)
+CHECKED_TABLES = ('student_app_student', 'student_app_studentcounter')
+
+
+def scenarios(student):
+    """
+    Return (name, url, params, allow_scan) for every page to check.
+
+    allow_scan marks pages that read the whole table on purpose (exports).
+    """
+    changelist = reverse('admin:student_app_student_changelist')
+    year = student.date_of_registration.year
+    month = student.date_of_registration.month
+    return [
+        ('list', reverse('student_list'), {}, False),
+        ('list search', reverse('student_list'), {'search': 'raj'}, False),
+        ('list next page', reverse('student_list'), {'cursor': 'NEXT'}, False),
+        ('detail', reverse('student_detail', args=[student.pk]), {}, False),
+        ('update form', reverse('student_update', args=[student.pk]), {}, False),
+        ('delete confirm', reverse('student_delete', args=[student.pk]), {}, False),
+        ('admin changelist', changelist, {}, False),
+        ('admin filter grade', changelist, {'grade__exact': 'A'}, False),
+        ('admin filter active', changelist, {'is_active__exact': '1'}, False),
+        ('admin filter inactive', changelist, {'is_active__exact': '0'}, False),
+        ('admin filter active grade', changelist, {'is_active__exact': '1', 'grade__exact': 'B'}, False),
+        ('admin filter age', changelist, {'age': '20'}, False),
+        ('admin filter registered', changelist, {'date_of_registration__gte': str(student.date_of_registration)}, False),
+        ('admin date hierarchy', changelist, {'date_of_registration__year': year}, False),
+        ('admin date hierarchy month', changelist,
+         {'date_of_registration__year': year, 'date_of_registration__month': month}, False),
+        ('admin search', changelist, {'q': 'raj'}, False),
+        ('admin change form', reverse('admin:student_app_student_change', args=[student.pk]), {}, False),
+        ('export', reverse('student_export'), {'format': 'csv'}, True),
+    ]
+
+
+def explain(sql):
+    """
+    Return the EXPLAIN QUERY PLAN lines for an SQL statement.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def _narrowed(plan):
+    # SEARCH means an index or rowid lookup picked out the rows
+    return any(line.startswith('SEARCH student_app_student') for line in plan)
+
+
+def plan_problems(plan):
+    problems = []
+    for line in plan:
+        if FULL_SCAN.search(line):
+            problems.append(f'full table scan: {line}')
+        elif TEMP_SORT.search(line) and not _narrowed(plan):
+            problems.append(f'sort without index: {line}')
+    return problems
+
+
+def plan_notes(plan):
+    """
+    Temporary b-trees that are acceptable: DISTINCT/GROUP BY, and sorting
+    rows that an index lookup (e.g. a search) has already narrowed down.
+    """
+    return [
+        f'temporary b-tree: {line}' for line in plan
+        if TEMP_DISTINCT.search(line) or (TEMP_SORT.search(line) and _narrowed(plan))
+    ]
+
+
+def collect_plans():
+    """
+    Request every scenario page and return a list of dicts:
+        {'scenario', 'sql', 'plan', 'problems', 'notes'}
+
+    Needs some students in the database (at least one); callers normally
+    run it inside a transaction they roll back.
+    """
+    if connection.vendor != 'sqlite':
+        raise RuntimeError('EXPLAIN QUERY PLAN checks need SQLite.')
+
+    student = Student.objects.order_by('-date_of_registration', '-id').first()
+    if student is None:
+        raise RuntimeError('Add at least one student before collecting query plans.')
+
+    user_model = get_user_model()
+    admin = user_model.objects.filter(is_superuser=True).first()
+    if admin is None:
+        admin = user_model.objects.create_superuser('explain-queries', 'explain@example.com', None)
+    client = Client()
+    client.force_login(admin)
+
+    results = []
+    seen = set()
+    for name, url, params, allow_scan in scenarios(student):
+        if params.get('cursor') == 'NEXT':
+            # Follow the first page's "next" link
+            first = client.get(reverse('student_list'))
+            cursor = first.context['page_obj'].next_cursor if first.context else None
+            params = {'cursor': cursor or ''}
+
+        # Page caches would hide the queries
+        get_response_cache().clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url, params)
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith('SELECT'):
+                continue
+            if not any(table in sql for table in CHECKED_TABLES):
+                continue
+            if (name, sql) in seen:
+                continue
+            seen.add((name, sql))
+            plan = explain(sql)
+            problems = [] if allow_scan else plan_problems(plan)
+            results.append({
+                'scenario': name,
+                'sql': sql,
+                'plan': plan,
+                'problems': problems,
+                'notes': plan_notes(plan),
+            })
+    return results
@@ -0,0 +1,363 @@
+"""
+Whole-response cache for the student list and detail pages.
+
+Pages are stored in the CACHES alias named by STUDENT_RESPONSE_CACHE. Each
+stored page remembers the "version" of the data it was built from:
+
+- the list pages share one version, bumped by every student save/delete;
+- each detail page has its own version, bumped when that student changes;
+- all pages also share a "generation", bumped by invalidate_all_students()
+  after writes that change most of the table (e.g. rollover.py), which
+  would otherwise need one detail version bump per student.
+
+The post_save / post_delete signals (connected in apps.py) bump the
+versions, so a page is never served after its data changed - no guessing
+with timeouts. Bulk writes that skip signals call invalidate_students().
+
+Those versions only reach the processes that share the cache. A page's
+version therefore also holds the value its ETag is built from
+(conditional.py): the list watermark kept by the triggers, or the
+student's updated_at. Both come from the database and are read for the
+ETag anyway, so a write made by any process - another worker, run_jobs,
+import_students, rollover - retires the page too, even with LocMemCache.
+
+When a page is missing or out of date, only one request rebuilds it: the
+others serve the previous version if there is one (stale-while-revalidate)
+or wait briefly for the rebuilt page, instead of all hitting the database
+at once (a "cache stampede").
+
+With several worker processes a shared alias (file-based, memcached,
+redis, ...) also shares the rebuilt pages between them.
+"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.http import HttpResponse
+
+from .conditional import (
+    detail_stamp, has_pending_messages, list_stamp, prefetch_updated_at, prefetch_watermark,
+)
+
+
+KEY_PREFIX = 'student_response'
+
+# Safety-net lifetime of a cached page (versions normally retire them first)
+PAGE_TIMEOUT = 60 * 60
+
+# How long one request may hold the rebuild lock for a page
+LOCK_TIMEOUT = 10
+
+# How long a request without a stale copy waits for another to rebuild
+WAIT_TIMEOUT = 2.0
+WAIT_INTERVAL = 0.02
+
+# Response headers kept with a cached page
+CACHED_HEADERS = ('Content-Type', 'Content-Language')
+
+# Hit/miss counters for this process
+_stats = {'hit': 0, 'miss': 0, 'stale': 0, 'wait': 0, 'bypass': 0}
+_stats_lock = threading.Lock()
+
+
+# Backends that keep entries in this process: nothing to wait for, so
+# async code calls them directly instead of via a thread (their a* methods)
+IN_PROCESS_BACKENDS = (LocMemCache, DummyCache)
+
+
+def get_response_cache():
+    return caches[getattr(settings, 'STUDENT_RESPONSE_CACHE', 'default')]
+
+
+async def acache(cache, method, *args):
+    """
+    await cache.a<method>(*args), or cache.<method>(*args) for in-process backends.
+    """
+    if isinstance(cache, IN_PROCESS_BACKENDS):
+        return getattr(cache, method)(*args)
+    return await getattr(cache, f'a{method}')(*args)
+
+
+def _count(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def stats():
+    """
+    Return this process's cache counters and hit ratio.
+    """
+    with _stats_lock:
+        result = dict(_stats)
+    lookups = result['hit'] + result['miss'] + result['stale'] + result['wait']
+    result['hit_ratio'] = (result['hit'] + result['stale']) / lookups if lookups else 0.0
+    return result
+
+
+def reset_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+
+# ---------------------------------------------------------------------------
+# Versions
+# ---------------------------------------------------------------------------
+
+def list_version_key():
+    return f'{KEY_PREFIX}:version:list'
+
+
+def detail_version_key(pk):
+    return f'{KEY_PREFIX}:version:detail:{pk}'
+
+
+def generation_key():
+    return f'{KEY_PREFIX}:generation'
+
+
+def _bump(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing (never set, or evicted): start from a fresh, unique number
+        # so no page stored under an older version can match again
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_students(pks=()):
+    """
+    Retire the cached list pages and the detail pages of the given students.
+
+    Called from signals for single writes; call it directly (with no pks)
+    after bulk operations, which don't send signals.
+    """
+    cache = get_response_cache()
+    _bump(cache, list_version_key())
+    for pk in pks:
+        _bump(cache, detail_version_key(pk))
+
+
+def invalidate_all_students():
+    """
+    Retire every cached list and detail page with one cache write.
+    """
+    _bump(get_response_cache(), generation_key())
+
+
+def student_changed(sender, instance, **kwargs):
+    """
+    post_save / post_delete handler.
+
+    Versions are bumped now and again once the transaction commits: a page
+    rebuilt between the two (from data that was not yet committed) would
+    otherwise stay cached after the commit.
+    """
+    pks = [instance.pk]
+    invalidate_students(pks)
+    transaction.on_commit(lambda: invalidate_students(pks))
+
+
+# ---------------------------------------------------------------------------
+# Page keys
+# ---------------------------------------------------------------------------
+
+def list_page_keys(request):
+    """
+    Return (page key, version key) for a student_list request.
+
+    The search text is normalised (case and spacing) so that "Raj",
+    " raj" and "RAJ" share one cached page.
+    """
+    search = ' '.join(request.GET.get('search', '').split()).casefold()
+    cursor = request.GET.get('cursor', '')
+    digest = hashlib.md5(f'{search}\0{cursor}'.encode()).hexdigest()
+    return f'{KEY_PREFIX}:page:list:{digest}', list_version_key()
+
+
+def detail_page_keys(request, pk):
+    return f'{KEY_PREFIX}:page:detail:{pk}', detail_version_key(pk)
+
+
+# ---------------------------------------------------------------------------
+# Decorator
+# ---------------------------------------------------------------------------
+
+def _to_response(entry, outcome):
+    response = HttpResponse(entry['content'], status=200)
+    for header, value in entry['headers'].items():
+        response[header] = value
+    response['X-Cache'] = outcome.upper()
+    return response
+
+
+def _bypass(request):
+    # Only plain page views are cached. Profiled requests (see
+    # profiling.py) must run the real view.
+    return (request.method not in ('GET', 'HEAD') or has_pending_messages(request)
+            or getattr(request, 'profiling', False))
+
+
+def _entry(response, version):
+    """
+    The cache entry for a freshly rendered response (None if not cacheable).
+    """
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    return {
+        'version': version,
+        'content': response.content,
+        'headers': {h: response[h] for h in CACHED_HEADERS if h in response},
+    }
+
+
+def _current(cache, found, key):
+    value = found.get(key)
+    if value is None:
+        # First use (or evicted): create the version atomically
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+async def _acurrent(cache, found, key):
+    value = found.get(key)
+    if value is None:
+        await acache(cache, 'add', key, time.time_ns(), None)
+        value = await acache(cache, 'get', key)
+    return value
+
+
+def cache_page_versioned(keys_func, stamp_func):
+    """
+    Decorator caching a view's 200 responses under keys_func(request, ...).
+
+    keys_func returns (page key, version key); stamp_func returns the
+    database value the page depends on (see the module docstring).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if _bypass(request):
+                _count('bypass')
+                return view(request, *args, **kwargs)
+
+            cache = get_response_cache()
+            page_key, version_key = keys_func(request, *args, **kwargs)
+            lock_key = f'{page_key}:lock'
+
+            found = cache.get_many([page_key, version_key, generation_key()])
+            version = (
+                _current(cache, found, generation_key()),
+                _current(cache, found, version_key),
+                stamp_func(request, *args, **kwargs),
+            )
+            entry = found.get(page_key)
+
+            if entry is not None and entry['version'] == version:
+                _count('hit')
+                return _to_response(entry, 'hit')
+
+            # Missing or out of date: only the request holding the lock rebuilds
+            owns_lock = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            if not owns_lock:
+                if entry is not None:
+                    _count('stale')
+                    return _to_response(entry, 'stale')
+                deadline = time.monotonic() + WAIT_TIMEOUT
+                while time.monotonic() < deadline:
+                    time.sleep(WAIT_INTERVAL)
+                    entry = cache.get(page_key)
+                    if entry is not None and entry['version'] == version:
+                        _count('wait')
+                        return _to_response(entry, 'wait')
+                # The rebuilding request is too slow; render without the cache
+
+            _count('miss')
+            try:
+                response = view(request, *args, **kwargs)
+                entry = _entry(response, version)
+                if entry is not None:
+                    cache.set(page_key, entry, PAGE_TIMEOUT)
+                response['X-Cache'] = 'MISS'
+                return response
+            finally:
+                if owns_lock:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
+
+
+def cache_page_versioned_async(keys_func, stamp_func, prefetch):
+    """
+    cache_page_versioned() for async views.
+
+    Same steps, through acache(), and waiting for another request's rebuild
+    with asyncio.sleep() so the event loop keeps serving. prefetch(request,
+    ...) reads what stamp_func needs with the async ORM first (nothing, when
+    the conditional decorator already did).
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if _bypass(request):
+                _count('bypass')
+                return await view(request, *args, **kwargs)
+
+            cache = get_response_cache()
+            page_key, version_key = keys_func(request, *args, **kwargs)
+            lock_key = f'{page_key}:lock'
+
+            found = await acache(cache, 'get_many', [page_key, version_key, generation_key()])
+            await prefetch(request, *args, **kwargs)
+            version = (
+                await _acurrent(cache, found, generation_key()),
+                await _acurrent(cache, found, version_key),
+                stamp_func(request, *args, **kwargs),
+            )
+            entry = found.get(page_key)
+
+            if entry is not None and entry['version'] == version:
+                _count('hit')
+                return _to_response(entry, 'hit')
+
+            owns_lock = await acache(cache, 'add', lock_key, 1, LOCK_TIMEOUT)
+            if not owns_lock:
+                if entry is not None:
+                    _count('stale')
+                    return _to_response(entry, 'stale')
+                deadline = time.monotonic() + WAIT_TIMEOUT
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(WAIT_INTERVAL)
+                    entry = await acache(cache, 'get', page_key)
+                    if entry is not None and entry['version'] == version:
+                        _count('wait')
+                        return _to_response(entry, 'wait')
+
+            _count('miss')
+            try:
+                response = await view(request, *args, **kwargs)
+                entry = _entry(response, version)
+                if entry is not None:
+                    await acache(cache, 'set', page_key, entry, PAGE_TIMEOUT)
+                response['X-Cache'] = 'MISS'
+                return response
+            finally:
+                if owns_lock:
+                    await acache(cache, 'delete', lock_key)
+        return wrapper
+    return decorator
+
+
+cache_student_list = cache_page_versioned(list_page_keys, list_stamp)
+cache_student_detail = cache_page_versioned(detail_page_keys, detail_stamp)
+cache_student_list_async = cache_page_versioned_async(list_page_keys, list_stamp, prefetch_watermark)
+cache_student_detail_async = cache_page_versioned_async(detail_page_keys, detail_stamp, prefetch_updated_at)
@@ -0,0 +1,227 @@
+"""
+Year-end rollover: recompute every age and move students between grades.
+
+Student.age is stored next to date_of_birth (the list pages sort and filter
+on it), so it goes stale as birthdays pass. rollover() brings it back in
+line and, at the same time, applies a grade transition mapping such as
+{'F': 'D', 'D': 'C'} (from STUDENT_GRADE_TRANSITIONS, or passed in):
+
+    python manage.py rollover
+    python manage.py rollover --map F=D,D=C --as-of 2025-06-01
+    python manage.py rollover --dry-run
+
+or the "Roll over selected students" action in the admin.
+
+The work is done by the database, not by loading students into Python:
+the table is walked in ranges of CHUNK_SIZE ids, and each range is one
+statement
+
+    UPDATE student_app_student
+    SET age = <age from date_of_birth>,
+        grade = CASE WHEN grade = 'F' THEN 'D' WHEN grade = 'D' THEN 'C' ... ELSE grade END,
+        updated_at = <now>
+    WHERE id >= 1 AND id < 10001 AND (age != <age from date_of_birth> OR grade IN ('F', 'D'))
+
+run through the writer queue (write_queue.py), so other writes get a turn
+between chunks. The CASE reads the grade from before the statement: with
+{'F': 'D', 'D': 'C'} an F student becomes D, not C. Rows that are already
+right are not touched, so they keep their updated_at and row cache entries.
+
+The student triggers keep the counters (counters.py), the change feed
+(changelog.py) and the list watermark up to date, as for any UPDATE.
+Because the statement can change most of the table, the page cache is
+cleared with one invalidate_all_students() instead of a version bump per
+student.
+
+verify() checks the result row by row against the plain Python rules
+(synthetic.age_on() and the mapping); bench_rollover runs both on a
+million-student copy of the table.
+"""
+
+import time
+from datetime import date
+from functools import partial
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, CharField, Count, F, IntegerField, Max, Min, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+
+from .models import Student
+from .response_cache import invalidate_all_students
+from .synthetic import age_on
+from .write_queue import run_write
+
+
+# Ids per UPDATE statement
+CHUNK_SIZE = 10_000
+
+GRADES = dict(Student.GRADE_CHOICES)
+
+
+def grade_transitions():
+    """
+    The mapping in settings.STUDENT_GRADE_TRANSITIONS (none by default).
+    """
+    return check_transitions(getattr(settings, 'STUDENT_GRADE_TRANSITIONS', {}))
+
+
+def check_transitions(transitions):
+    """
+    Return the mapping without no-op entries; ValueError for unknown grades.
+    """
+    unknown = sorted({grade for pair in transitions.items() for grade in pair} - set(GRADES))
+    if unknown:
+        raise ValueError(f"Unknown grade(s): {', '.join(map(str, unknown))}. Choose from: {', '.join(GRADES)}.")
+    return {old: new for old, new in transitions.items() if old != new}
+
+
+def parse_transitions(text):
+    """
+    'F=D,D=C' -> {'F': 'D', 'D': 'C'}
+    """
+    transitions = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        old, sep, new = item.partition('=')
+        if not sep:
+            raise ValueError(f'Expected OLD=NEW, got "{item}".')
+        transitions[old.strip().upper()] = new.strip().upper()
+    return check_transitions(transitions)
+
+
+def age_expression(today, vendor=None):
+    """
+    The age on `today` of the student's date_of_birth, as an SQL expression.
+    """
+    if (vendor or connection.vendor) == 'sqlite':
+        # SQLite stores dates as 'YYYY-MM-DD' text: compare the pieces
+        # directly, instead of calling Django's Python date functions for
+        # every row
+        return RawSQL(
+            '%s - CAST(substr("date_of_birth", 1, 4) AS INTEGER) - (substr("date_of_birth", 6, 5) > %s)',
+            (today.year, today.strftime('%m-%d')),
+            output_field=IntegerField(),
+        )
+    birthday_ahead = (
+        Q(date_of_birth__month__gt=today.month)
+        | Q(date_of_birth__month=today.month, date_of_birth__day__gt=today.day)
+    )
+    return (
+        Value(today.year) - ExtractYear('date_of_birth')
+        - Case(When(birthday_ahead, then=Value(1)), default=Value(0))
+    )
+
+
+def grade_expression(transitions):
+    """
+    CASE expression giving each student's grade after the transitions.
+    """
+    return Case(
+        *(When(grade=old, then=Value(new)) for old, new in transitions.items()),
+        default=F('grade'),
+        output_field=CharField(),
+    )
+
+
+def _changes(today, transitions):
+    # Update values and the condition for rows they would change
+    age = age_expression(today)
+    values = {'age': age}
+    stale = ~Q(age=age)
+    if transitions:
+        values['grade'] = grade_expression(transitions)
+        stale |= Q(grade__in=list(transitions))
+    return values, stale
+
+
+def pending(students=None, transitions=None, today=None):
+    """
+    What rollover() would change, without changing anything:
+        {'ages': n, 'grades': {'F': n, ...}}
+    """
+    students = Student.objects.all() if students is None else students
+    transitions = grade_transitions() if transitions is None else check_transitions(transitions)
+    today = today or date.today()
+    grades = dict(
+        students.filter(grade__in=list(transitions)).order_by()
+        .values_list('grade').annotate(Count('pk'))
+    ) if transitions else {}
+    return {
+        'ages': students.exclude(age=age_expression(today)).count(),
+        'grades': {old: grades.get(old, 0) for old in transitions},
+    }
+
+
+def rollover(students=None, transitions=None, today=None, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Recompute the age (as of `today`) and apply the grade transitions (default
+    STUDENT_GRADE_TRANSITIONS) for `students` (default all), one UPDATE per
+    range of chunk_size ids; see the module docstring.
+
+    progress(done, total) is called after each chunk, in ids covered.
+    Returns {'updated': n, 'chunks': n, 'seconds': s}.
+    """
+    students = Student.objects.all() if students is None else students
+    transitions = grade_transitions() if transitions is None else check_transitions(transitions)
+    today = today or date.today()
+    values, stale = _changes(today, transitions)
+    values['updated_at'] = timezone.now()
+
+    started = time.perf_counter()
+    bounds = students.aggregate(low=Min('pk'), high=Max('pk'))
+    updated = chunks = 0
+    try:
+        if bounds['low'] is not None:
+            low, end = bounds['low'], bounds['high'] + 1
+            for start in range(low, end, chunk_size):
+                chunk = students.filter(pk__gte=start, pk__lt=start + chunk_size).filter(stale)
+                updated += run_write(partial(chunk.update, **values))
+                chunks += 1
+                if progress is not None:
+                    progress(min(start + chunk_size, end) - low, end - low)
+    finally:
+        # Each chunk commits on its own: retire the pages even when a later
+        # chunk (or progress()) raised
+        if updated:
+            invalidate_all_students()
+    return {'updated': updated, 'chunks': chunks, 'seconds': time.perf_counter() - started}
+
+
+def snapshot(students=None):
+    """
+    {id: grade} of the students, taken before rollover() for verify().
+    """
+    students = Student.objects.all() if students is None else students
+    return dict(students.values_list('pk', 'grade').iterator(chunk_size=CHUNK_SIZE))
+
+
+def verify(before, transitions, today, students=None, limit=20):
+    """
+    Check every student of `before` ({id: grade} from snapshot()) against a
+    per-row Python computation of the rollover: age_on(date_of_birth, today)
+    and the grade transitions applied to the old grade.
+
+    Returns {'checked': n, 'wrong': n, 'examples': [(id, field, expected, actual), ...]}
+    with at most `limit` examples.
+    """
+    students = Student.objects.all() if students is None else students
+    transitions = check_transitions(transitions)
+    result = {'checked': 0, 'wrong': 0, 'examples': []}
+    rows = students.values_list('pk', 'date_of_birth', 'age', 'grade').iterator(chunk_size=CHUNK_SIZE)
+    for pk, birth, age, grade in rows:
+        old_grade = before.get(pk)
+        if old_grade is None:
+            # Added after the snapshot
+            continue
+        result['checked'] += 1
+        for field, expected, actual in (
+            ('age', age_on(birth, today), age),
+            ('grade', transitions.get(old_grade, old_grade), grade),
+        ):
+            if actual != expected:
+                result['wrong'] += 1
+                if len(result['examples']) < limit:
+                    result['examples'].append((pk, field, expected, actual))
+    return result
@@ -0,0 +1,105 @@
+"""
+Fragment cache for the rows of the student list table.
+
+Rendering a row runs three {% url %} reversals, get_grade_display and a
+date filter. The finished HTML of a row only changes when the student is
+saved, so it is cached under a key made from the student's pk and
+updated_at. A page of rows is then one cache.get_many() call plus rendering
+only the rows that were missing.
+
+The student list only uses this when STUDENT_LEAN_ROWS is False; by default
+it builds its rows with lean_rows.py, which is faster than even a warm cache.
+
+The cache backend is the CACHES alias named by STUDENT_ROW_CACHE in
+settings.py (locmem by default; a FileBasedCache alias shares rows between
+worker processes). `python manage.py warm_student_rows` pre-renders rows.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .response_cache import acache
+
+
+ROW_TEMPLATE = 'student_app/_student_row.html'
+
+# Cached rows are replaced anyway when a student changes, so they can live long
+ROW_TIMEOUT = 60 * 60 * 24 * 7
+
+_template = None
+_template_version = None
+
+
+def get_row_cache():
+    return caches[getattr(settings, 'STUDENT_ROW_CACHE', 'default')]
+
+
+def _row_template():
+    """
+    Return the compiled row template and a hash of its source.
+
+    The hash is part of every key, so editing the template retires all
+    previously cached rows (important for the file-based backend, whose
+    entries outlive a deploy).
+    """
+    global _template, _template_version
+    if _template is None:
+        template = get_template(ROW_TEMPLATE)
+        _template_version = hashlib.md5(template.template.source.encode()).hexdigest()[:8]
+        _template = template
+    return _template, _template_version
+
+
+def row_key(student, version):
+    return f'student_row:{version}:{student.pk}:{student.updated_at.timestamp():.6f}'
+
+
+def render_rows(students):
+    """
+    Return the HTML of the table rows for students, in order.
+
+    students can be Student instances or anything with the same attributes.
+    """
+    template, version = _row_template()
+    cache = get_row_cache()
+
+    keys = [row_key(student, version) for student in students]
+    html, missing = _fill_rows(template, keys, students, cache.get_many(keys))
+    if missing:
+        cache.set_many(missing, ROW_TIMEOUT)
+    return html
+
+
+async def arender_rows(students):
+    """
+    render_rows() for async views (see response_cache.acache()).
+    """
+    template, version = _row_template()
+    cache = get_row_cache()
+
+    keys = [row_key(student, version) for student in students]
+    html, missing = _fill_rows(template, keys, students, await acache(cache, 'get_many', keys))
+    if missing:
+        await acache(cache, 'set_many', missing, ROW_TIMEOUT)
+    return html
+
+
+def _fill_rows(template, keys, students, cached):
+    """
+    Join the cached rows, rendering the missing ones.
+
+    Returns (HTML, {key: HTML} of the rows that were rendered).
+    """
+    missing = {}
+    parts = []
+    for key, student in zip(keys, students):
+        html = cached.get(key)
+        if html is None:
+            html = template.render({'student': student})
+            missing[key] = html
+        parts.append(html)
+    return mark_safe(''.join(parts)), missing
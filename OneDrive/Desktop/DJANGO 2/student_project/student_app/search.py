@@ -0,0 +1,187 @@
+"""
+Full-text search for students.
+
+Searching with icontains turns into SQL like `LIKE '%raj%'`, which has to
+read every row in the table. This module uses SQLite's FTS5 extension
+instead: an inverted index of the words in first_name, last_name, email,
+roll_number and phone_number that answers prefix queries without scanning
+the table.
+
+The FTS5 table and its sync triggers are created by migration 0003. When
+FTS5 is not available (another database, or an SQLite build without it)
+search falls back to the old icontains query, as it does for queries with
+no words in them (e.g. "@").
+
+Usage:
+    students = search_students(Student.objects.all(), 'raj kum')
+"""
+
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from . import trigram
+
+
+# Name of the FTS5 virtual table (created in migrations/0003_student_fts.py)
+FTS_TABLE = 'student_app_student_fts'
+
+# Triggers that keep the index in sync with student_app_student.
+# They are re-created after every migrate, because Django rebuilds SQLite
+# tables (dropping their triggers) when a column is altered.
+TRIGGER_SQL = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON student_app_student BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, email, roll_number, phone_number)
+            VALUES (new.id, new.first_name, new.last_name, new.email, new.roll_number, new.phone_number);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON student_app_student BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, email, roll_number, phone_number)
+            VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.roll_number, old.phone_number);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF
+            first_name, last_name, email, roll_number, phone_number ON student_app_student BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, email, roll_number, phone_number)
+            VALUES ('delete', old.id, old.first_name, old.last_name, old.email, old.roll_number, old.phone_number);
+            INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, email, roll_number, phone_number)
+            VALUES (new.id, new.first_name, new.last_name, new.email, new.roll_number, new.phone_number);
+        END
+    """,
+}
+
+# Above this many trigram candidates the query is not selective, and a
+# plain table scan is cheaper than a long `pk__in` list
+TRIGRAM_MAX_CANDIDATES = 500
+
+# Characters that separate search terms (FTS5 tokenizes on these too)
+TERM_SPLIT = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def fts_enabled(using=connection):
+    """
+    Return True when the FTS5 index table exists on this database.
+
+    The answer is remembered on the connection (per database file), so
+    searches do not query sqlite_master every time.
+    """
+    if using.vendor != 'sqlite':
+        return False
+    name = using.settings_dict['NAME']
+    cached = getattr(using, '_student_fts_enabled', None)
+    if cached is None or cached[0] != name:
+        cached = (name, FTS_TABLE in using.introspection.table_names())
+        using._student_fts_enabled = cached
+    return cached[1]
+
+
+def build_match_expression(query):
+    """
+    Turn free text typed by a user into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term and all terms must match:
+        'Raj kum'           -> '"raj"* AND "kum"*'
+        'amit@example.com'  -> '"amit"* AND "example"* AND "com"*'
+
+    Returns an empty string when the query has no searchable words.
+    """
+    terms = [term for term in TERM_SPLIT.split(query.lower()) if term]
+    # Quoting each term stops FTS5 operators (NEAR, OR, -, ...) in user input
+    # from being interpreted as query syntax
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+def icontains_condition(query):
+    return (
+        Q(first_name__icontains=query) |
+        Q(last_name__icontains=query) |
+        Q(email__icontains=query) |
+        Q(roll_number__icontains=query)
+    )
+
+
+def icontains_filter(queryset, query):
+    """
+    The original search: case-insensitive substring match on four columns.
+
+    Used when FTS5 is unavailable. It scans the whole table.
+    """
+    return queryset.filter(icontains_condition(query))
+
+
+def search_students(queryset, query):
+    """
+    Filter a Student queryset down to the rows matching query.
+
+    The queryset's ordering is kept, so the result can still be
+    paginated with KeysetPaginator.
+
+    When the trigram index is enabled (see trigram.py), substring matches
+    on names and email are returned as well as full-text word matches.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    if not fts_enabled(connection):
+        return icontains_filter(queryset, query)
+
+    condition = Q()
+    expression = build_match_expression(query)
+    if expression:
+        condition |= Q(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [expression],
+        ))
+
+    index = trigram.get_index()
+    candidates = index.candidates(query) if index is not None else None
+    if candidates is not None:
+        if len(candidates) > TRIGRAM_MAX_CANDIDATES:
+            # Not selective: scan for the substrings, still keeping the
+            # word matches above (phone and roll number words, for example)
+            condition |= icontains_condition(query)
+        else:
+            # Confirm the candidates: trigrams may have come from different fields
+            condition |= Q(pk__in=candidates) & (
+                Q(first_name__icontains=query) |
+                Q(last_name__icontains=query) |
+                Q(email__icontains=query)
+            )
+
+    if not condition:
+        # No words to look up (e.g. "@"): only a substring scan can match
+        return icontains_filter(queryset, query)
+    return queryset.filter(condition)
+
+
+def rebuild_index(using=connection):
+    """
+    Rebuild the FTS5 index from the student table.
+    """
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def ensure_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate handler: re-create any sync triggers that have gone missing
+    and rebuild the index if they had, since it may have missed writes.
+    """
+    using = connections[using]
+    # Forget the cached answer: migrate may have created or dropped the table
+    using._student_fts_enabled = None
+    if not fts_enabled(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGER_SQL if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGER_SQL[name])
+    if missing:
+        rebuild_index(using)
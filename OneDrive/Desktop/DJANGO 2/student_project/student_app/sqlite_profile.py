@@ -0,0 +1,82 @@
+"""
+SQLite settings applied to every new database connection.
+
+SQLite keeps most of its tuning per connection, and Django 4.2 has no
+"init_command" option for SQLite, so the PRAGMA statements in the
+SQLITE_PRAGMAS setting are run from the connection_created signal
+(connected in apps.py). With CONN_MAX_AGE set, a worker keeps its
+connection between requests, so this happens once per connection rather
+than once per request.
+
+What the production profile in settings.py changes:
+
+- journal_mode=WAL: readers no longer block the writer (or the writer the
+  readers). Only one write happens at a time, but the page list and detail
+  views keep working during an import. Stored in the database file.
+- synchronous=NORMAL: with WAL, commits don't wait for the disk on every
+  transaction; a power cut can lose the last commits, never corrupt the file.
+- busy_timeout: a writer that finds the database locked waits (in ms)
+  instead of failing at once with "database is locked".
+- cache_size / mmap_size / temp_store: more page cache, memory-mapped reads
+  and in-memory temporary tables for sorts.
+
+busy_timeout has one gap: a transaction that reads first takes a read
+lock, and if another connection commits before it writes, upgrading to
+the write lock fails at once - waiting could not help, its reads are
+already out of date. Writing to the FTS5 search index counts as reading
+first (FTS5 reads its own tables before it writes), so any student write
+inside transaction.atomic() can hit this. lock_for_write() takes the
+write lock up front for such transactions.
+"""
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# Pragmas that mean nothing for an in-memory database (':memory:')
+FILE_ONLY_PRAGMAS = {'journal_mode', 'mmap_size'}
+
+
+def configure_connection(sender, connection, **kwargs):
+    """
+    connection_created handler: run the SQLITE_PRAGMAS on a new connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None) or {}
+    in_memory = connection.is_in_memory_db()
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if not name.isidentifier():
+                raise ValueError(f'Invalid SQLite pragma name: {name!r}')
+            if in_memory and name in FILE_ONLY_PRAGMAS:
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def current_pragmas(connection, names=None):
+    """
+    Return {name: value} as SQLite reports them for this connection.
+    """
+    if names is None:
+        names = getattr(settings, 'SQLITE_PRAGMAS', None) or {}
+    with connection.cursor() as cursor:
+        result = {}
+        for name in names:
+            cursor.execute(f'PRAGMA {name}')
+            result[name] = cursor.fetchone()[0]
+    return result
+
+
+def lock_for_write(table, using=DEFAULT_DB_ALIAS):
+    """
+    Take SQLite's write lock now, inside a transaction.atomic() block that
+    reads before it writes (see the module docstring). Django 4.2 can't
+    start the transaction with BEGIN IMMEDIATE, so this runs an UPDATE on
+    `table` that changes no rows; it waits for busy_timeout like any write.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'UPDATE {connection.ops.quote_name(table)} SET rowid = rowid WHERE 0')
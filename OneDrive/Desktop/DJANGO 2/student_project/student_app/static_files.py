@@ -0,0 +1,244 @@
+"""
+Serve the collected static files from the Django process itself.
+
+StaticFilesMiddleware answers requests under STATIC_URL from STATIC_ROOT
+(what `python manage.py collectstatic` fills), so no separate web server
+or CDN is needed for CSS, JS and fonts:
+
+- the files are listed once, when the first static request arrives, so a
+  request is a dict lookup, not a walk through the file system;
+- a precompressed .br or .gz copy (see static_storage.py) is sent when the
+  browser accepts it, with Content-Encoding and "Vary: Accept-Encoding";
+- content-hashed names (those in collectstatic's manifest) never change,
+  so they are sent with "Cache-Control: public, max-age=31536000, immutable"
+  and browsers don't ask for them again; other names get a short max-age
+  and an ETag, and a matching If-None-Match gets a 304;
+- files up to MEMORY_LIMIT bytes are kept in memory after the first read.
+
+The middleware goes first in MIDDLEWARE, so static requests skip the rest
+(sessions, timing, metrics). It does nothing until STATIC_ROOT exists, so
+runserver's own static handling works as before while developing. Files
+added by a later collectstatic are seen after a restart (or
+StaticFilesMiddleware.index.reset()). STUDENT_SERVE_STATIC = False turns it
+off, e.g. when a proxy in front serves STATIC_ROOT.
+"""
+
+import mimetypes
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import checks
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+
+# Content-hashed files: cached by browsers for a year without revalidating
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Other files: cached briefly, then revalidated with the ETag
+CACHE_CONTROL = 'public, max-age=60'
+
+# Encodings in order of preference: (Accept-Encoding token, file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Files up to this size are kept in memory once read
+MEMORY_LIMIT = 512 * 1024
+
+
+def check_vendored_assets(app_configs=None, **kwargs):
+    """
+    System check: warn when the vendored Bootstrap/Font Awesome are missing.
+    """
+    from .management.commands.vendor_static import missing_assets
+
+    missing = missing_assets()
+    if not missing:
+        return []
+    return [checks.Warning(
+        f"{len(missing)} vendored static file(s) are missing from static/vendor/ "
+        f"({', '.join(missing)}); pages load them from the CDN instead.",
+        hint='Run "python manage.py vendor_static" on a machine with network access and commit the files.',
+        id='student_app.W001',
+    )]
+
+
+def vendor_url(path):
+    """
+    URL of the vendored file static/vendor/<path>, or of the CDN file
+    vendor_static downloads it from while it is not there yet.
+
+    With a manifest (after collectstatic) a file is linked only if the
+    manifest has it: asking the strict manifest storage for any other name
+    raises an error, which would make every page fail.
+    """
+    from .management.commands.vendor_static import ASSETS
+
+    name = f'vendor/{path}'
+    hashed = getattr(staticfiles_storage, 'hashed_files', None)
+    if hashed:
+        available = name in hashed
+    else:
+        # No manifest yet: runserver and the tests serve from the finders
+        available = found_by_finders(name)
+    if available:
+        return staticfiles_storage.url(name)
+    return {vendored: url for url, vendored in ASSETS}[path]
+
+
+@lru_cache(maxsize=None)
+def found_by_finders(name):
+    """
+    Whether the staticfiles finders have `name`, remembered per process.
+
+    Every page links three vendored files, and each finders.find() looks
+    through every static directory on disk. A file vendor_static adds
+    later is picked up after a restart (or found_by_finders.cache_clear()).
+    """
+    return finders.find(name) is not None
+
+
+class StaticFile:
+    """
+    One collected file and its precompressed copies.
+    """
+
+    def __init__(self, path, immutable):
+        stat = path.stat()
+        self.content_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type == 'application/javascript':
+            self.content_type += '; charset=utf-8'
+        self.etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        self.last_modified = http_date(stat.st_mtime)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if immutable else CACHE_CONTROL
+        # encoding (None = identity) -> path
+        self.variants = {None: path}
+        for encoding, suffix in ENCODINGS:
+            compressed = path.with_name(path.name + suffix)
+            if compressed.is_file():
+                self.variants[encoding] = compressed
+        self._contents = {}
+
+    def choose(self, accept_encoding):
+        accepted = {token.split(';')[0].strip() for token in accept_encoding.split(',')}
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.variants:
+                return encoding
+        return None
+
+    def response(self, request):
+        if self.etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        else:
+            encoding = self.choose(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+            response = self.body(encoding, head=request.method == 'HEAD')
+            if encoding is not None:
+                response['Content-Encoding'] = encoding
+        response['Cache-Control'] = self.cache_control
+        response['ETag'] = self.etag
+        response['Last-Modified'] = self.last_modified
+        if len(self.variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+    def body(self, encoding, head):
+        path = self.variants[encoding]
+        content = self._contents.get(encoding)
+        if content is None:
+            size = path.stat().st_size
+            if size > MEMORY_LIMIT:
+                # Large files are streamed from disk
+                if head:
+                    response = HttpResponse(content_type=self.content_type)
+                else:
+                    response = FileResponse(path.open('rb'), content_type=self.content_type)
+                response['Content-Length'] = size
+                return response
+            content = self._contents[encoding] = path.read_bytes()
+        response = HttpResponse(b'' if head else content, content_type=self.content_type)
+        response['Content-Length'] = len(content)
+        return response
+
+
+class StaticIndex:
+    """
+    URL path -> StaticFile for everything in STATIC_ROOT, built on first use.
+    """
+
+    def __init__(self):
+        self._files = None
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self._files = None
+
+    def get(self, url_path):
+        files = self._files
+        if files is None:
+            with self._lock:
+                if self._files is None:
+                    self._files = self.build()
+                files = self._files
+        return files.get(url_path)
+
+    def build(self):
+        root = Path(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        if root is None or not root.is_dir():
+            return {}
+        hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        skipped = tuple(suffix for _, suffix in ENCODINGS)
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(skipped):
+                    continue
+                path = Path(directory, name)
+                relative = path.relative_to(root).as_posix()
+                files[settings.STATIC_URL + relative] = StaticFile(path, relative in hashed)
+        return files
+
+
+class StaticFilesMiddleware:
+    """
+    Serve STATIC_ROOT under STATIC_URL; see the module docstring.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    # One index per process, shared by all requests
+    index = StaticIndex()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        static_file = self.find(request)
+        if static_file is not None:
+            return static_file.response(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Small files are read from disk once and then served from memory,
+        # so the event loop is not held up by file reads
+        static_file = self.find(request)
+        if static_file is not None:
+            return static_file.response(request)
+        return await self.get_response(request)
+
+    def find(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(settings.STATIC_URL):
+            return None
+        if not getattr(settings, 'STUDENT_SERVE_STATIC', True):
+            return None
+        return self.index.get(request.path_info)
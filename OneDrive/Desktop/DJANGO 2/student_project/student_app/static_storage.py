@@ -0,0 +1,106 @@
+"""
+collectstatic storage: content-hashed names plus precompressed copies.
+
+CompressedManifestStaticFilesStorage is Django's ManifestStaticFilesStorage
+(every file is also copied as name.<hash of its content>.ext, references in
+CSS are rewritten to those names, and {% static %} links to them) that then
+writes, next to each text file (CSS, JS, SVG, source maps, ...):
+
+- name.gz, compressed with gzip at the highest level;
+- name.br, compressed with Brotli, if the optional `brotli` package is
+  installed (pip install brotli); without it only .gz files are written.
+
+A copy is only kept when it is meaningfully smaller than the original.
+Compressing once at deploy time means requests never pay for it, and the
+slowest, smallest settings can be used. static_files.py serves the copies.
+
+Until collectstatic has run there is no manifest; {% static %} then gives
+the plain names, which runserver and the test client find in the app and
+STATICFILES_DIRS directories.
+"""
+
+import gzip
+from io import BytesIO
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, StaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # optional; .gz copies are still written
+    brotli = None
+
+
+# Files worth compressing (fonts like woff2 and images are compressed already)
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ttf', '.eot', '.ico',
+)
+
+# Smaller files gain nothing from compression
+MIN_SIZE = 256
+
+# Keep a compressed copy only below this share of the original size
+MAX_RATIO = 0.9
+
+
+def gzip_bytes(data):
+    buffer = BytesIO()
+    # mtime=0 makes the output depend on the content only
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as output:
+        output.write(data)
+    return buffer.getvalue()
+
+
+def compressors():
+    """
+    Return [(suffix, function)] for the encodings that can be written.
+    """
+    available = [('.gz', gzip_bytes)]
+    if brotli is not None:
+        available.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    return available
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes .gz/.br copies; see the module docstring.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Both the plain and the hashed names can be requested
+        names = {*self.hashed_files, *self.hashed_files.values()}
+        for name in sorted(names):
+            for compressed in self.compress(name):
+                yield name, compressed, True
+
+    def compress(self, name):
+        """
+        Write the compressed copies of one collected file; return their names.
+        """
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+            return []
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < MIN_SIZE:
+            return []
+
+        written = []
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) > len(data) * MAX_RATIO:
+                continue
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(compressed))
+            written.append(target)
+        return written
+
+    def url(self, name, force=False):
+        # No manifest yet (collectstatic hasn't run): the plain names
+        if not self.hashed_files:
+            return StaticFilesStorage.url(self, name)
+        return super().url(name, force)
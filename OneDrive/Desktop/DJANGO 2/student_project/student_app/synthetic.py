@@ -0,0 +1,298 @@
+"""
+Fast, repeatable synthetic student data.
+
+generate_rows() makes realistic-looking Indian students: common first and
+last names, house/street/city/state/PIN addresses, 10-digit mobile numbers
+starting with 6-9, and an age that matches the date of birth on the
+reference date. The same seed always gives the same students. Emails and
+roll numbers cannot collide: the roll number is a running number and it is
+also part of the email.
+
+load_students() writes them to the database quickly:
+
+- rows are generated in fixed-size chunks by several processes at once
+  (a chunk's contents depend only on the seed and its position, so the
+  number of processes doesn't change the data);
+- the parent inserts them with executemany() in a single transaction;
+- for large loads the search-index, counter and change feed triggers and
+  the secondary indexes are dropped, and rebuilt once at the end instead of
+  being updated row by row. This happens inside the same transaction, so
+  other writers wait and never see the table without them.
+
+Usage:
+    load_students(1_000_000, seed=42)
+    python manage.py generate_students 1000000 --seed 42 --processes 4
+
+This module only needs the standard library to generate rows, so worker
+processes start without setting up Django.
+"""
+
+import multiprocessing
+import random
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+
+
+# Rows generated per chunk (and per executemany call)
+CHUNK_SIZE = 20_000
+
+# Columns written, in the order generate_rows() yields them
+COLUMNS = [
+    'first_name', 'last_name', 'email', 'roll_number', 'grade', 'age',
+    'date_of_registration', 'date_of_birth', 'address', 'phone_number',
+    'is_active', 'updated_at',
+]
+
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Ayaan', 'Krishna', 'Ishaan',
+    'Rohan', 'Rahul', 'Amit', 'Rajesh', 'Vikram', 'Karthik', 'Siddharth', 'Harsh', 'Manish', 'Nikhil',
+    'Pranav', 'Yash', 'Aniket', 'Suresh', 'Deepak', 'Gaurav', 'Abhishek', 'Varun', 'Kunal', 'Tarun',
+    'Aadhya', 'Ananya', 'Diya', 'Saanvi', 'Aanya', 'Pari', 'Myra', 'Anika', 'Navya', 'Kavya',
+    'Priya', 'Neha', 'Anjali', 'Sneha', 'Pooja', 'Divya', 'Shreya', 'Riya', 'Meera', 'Lakshmi',
+    'Ishita', 'Tanvi', 'Nandini', 'Aishwarya', 'Swati', 'Keerthi', 'Bhavana', 'Radhika', 'Sakshi', 'Fatima',
+]
+
+LAST_NAMES = [
+    'Sharma', 'Verma', 'Gupta', 'Singh', 'Kumar', 'Patel', 'Shah', 'Mehta', 'Joshi', 'Desai',
+    'Reddy', 'Rao', 'Naidu', 'Nair', 'Menon', 'Pillai', 'Iyer', 'Iyengar', 'Krishnan', 'Subramanian',
+    'Chatterjee', 'Banerjee', 'Mukherjee', 'Das', 'Bose', 'Ghosh', 'Sen', 'Roy', 'Mishra', 'Tiwari',
+    'Pandey', 'Yadav', 'Chauhan', 'Rathore', 'Thakur', 'Agarwal', 'Jain', 'Kapoor', 'Malhotra', 'Khanna',
+    'Bhatt', 'Kulkarni', 'Deshpande', 'Patil', 'Jadhav', 'Gill', 'Sandhu', 'Khan', 'Ansari', 'Fernandes',
+]
+
+# (city, state, first three digits of its PIN codes)
+CITIES = [
+    ('New Delhi', 'Delhi', 110), ('Mumbai', 'Maharashtra', 400), ('Pune', 'Maharashtra', 411),
+    ('Nagpur', 'Maharashtra', 440), ('Bengaluru', 'Karnataka', 560), ('Mysuru', 'Karnataka', 570),
+    ('Chennai', 'Tamil Nadu', 600), ('Coimbatore', 'Tamil Nadu', 641), ('Hyderabad', 'Telangana', 500),
+    ('Visakhapatnam', 'Andhra Pradesh', 530), ('Kolkata', 'West Bengal', 700), ('Ahmedabad', 'Gujarat', 380),
+    ('Surat', 'Gujarat', 395), ('Jaipur', 'Rajasthan', 302), ('Lucknow', 'Uttar Pradesh', 226),
+    ('Kanpur', 'Uttar Pradesh', 208), ('Patna', 'Bihar', 800), ('Bhopal', 'Madhya Pradesh', 462),
+    ('Indore', 'Madhya Pradesh', 452), ('Chandigarh', 'Chandigarh', 160), ('Kochi', 'Kerala', 682),
+    ('Thiruvananthapuram', 'Kerala', 695), ('Bhubaneswar', 'Odisha', 751), ('Guwahati', 'Assam', 781),
+]
+
+STREETS = [
+    'MG Road', 'Station Road', 'Gandhi Nagar', 'Nehru Street', 'Park Street', 'Civil Lines',
+    'Model Town', 'Rajaji Nagar', 'Anna Salai', 'Subhash Marg', 'Shivaji Nagar', 'Banjara Hills',
+    'Salt Lake', 'Koramangala', 'Ashok Vihar', 'Lajpat Nagar', 'Jubilee Hills', 'Indiranagar',
+]
+
+DOMAINS = ['gmail.com', 'yahoo.co.in', 'outlook.com', 'rediffmail.com', 'school.edu.in']
+
+# Fragments an operator might paste into the search box; all but the last
+# match some of the generated students (benchmarks search for these)
+SEARCH_QUERIES = ['kum', 'riy', '@school', 'sharma', 'vikram.iy', 'zzz']
+
+GRADES = ['A', 'B', 'C', 'D', 'F']
+GRADE_WEIGHTS = [20, 30, 30, 15, 5]
+
+# One student in ten is inactive
+ACTIVE = [True] * 9 + [False]
+
+# SQLite page cache used during a load, in KiB (negative means KiB):
+# index pages of a growing table stay in memory
+LOAD_CACHE_SIZE = -256 * 1024
+
+# Ages of the generated students
+MIN_AGE, MAX_AGE = 15, 25
+
+# Registrations are spread over this many days before the reference date
+REGISTRATION_DAYS = 5 * 365
+
+
+def age_on(birth, today):
+    """
+    Completed years between birth and today.
+    """
+    return today.year - birth.year - ((today.month, today.day) < (birth.month, birth.day))
+
+
+@lru_cache(maxsize=4)
+def _date_tables(today):
+    """
+    Precomputed values to pick from, so no dates are built per row:
+    registration dates, (date of birth, age) pairs and times of day.
+    """
+    registered = [(today - timedelta(days=days)).isoformat() for days in range(REGISTRATION_DAYS)]
+    births = []
+    for days in range(MIN_AGE * 365, (MAX_AGE + 1) * 365):
+        birth = today - timedelta(days=days)
+        births.append((birth.isoformat(), age_on(birth, today)))
+    times = [f'{hour:02d}:{minute:02d}:{second:02d}' for hour in range(8, 18) for minute in range(60) for second in range(60)]
+    return registered, births, times
+
+
+def generate_rows(start, count, seed=0, today=None):
+    """
+    Return `count` students as tuples in COLUMNS order, with roll numbers
+    start, start + 1, ...
+
+    Each CHUNK_SIZE block of roll numbers (counted from `start`) uses its
+    own random generator, so any chunk can be generated on its own.
+    """
+    today = today or date.today()
+    rows = []
+    for offset in range(0, count, CHUNK_SIZE):
+        rows.extend(_generate_chunk((start, offset, min(CHUNK_SIZE, count - offset), seed, today)))
+    return rows
+
+
+def _generate_chunk(spec):
+    start, offset, count, seed, today = spec
+    rng = random.Random(f'{seed}:{offset // CHUNK_SIZE}')
+    registered_dates, births, times = _date_tables(today)
+
+    # Draw each column for the whole chunk at once: much faster than
+    # calling the generator field by field for every row
+    def column(values, k=count, **kwargs):
+        return rng.choices(values, k=k, **kwargs)
+
+    columns = zip(
+        range(start + offset, start + offset + count),
+        column(FIRST_NAMES),
+        column(LAST_NAMES),
+        column(DOMAINS),
+        column(GRADES, weights=GRADE_WEIGHTS),
+        column(births),
+        column(registered_dates),
+        column(times),
+        column(range(1, 500)),
+        column(STREETS),
+        column(CITIES),
+        column(range(1000)),
+        column(range(6_000_000_000, 10_000_000_000)),
+        column(ACTIVE),
+    )
+    return [
+        (
+            first,
+            last,
+            f'{first}.{last}.{roll_number}@{domain}'.lower(),
+            roll_number,
+            grade,
+            age,
+            registered,
+            birth,
+            f'{house}, {street}, {city}, {state} - {pin}{area:03d}',
+            str(phone),
+            active,
+            f'{registered} {time_of_day}',
+        )
+        for (roll_number, first, last, domain, grade, (birth, age), registered, time_of_day,
+             house, street, (city, state, pin), area, phone, active) in columns
+    ]
+
+
+def iter_chunks(start, count, seed=0, today=None, processes=1):
+    """
+    Yield lists of rows (CHUNK_SIZE at most), generated by `processes`
+    worker processes. Chunks come out in roll number order.
+    """
+    today = today or date.today()
+    specs = [
+        (start, offset, min(CHUNK_SIZE, count - offset), seed, today)
+        for offset in range(0, count, CHUNK_SIZE)
+    ]
+    if processes <= 1 or len(specs) <= 1:
+        for spec in specs:
+            yield _generate_chunk(spec)
+        return
+    # "spawn" starts clean interpreters: forking a process that has an open
+    # database connection is not safe with SQLite
+    with multiprocessing.get_context('spawn').Pool(processes) as pool:
+        yield from pool.imap(_generate_chunk, specs)
+
+
+def _secondary_indexes(cursor, table):
+    """
+    Return (name, CREATE INDEX sql) of the table's indexes other than the
+    ones SQLite made for its UNIQUE constraints (those can't be dropped).
+    """
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND sql IS NOT NULL",
+        [table],
+    )
+    return cursor.fetchall()
+
+
+def load_students(count, seed=0, start=None, today=None, processes=1, using=None):
+    """
+    Insert `count` synthetic students and return timings:
+        {'start', 'count', 'seconds', 'insert_seconds', 'rebuild_seconds'}
+
+    start (the first roll number) defaults to one past the highest existing
+    one. On SQLite, when at least as many rows are loaded as the table
+    already has, triggers and secondary indexes are dropped for the load and
+    rebuilt afterwards; smaller loads keep them, since a rebuild reads the
+    whole table.
+    """
+    # Imported here so worker processes don't need Django set up
+    from django.db import DEFAULT_DB_ALIAS, connections, transaction
+    from django.db.models import Max
+
+    from . import changelog, counters, search, trigram
+    from .models import Student
+    from .response_cache import invalidate_students
+
+    using = using or DEFAULT_DB_ALIAS
+    connection = connections[using]
+    students = Student.objects.using(using)
+    if start is None:
+        highest = students.order_by('-roll_number').values_list('roll_number', flat=True).first()
+        start = (highest or 0) + 1
+
+    table = Student._meta.db_table
+    quote = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(table)} ({", ".join(map(quote, COLUMNS))}) '
+        f'VALUES ({", ".join(["%s"] * len(COLUMNS))})'
+    )
+    sqlite = connection.vendor == 'sqlite'
+    began = time.perf_counter()
+    with transaction.atomic(using=using):
+        bulk = sqlite and count >= students.count()
+        with connection.cursor() as cursor:
+            if sqlite:
+                cursor.execute('PRAGMA cache_size')
+                cache_size = cursor.fetchone()[0]
+                cursor.execute(f'PRAGMA cache_size = {LOAD_CACHE_SIZE}')
+            if bulk:
+                last_id = students.aggregate(last=Max('id'))['last'] or 0
+                indexes = _secondary_indexes(cursor, table)
+                for name in [*search.TRIGGER_SQL, *counters.TRIGGER_SQL, *changelog.TRIGGER_SQL]:
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {quote(name)}')
+                for name, _create in indexes:
+                    cursor.execute(f'DROP INDEX {quote(name)}')
+
+            for chunk in iter_chunks(start, count, seed, today, processes):
+                cursor.executemany(sql, chunk)
+            inserted = time.perf_counter()
+
+            if bulk:
+                for _name, create in indexes:
+                    cursor.execute(create)
+        if bulk:
+            # Put the triggers back; each module rebuilds its data (search
+            # index, counters) when it finds its triggers missing
+            search.ensure_triggers(using)
+            counters.ensure_triggers(using)
+            counters.bump_watermark(using)
+            # The change feed gets one entry per loaded student, in one statement
+            changelog.ensure_triggers(using)
+            changelog.record_inserts(last_id, using)
+        if sqlite:
+            with connection.cursor() as cursor:
+                cursor.execute(f'PRAGMA cache_size = {cache_size}')
+    finished = time.perf_counter()
+
+    trigram.reset_index()
+    invalidate_students()
+    return {
+        'start': start,
+        'count': count,
+        'seconds': finished - began,
+        'insert_seconds': inserted - began,
+        'rebuild_seconds': finished - inserted,
+    }
@@ -0,0 +1,23 @@
+"""
+Template tags for the site's static files.
+
+    {% load student_static %}
+    <link href="{% vendor_static 'bootstrap-5.1.3/css/bootstrap.min.css' %}" rel="stylesheet">
+
+See static_files.vendor_url().
+"""
+
+from django import template
+
+from ..static_files import vendor_url
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor_static(path):
+    """
+    URL of static/vendor/<path>, or of its CDN copy until it is vendored.
+    """
+    return vendor_url(path)
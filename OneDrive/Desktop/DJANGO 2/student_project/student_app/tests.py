@@ -18,8 +18,82 @@ Example test:
         self.assertEqual(student.first_name, 'John')
 """
 
-from django.test import TestCase
-from .models import Student
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from unittest import mock
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.staticfiles import finders
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connections, transaction
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import iscoroutinefunction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.conf import settings
+from django.template.loader import get_template
+from django.templatetags.static import static
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import (
+    api, changelog, counters, jobs, lean_rows, metrics, profiling, response_cache, rollover, static_files, trigram,
+)
+from .benchmarks import BenchContext, run_scenario
+from .conditional import list_etag
+from .forms import StudentForm
+from .instrumentation import collect
+from .models import Job, Student, StudentChange, StudentCounter
+from .management.commands.vendor_static import ASSETS
+from .pagination import KeysetPaginator, decode_cursor
+from .query_plans import collect_plans, explain, plan_problems
+from .row_cache import get_row_cache, render_rows
+from .search import build_match_expression, fts_enabled, search_students
+from .sqlite_profile import current_pragmas, lock_for_write
+from .synthetic import age_on, generate_rows, load_students
+from .template_loader import minify_html
+from .views import save_student_form
+from .write_queue import WriteQueue, get_write_queue, unique_field
+
+
+def build_student(n, **overrides):
+    """
+    Return an unsaved student with unique email/roll number derived from n.
+    """
+    data = {
+        'first_name': f'First{n}',
+        'last_name': f'Last{n}',
+        'email': f'student{n}@example.com',
+        'roll_number': n,
+        'grade': 'A',
+        'age': 20,
+        'date_of_birth': date(2004, 1, 1),
+        'address': f'{n} Main St',
+        'phone_number': '1234567890',
+    }
+    data.update(overrides)
+    return Student(**data)
+
+
+def make_student(n, **overrides):
+    """
+    Create a student with unique email/roll number derived from n.
+    """
+    student = build_student(n, **overrides)
+    student.save()
+    return student
 
 
 class StudentModelTest(TestCase):
@@ -57,3 +131,1592 @@ class StudentModelTest(TestCase):
         """
         expected_str = 'John Doe (Roll: 1)'
         self.assertEqual(str(self.student), expected_str)
+
+
+class KeysetPaginationTest(TestCase):
+    """
+    Test cases for cursor-based pagination of the student list.
+    """
+
+    def setUp(self):
+        # 7 students sharing one registration date, so id is the tiebreaker
+        self.students = [make_student(n) for n in range(1, 8)]
+
+    def test_pages_walk_forwards_and_backwards(self):
+        paginator = KeysetPaginator(Student.objects.all(), per_page=3)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        third = paginator.get_page(second.next_cursor)
+
+        # Every student appears exactly once, newest id first
+        seen = [s.pk for page in (first, second, third) for s in page]
+        self.assertEqual(seen, sorted((s.pk for s in self.students), reverse=True))
+        self.assertFalse(first.has_previous())
+        self.assertFalse(third.has_next())
+
+        # Going back from the third page gives the second page again
+        back = paginator.get_page(third.prev_cursor)
+        self.assertEqual([s.pk for s in back], [s.pk for s in second])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Student.objects.all(), per_page=3)
+        page = paginator.get_page('not-a-cursor')
+        self.assertEqual(len(page), 3)
+        self.assertFalse(page.has_previous())
+
+    def test_list_view_uses_cursor(self):
+        with self.settings(STUDENT_LIST_PER_PAGE=5):
+            response = self.client.get(reverse('student_list'))
+            page = response.context['page_obj']
+            self.assertEqual(len(page), 5)
+            self.assertEqual(decode_cursor(page.next_cursor)[2], 'n')
+
+            response = self.client.get(reverse('student_list'), {'cursor': page.next_cursor})
+            self.assertEqual(len(response.context['students']), 2)
+
+
+class FullTextSearchTest(TestCase):
+    """
+    Test cases for the FTS5 search backend.
+    """
+
+    def setUp(self):
+        self.rajesh = make_student(101, first_name='Rajesh', last_name='Kumar', email='rajesh@example.com')
+        self.priya = make_student(102, first_name='Priya', last_name='Singh', email='priya@school.org')
+
+    def search(self, query):
+        return set(search_students(Student.objects.all(), query).values_list('pk', flat=True))
+
+    def test_index_is_available(self):
+        self.assertTrue(fts_enabled())
+
+    def test_match_expression_quotes_user_input(self):
+        self.assertEqual(build_match_expression('Raj "OR" kum'), '"raj"* AND "or"* AND "kum"*')
+        self.assertEqual(build_match_expression('  @@ '), '')
+
+    def test_prefix_search_on_each_column(self):
+        self.assertEqual(self.search('raj'), {self.rajesh.pk})
+        self.assertEqual(self.search('SIN'), {self.priya.pk})
+        self.assertEqual(self.search('school.org'), {self.priya.pk})
+        self.assertEqual(self.search('102'), {self.priya.pk})
+        self.assertEqual(self.search('rajesh kumar'), {self.rajesh.pk})
+
+    def test_index_follows_updates_and_deletes(self):
+        self.rajesh.last_name = 'Verma'
+        self.rajesh.save()
+        self.assertEqual(self.search('kumar'), set())
+        self.assertEqual(self.search('verma'), {self.rajesh.pk})
+
+        self.priya.delete()
+        self.assertEqual(self.search('priya'), set())
+
+    def test_queries_without_words_fall_back_to_icontains(self):
+        self.assertEqual(self.search('@'), {self.rajesh.pk, self.priya.pk})
+        self.assertEqual(self.search('@school'), {self.priya.pk})
+
+    def test_list_view_search(self):
+        response = self.client.get(reverse('student_list'), {'search': 'kum'})
+        # The list fetches a values() projection (see lean_rows.py)
+        self.assertEqual([s['id'] for s in response.context['students']], [self.rajesh.pk])
+
+
+class TrigramIndexTest(TestCase):
+    """
+    Test cases for the optional in-memory trigram index.
+    """
+
+    def setUp(self):
+        trigram.reset_index()
+        self.rajesh = make_student(101, first_name='Rajesh', last_name='Rakumar', email='rajesh@example.com')
+        self.priya = make_student(102, first_name='Priya', last_name='Singh', email='priya@school.org')
+
+    def tearDown(self):
+        trigram.reset_index()
+
+    def test_candidates(self):
+        index = trigram.TrigramIndex()
+        index.build([(1, 'Rajesh', 'Rakumar', 'r@example.com'), (2, 'Priya', 'Singh', 'p@school.org')])
+        self.assertEqual(index.candidates('KUM'), {1})
+        self.assertEqual(index.candidates('@example'), {1})
+        self.assertIsNone(index.candidates('ku'))
+        index.remove(1)
+        self.assertEqual(index.candidates('kum'), set())
+
+    def test_substring_search_when_enabled(self):
+        def search(query):
+            return set(search_students(Student.objects.all(), query).values_list('pk', flat=True))
+
+        # FTS5 alone only matches word prefixes
+        self.assertEqual(search('kum'), set())
+        with self.settings(STUDENT_SEARCH_TRIGRAM=True):
+            self.assertEqual(search('kum'), {self.rajesh.pk})
+            self.assertEqual(search('@school'), {self.priya.pk})
+
+            # Signals keep the built index up to date after commit
+            with self.captureOnCommitCallbacks(execute=True):
+                self.priya.last_name = 'Kumari'
+                self.priya.save()
+            self.assertEqual(search('kum'), {self.rajesh.pk, self.priya.pk})
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.rajesh.delete()
+            self.assertEqual(len(trigram.get_index()), 1)
+
+    def test_bulk_imports_are_indexed(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(
+                'first_name,last_name,email,roll_number,grade,age,date_of_birth,address,phone_number\n'
+                'Rajesh,Moorthy,rajesh@example.com,101,A,20,2004-01-01,Pune,999\n'
+                'Asha,Kumari,asha@example.com,103,A,20,2004-01-01,Pune,999\n'
+            )
+        self.addCleanup(os.unlink, handle.name)
+        with self.settings(STUDENT_SEARCH_TRIGRAM=True):
+            self.assertEqual(len(trigram.get_index()), 2)
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('import_students', handle.name, stdout=io.StringIO())
+            matches = search_students(Student.objects.all(), 'umar').values_list('roll_number', flat=True)
+            self.assertEqual(set(matches), {103})
+            self.assertEqual(len(trigram.get_index()), 3)
+
+    def test_unselective_trigrams_keep_word_matches(self):
+        self.rajesh.phone_number = '5550001111'
+        self.rajesh.save()
+        with self.settings(STUDENT_SEARCH_TRIGRAM=True), \
+                mock.patch('student_app.search.TRIGRAM_MAX_CANDIDATES', 0):
+            # 'sin' finds Singh by substring scan; '5550' only as a phone word
+            self.assertEqual(
+                set(search_students(Student.objects.all(), 'sin').values_list('pk', flat=True)), {self.priya.pk})
+            self.assertEqual(
+                set(search_students(Student.objects.all(), '5550').values_list('pk', flat=True)), {self.rajesh.pk})
+
+
+class StudentCounterTest(TestCase):
+    """
+    Test cases for the trigger-maintained student counters.
+    """
+
+    def test_counters_follow_every_write_path(self):
+        first = make_student(1, grade='A')
+        make_student(2, grade='B', is_active=False)
+        Student.objects.bulk_create([
+            Student(**{**Student.objects.values().get(pk=first.pk), 'id': None,
+                       'email': 'bulk@example.com', 'roll_number': 3}),
+        ])
+        Student.objects.filter(roll_number=3).update(grade='C')
+        first.delete()
+
+        result = counters.get_counts()
+        self.assertEqual(result['total'], 2)
+        self.assertEqual(result['active'], 1)
+        self.assertEqual(result['inactive'], 1)
+        self.assertEqual(result['by_grade'], {'A': 0, 'B': 1, 'C': 1, 'D': 0, 'F': 0})
+        self.assertEqual(counters.reconcile(), {})
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        make_student(1)
+        StudentCounter.objects.filter(name='total').update(value=99)
+        self.assertEqual(counters.reconcile(), {'total': (99, 1)})
+        self.assertEqual(counters.get_total(), 1)
+
+    def test_reconcile_command_fails_on_drift(self):
+        make_student(1)
+        StudentCounter.objects.filter(name='total').update(value=99)
+        out = io.StringIO()
+        with self.assertRaises(CommandError) as raised:
+            call_command('reconcile_student_counters', stdout=out)
+        self.assertEqual(raised.exception.returncode, 1)
+        self.assertIn('total: stored 99, actual 1', out.getvalue())
+        call_command('reconcile_student_counters', stdout=out)
+        self.assertIn('Student counters are correct.', out.getvalue())
+
+    def test_reconcile_takes_the_write_lock_before_counting(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            counters.reconcile()
+        statements = [query['sql'] for query in queries.captured_queries if 'SAVEPOINT' not in query['sql']]
+        self.assertRegex(statements[0], r'^UPDATE .*student_app_studentcounter.* WHERE 0')
+
+        # The lock is really held: another connection can't write meanwhile
+        connection = connections['default']
+        other = sqlite3.connect(connection.settings_dict['NAME'], timeout=0)
+        try:
+            with transaction.atomic():
+                lock_for_write(StudentCounter._meta.db_table)
+                with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                    other.execute("INSERT INTO student_app_studentcounter(name, value) VALUES ('x', 1)")
+        finally:
+            other.close()
+
+    def test_list_view_reads_counters(self):
+        make_student(1)
+        make_student(2, first_name='Zed')
+        response = self.client.get(reverse('student_list'), {'search': 'zed'})
+        self.assertEqual(response.context['total_students'], 2)
+        self.assertEqual(response.context['result_count'], 1)
+
+    def test_admin_changelist_uses_counter_total(self):
+        make_student(1)
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+        StudentCounter.objects.filter(name='total').update(value=7)
+        response = self.client.get(reverse('admin:student_app_student_changelist'))
+        self.assertEqual(response.context['cl'].result_count, 7)
+
+
+class ChangeFeedTest(TestCase):
+    """
+    Test cases for the student change feed (changelog.py).
+    """
+
+    def feed(self, **params):
+        response = self.client.get(reverse('student_changes'), params)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        return response, [json.loads(line) for line in body.splitlines()]
+
+    def test_every_write_path_is_recorded(self):
+        first = make_student(1)
+        Student.objects.bulk_create([build_student(2)])
+        Student.objects.filter(roll_number=2).update(grade='C')
+        first.delete()
+        self.assertEqual(
+            list(StudentChange.objects.values_list('op', flat=True)), ['I', 'I', 'U', 'D'])
+        self.assertEqual(changelog.get_head(), StudentChange.objects.last().seq)
+
+    def test_feed_sends_current_values_once(self):
+        kept = make_student(1)
+        gone = make_student(2)
+        gone_pk = gone.pk
+        kept.first_name = 'Asha'
+        kept.save()
+        gone.delete()
+        response, changes = self.feed(since=0)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(int(response['X-Changes-Head']), changes[-1]['seq'])
+        # kept: insert + update sent once; gone: insert + delete sent as deletes
+        self.assertEqual([(c['op'], c['id']) for c in changes], [('update', kept.pk), ('delete', gone_pk)])
+        self.assertEqual(changes[0]['student']['first_name'], 'Asha')
+        self.assertEqual(changes[0]['student']['date_of_birth'], '2004-01-01')
+
+        _response, rest = self.feed(since=changes[-1]['seq'])
+        self.assertEqual(rest, [])
+        make_student(3)
+        _response, rest = self.feed(since=changes[-1]['seq'])
+        self.assertEqual([c['op'] for c in rest], ['insert'])
+
+    def test_limit_and_chunks(self):
+        for n in range(1, 6):
+            make_student(n)
+        _response, changes = self.feed(since=0, limit=3)
+        self.assertEqual([c['student']['roll_number'] for c in changes], [1, 2, 3])
+        chunks = list(changelog.iter_changes(changes[-1]['seq'], chunk_size=1))
+        self.assertEqual([len(chunk) for chunk in chunks], [1, 1])
+        self.assertEqual(self.client.get(reverse('student_changes'), {'since': 'x'}).status_code, 400)
+
+    def test_compaction_and_horizon(self):
+        student = make_student(1)
+        student.save()
+        make_student(2).delete()
+        StudentChange.objects.filter(op='D').update(changed_at=timezone.now() - timedelta(days=40))
+        since = StudentChange.objects.first().seq
+
+        result = changelog.compact(days=30)
+        self.assertEqual((result['superseded'], result['expired']), (2, 1))
+        self.assertEqual(list(StudentChange.objects.values_list('op', flat=True)), ['U'])
+        self.assertGreater(result['horizon'], since)
+        # The horizon survives counter reconciliation
+        counters.reconcile()
+        self.assertEqual(changelog.get_horizon(), result['horizon'])
+
+        self.assertEqual(self.client.get(reverse('student_changes'), {'since': since}).status_code, 410)
+        _response, changes = self.feed(since=0)
+        self.assertEqual([c['id'] for c in changes], [student.pk])
+
+        # Sequence numbers keep going up after compaction
+        make_student(3)
+        self.assertGreater(StudentChange.objects.last().seq, changes[-1]['seq'])
+
+    def test_command_and_bulk_load(self):
+        make_student(1)
+        load_students(50, seed=2)
+        self.assertEqual(StudentChange.objects.filter(op='I').count(), 51)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('student_changes', since=0, limit=10, stdout=out, stderr=err)
+        self.assertEqual(len(out.getvalue().splitlines()), 10)
+        self.assertIn('Head:', err.getvalue())
+        out = io.StringIO()
+        call_command('student_changes', compact=True, stdout=out)
+        self.assertIn('Removed 0 superseded', out.getvalue())
+
+    def test_record_inserts_with_query_logging(self):
+        # Query logging (DEBUG = True) formats the SQL with its parameters
+        student = make_student(1)
+        StudentChange.objects.all().delete()
+        with CaptureQueriesContext(connections['default']) as queries:
+            changelog.record_inserts(0)
+        self.assertIn("strftime('%Y-%m-%d", queries[0]['sql'])
+        self.assertEqual(list(StudentChange.objects.values_list('student_id', 'op')), [(student.pk, 'I')])
+        self.assertIsNotNone(StudentChange.objects.get().changed_at)
+
+
+class ImportStudentsCommandTest(TestCase):
+    """
+    Test cases for `manage.py import_students`.
+    """
+
+    HEADER = 'first_name,last_name,email,roll_number,grade,age,date_of_birth,address,phone_number,is_active\n'
+
+    def run_import(self, content, suffix='.csv', **options):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as handle:
+            handle.write(content)
+        self.addCleanup(os.unlink, handle.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_students', handle.name, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_creates_updates_and_rejects(self):
+        make_student(5, first_name='Old', email='old@example.com')
+        out, err = self.run_import(
+            self.HEADER +
+            'Asha,Rao,asha@example.com,1,A,20,2004-01-01,Pune,999,true\n'
+            'Ravi,Iyer,ravi@example.com,5,B,21,2003-01-01,Delhi,888,0\n'
+            'Same,same,same@example.com,6,A,20,2004-01-01,Goa,777,1\n'
+            'Dup,Roll,dup@example.com,1,A,20,2004-01-01,Goa,777,1\n'
+            'Taken,Email,old@example.com,7,A,20,2004-01-01,Goa,777,1\n',
+            batch_size=2,
+        )
+        self.assertIn('1 created, 1 updated, 3 rejected', out)
+        self.assertIn('Row 3', err)
+
+        updated = Student.objects.get(roll_number=5)
+        self.assertEqual((updated.first_name, updated.is_active), ('Ravi', False))
+        self.assertTrue(Student.objects.get(roll_number=1).is_active)
+        self.assertEqual(counters.get_total(), 2)
+
+    def test_ndjson_and_dry_run(self):
+        rows = [
+            {'first_name': 'Asha', 'last_name': 'Rao', 'email': 'asha@example.com', 'roll_number': 1,
+             'grade': 'A', 'age': 20, 'date_of_birth': '2004-01-01', 'address': 'Pune', 'phone_number': '999'},
+        ]
+        content = '\n'.join(json.dumps(row) for row in rows) + '\nnot json\n'
+        out, _err = self.run_import(content, suffix='.ndjson', dry_run=True)
+        self.assertIn('1 created, 0 updated, 1 rejected', out)
+        self.assertFalse(Student.objects.exists())
+
+        self.run_import(content, suffix='.ndjson')
+        self.assertTrue(Student.objects.filter(roll_number=1, is_active=True).exists())
+
+    def test_updates_retire_cached_detail_pages(self):
+        response_cache.get_response_cache().clear()
+        student = make_student(5, first_name='Old')
+        url = reverse('student_detail', args=[student.pk])
+        self.assertContains(self.client.get(url), 'Old')
+
+        self.run_import(self.HEADER + 'Ravi,Iyer,ravi@example.com,5,B,21,2003-01-01,Delhi,888,1\n')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Ravi')
+
+
+class StudentExportTest(TestCase):
+    """
+    Test cases for the streaming export endpoint and admin action.
+    """
+
+    def setUp(self):
+        make_student(1, first_name='Rajesh')
+        make_student(2, first_name='Priya', is_active=False)
+
+    def download(self, **params):
+        response = self.client.get(reverse('student_export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export_with_search(self):
+        response, body = self.download(format='csv', search='raj')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = body.decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,roll_number,first_name'))
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Rajesh', lines[1])
+
+    def test_ndjson_export(self):
+        _response, body = self.download(format='ndjson')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([row['first_name'] for row in rows], ['Rajesh', 'Priya'])
+        self.assertEqual(rows[1]['is_active'], False)
+        self.assertEqual(rows[0]['date_of_birth'], '2004-01-01')
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        _response, body = self.download(format='xlsx')
+        with zipfile.ZipFile(io.BytesIO(body)) as archive:
+            self.assertIsNone(archive.testzip())
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 3)
+        self.assertIn('<t>Priya</t>', sheet)
+
+    def test_unknown_format(self):
+        response = self.client.get(reverse('student_export'), {'format': 'pdf'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_action(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+        response = self.client.post(reverse('admin:student_app_student_changelist'), {
+            'action': 'export_csv',
+            '_selected_action': list(Student.objects.filter(roll_number=2).values_list('pk', flat=True)),
+        })
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(body.splitlines()), 2)
+        self.assertIn('Priya', body)
+
+
+class StudentApiTest(TestCase):
+    """
+    Test cases for the JSON API (api.py).
+    """
+
+    def record(self, n, **overrides):
+        data = {
+            'first_name': f'First{n}', 'last_name': f'Last{n}', 'email': f'api{n}@example.com',
+            'roll_number': 100 + n, 'grade': 'B', 'age': 20, 'date_of_birth': '2004-01-01',
+            'address': 'Pune', 'phone_number': '999',
+        }
+        data.update(overrides)
+        return data
+
+    def send(self, method, items):
+        return getattr(self.client, method)(
+            reverse('api_students'), json.dumps(items), content_type='application/json')
+
+    def test_list_sparse_fields_and_cursor(self):
+        for n in range(1, 6):
+            make_student(n)
+        url = reverse('api_students')
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(url, {'fields': 'email,roll_number', 'limit': 2})
+        self.assertEqual(response['Content-Type'], 'application/json')
+        page = response.json()
+        self.assertEqual(page['results'], [
+            {'email': 'student5@example.com', 'roll_number': 5},
+            {'email': 'student4@example.com', 'roll_number': 4},
+        ])
+        self.assertIsNone(page['previous'])
+        # Only the asked-for columns (plus the cursor's sort key) are read
+        select = queries.captured_queries[-1]['sql']
+        self.assertNotIn('address', select)
+
+        rest = self.client.get(page['next']).json()
+        self.assertEqual([row['roll_number'] for row in rest['results']], [3, 2])
+        self.assertIsNotNone(rest['previous'])
+
+        self.assertEqual(self.client.get(url, {'fields': 'email,password'}).status_code, 400)
+        found = self.client.get(url, {'search': 'student3', 'fields': 'id'}).json()
+        self.assertEqual(len(found['results']), 1)
+
+    def test_detail(self):
+        student = make_student(1)
+        row = self.client.get(reverse('api_student', args=[student.pk])).json()
+        self.assertEqual(row['date_of_birth'], '2004-01-01')
+        self.assertIs(row['is_active'], True)
+        self.assertEqual(set(row), set(api.API_FIELDS))
+        self.assertEqual(self.client.get(reverse('api_student', args=[999999])).status_code, 404)
+
+    def test_batch_create(self):
+        response = self.send('post', [self.record(1), self.record(2, is_active=False)])
+        self.assertEqual(response.status_code, 201)
+        created = response.json()['results']
+        self.assertEqual([row['roll_number'] for row in created], [101, 102])
+        self.assertTrue(all(row['id'] for row in created))
+        self.assertEqual(counters.get_total(), 2)
+        self.assertFalse(Student.objects.get(roll_number=102).is_active)
+        self.assertTrue(Student.objects.get(roll_number=101).is_active)
+
+    def test_batch_errors_are_reported_per_record(self):
+        make_student(1, email='taken@example.com')
+        response = self.send('post', [
+            self.record(1),
+            self.record(2, email='taken@example.com'),
+            self.record(3, age=2),
+            self.record(4, roll_number=101),
+            'not a record',
+            self.record(5, nickname='x'),
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = {error['index']: error['errors'] for error in response.json()['errors']}
+        self.assertEqual(set(errors), {1, 2, 3, 4, 5})
+        self.assertIn('email', errors[1])
+        self.assertIn('age', errors[2])
+        self.assertEqual(errors[3], {'roll_number': ['Repeated earlier in the batch.']})
+        self.assertEqual(errors[5], {'nickname': ['Unknown field.']})
+        # Nothing is written when any record is invalid
+        self.assertEqual(Student.objects.count(), 1)
+
+    def test_batch_update_merges_and_validates_once(self):
+        first, second = make_student(1), make_student(2)
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.send('patch', [
+                {'id': first.pk, 'grade': 'C'},
+                {'id': second.pk, 'first_name': 'Asha', 'is_active': False},
+            ])
+        self.assertEqual(response.status_code, 200)
+        # Current rows, uniqueness check, then one UPDATE for the batch
+        self.assertEqual(sum(q['sql'].startswith('UPDATE "student_app_student"') for q in queries), 1)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.grade, first.first_name), ('C', 'First1'))
+        self.assertEqual((second.first_name, second.is_active), ('Asha', False))
+
+        response = self.send('patch', [{'id': first.pk, 'email': second.email}, {'id': 999999}])
+        errors = response.json()['errors']
+        self.assertEqual([error['index'] for error in errors], [0, 1])
+        self.assertIn('email', errors[0]['errors'])
+
+    def test_batch_delete(self):
+        students = [make_student(n) for n in range(1, 4)]
+        response = self.send('delete', [students[0].pk, {'id': 999999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [{'index': 1, 'errors': {'id': ['Student not found.']}}])
+
+        response = self.send('delete', [students[0].pk, {'id': students[1].pk}])
+        self.assertEqual(response.json(), {'deleted': 2})
+        self.assertEqual(counters.get_total(), 1)
+
+    def test_batch_delete_rejects_ids_that_are_not_integers(self):
+        student = make_student(1)
+        response = self.send('delete', [[student.pk], {'id': {'a': 1}}, True, float(student.pk)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['errors'],
+            [{'index': index, 'errors': {'id': ['Expected a student id.']}} for index in range(4)],
+        )
+        self.assertEqual(counters.get_total(), 1)
+
+    def test_request_errors(self):
+        url = reverse('api_students')
+        self.assertEqual(self.client.post(url, {'first_name': 'x'}).status_code, 415)
+        self.assertEqual(self.client.post(url, '{bad', content_type='application/json').status_code, 400)
+        self.assertEqual(self.send('post', {'first_name': 'x'}).status_code, 400)
+        with self.settings(STUDENT_API_MAX_BATCH=1):
+            self.assertEqual(self.send('post', [self.record(1), self.record(2)]).status_code, 413)
+
+    def test_encoder(self):
+        body = api.encode({'d': date(2004, 1, 2), 'n': 'Ré'})
+        self.assertEqual(json.loads(body), {'d': '2004-01-02', 'n': 'Ré'})
+        with self.assertRaises(TypeError):
+            api._plain(object())
+
+
+class ConditionalGetTest(TestCase):
+    """
+    Test cases for ETag / Last-Modified handling on the student pages.
+    """
+
+    def setUp(self):
+        self.student = make_student(1)
+
+    def test_detail_not_modified(self):
+        url = reverse('student_detail', args=[self.student.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # Saving the student changes updated_at and therefore the ETag
+        self.student.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_missing_student(self):
+        response = self.client.get(reverse('student_detail', args=[999]), HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_watermark(self):
+        url = reverse('student_list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # A different search is a different page
+        self.assertNotEqual(self.client.get(url, {'search': 'x'})['ETag'], etag)
+
+        # Any write to the table changes the watermark, deletes included
+        make_student(2).delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_disable_etag(self):
+        request = RequestFactory().get(reverse('student_list'))
+        request.session = self.client.session
+        request._messages = FallbackStorage(request)
+        self.assertIsNotNone(list_etag(request))
+        messages.success(request, 'Student deleted successfully!')
+        self.assertIsNone(list_etag(request))
+
+
+class RowCacheTest(TestCase):
+    """
+    Test cases for the student list row fragment cache.
+    """
+
+    def setUp(self):
+        get_row_cache().clear()
+        self.student = make_student(1, first_name='Rajesh')
+
+    def test_rows_are_cached_until_the_student_changes(self):
+        html = render_rows([self.student])
+        self.assertIn('Rajesh', html)
+        self.assertIn(reverse('student_update', args=[self.student.pk]), html)
+
+        # A second render is served from the cache without touching the template
+        with self.assertNumQueries(0):
+            self.assertEqual(render_rows([self.student]), html)
+
+        self.student.first_name = 'Ravi'
+        self.student.save()
+        self.assertIn('Ravi', render_rows([self.student]))
+
+    def test_list_view_and_warm_command(self):
+        call_command('warm_student_rows', stdout=io.StringIO())
+        self.assertEqual(len(get_row_cache()._cache), 1)
+        response = self.client.get(reverse('student_list'))
+        self.assertContains(response, 'mailto:student1@example.com')
+
+
+class LeanRowsTest(TestCase):
+    """
+    Test cases for the student list rows built from a values() projection.
+    """
+
+    def setUp(self):
+        response_cache.get_response_cache().clear()
+        self.student = make_student(1, first_name='<Raj & "Co">', last_name="O'Neil", grade='B')
+        make_student(2, first_name='Meena', is_active=False, grade='F')
+
+    @staticmethod
+    def normalise(html):
+        # Compare markup, not the template's comments and indentation
+        html = re.sub(r'<!--.*?-->', '', str(html), flags=re.S)
+        return re.sub(r'\s*([<>])\s*', r'\1', ' '.join(html.split()))
+
+    def test_rows_match_the_row_template(self):
+        students = list(Student.objects.order_by('pk'))
+        rows = list(Student.objects.order_by('pk').values(*lean_rows.LIST_FIELDS))
+        template_html = ''.join(
+            get_template('student_app/_student_row.html').render({'student': student})
+            for student in students
+        )
+        lean_html = lean_rows.render_rows(rows)
+        self.assertEqual(self.normalise(lean_html), self.normalise(template_html))
+        self.assertIn('&lt;Raj &amp; &quot;Co&quot;&gt;', lean_html)
+        self.assertIn('F - Fail', lean_html)
+
+    def test_list_view_skips_unlisted_columns(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = self.client.get(reverse('student_list'))
+        self.assertFalse(response.streaming)
+        self.assertContains(response, reverse('student_delete', args=[self.student.pk]))
+        page_query = next(q['sql'] for q in queries if 'student_app_student' in q['sql'])
+        self.assertNotIn('"address"', page_query)
+        self.assertNotIn('"phone_number"', page_query)
+
+    @override_settings(STUDENT_LIST_STREAM_ROWS=2)
+    def test_long_pages_are_streamed(self):
+        response = self.client.get(reverse('student_list'))
+        self.assertTrue(response.streaming)
+        html = b''.join(response.streaming_content).decode()
+        self.assertIn('Meena', html)
+        self.assertIn('</html>', html)
+        self.assertNotIn('student-rows-', html)
+
+    @override_settings(STUDENT_LIST_STREAM_ROWS=2, ROOT_URLCONF='student_project.urls_asgi')
+    async def test_async_view_streams_without_a_thread(self):
+        response = await self.async_client.get(reverse('student_list'))
+        self.assertTrue(response.is_async)
+        html = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn('Meena', html)
+
+    @override_settings(STUDENT_LEAN_ROWS=False)
+    def test_row_template_setting(self):
+        response = self.client.get(reverse('student_list'))
+        self.assertIsInstance(response.context['students'][0], Student)
+        self.assertContains(response, 'Meena')
+
+
+class TemplateMinifyTest(TestCase):
+    """
+    Test cases for the loader that strips comments and whitespace from templates.
+    """
+
+    def test_minify_html(self):
+        source = (
+            '<div>\n    <!-- teaching comment -->\n    <p>{{ name|default:"a   b" }}</p>  <b>x</b>\n</div>\n'
+            '<pre>\n  kept  <!-- too -->\n</pre><textarea>\n a</textarea>'
+            '<script>\n  // line comment\n  go();\n</script>'
+            '<style>\n  /* note */\n  p {  color: red; }\n</style><!--[if IE]><p>old</p><![endif]-->'
+        )
+        self.assertEqual(minify_html(source), (
+            '<div>\n<p>{{ name|default:"a   b" }}</p> <b>x</b>\n</div>\n'
+            '<pre>\n  kept  <!-- too -->\n</pre><textarea>\n a</textarea>'
+            '<script>\n  // line comment\n  go();\n</script>'
+            '<style>\np { color: red; }\n</style><!--[if IE]><p>old</p><![endif]-->'
+        ))
+
+    def test_project_templates_are_minified(self):
+        make_student(1, first_name='Rajesh')
+        response = self.client.get(reverse('student_list'))
+        self.assertContains(response, 'Rajesh')
+        self.assertNotContains(response, '<!--')
+        # Indentation is gone (except inside the kept <script>)
+        self.assertNotContains(response, '\n    <div')
+        self.assertEqual(get_template('home.html').render().strip(), '')
+        # Templates from Django itself are left alone
+        admin_source = get_template('admin/base.html').template.source
+        self.assertIn('    ', admin_source)
+
+    def test_setting_turns_minifying_off(self):
+        with self.settings(STUDENT_MINIFY_TEMPLATES=False):
+            get_template('home.html').backend.engine.template_loaders[0].reset()
+            self.assertIn('<!--', get_template('home.html').render())
+        get_template('home.html').backend.engine.template_loaders[0].reset()
+        self.assertNotIn('<!--', get_template('home.html').render())
+
+
+class StaticPipelineTest(TestCase):
+    """
+    Test cases for collectstatic's hashed/precompressed files and the static middleware.
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        source = os.path.join(directory, 'source')
+        os.makedirs(os.path.join(source, 'css'))
+        os.makedirs(os.path.join(source, 'vendor', 'lib', 'fonts'))
+        shutil.copy(settings.BASE_DIR / 'static' / 'css' / 'site.css', os.path.join(source, 'css'))
+        with open(os.path.join(source, 'vendor', 'lib', 'lib.css'), 'w') as css:
+            css.write('@font-face{src:url(fonts/icons.woff2)}\n' + '.a{color:red}\n' * 100)
+        with open(os.path.join(source, 'vendor', 'lib', 'fonts', 'icons.woff2'), 'wb') as font:
+            font.write(os.urandom(2000))
+        # Stand-ins for the files vendor_static downloads, which base.html links
+        for _, path in ASSETS:
+            os.makedirs(os.path.dirname(os.path.join(source, 'vendor', path)), exist_ok=True)
+            with open(os.path.join(source, 'vendor', path), 'w') as asset:
+                asset.write('/* vendored */\n')
+
+        settings_override = override_settings(
+            STATIC_ROOT=os.path.join(directory, 'collected'),
+            STATICFILES_DIRS=[source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        static_files.StaticFilesMiddleware.index.reset()
+        self.addCleanup(static_files.StaticFilesMiddleware.index.reset)
+        static_files.found_by_finders.cache_clear()
+        self.addCleanup(static_files.found_by_finders.cache_clear)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.source = source
+        # Cached pages would keep the static URLs of an earlier test
+        response_cache.get_response_cache().clear()
+
+    def test_hashed_and_compressed_files(self):
+        url = static('css/site.css')
+        self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+        collected = os.path.join(settings.STATIC_ROOT, url[len('/static/'):])
+        with open(collected, 'rb') as plain, gzip.open(collected + '.gz') as compressed:
+            self.assertEqual(compressed.read(), plain.read())
+        # References inside CSS point at the hashed names; fonts aren't recompressed
+        with open(os.path.join(settings.STATIC_ROOT, static('vendor/lib/lib.css')[len('/static/'):])) as css:
+            self.assertRegex(css.read(), r'url\("?fonts/icons\.[0-9a-f]{12}\.woff2')
+        font = os.path.join(settings.STATIC_ROOT, static('vendor/lib/fonts/icons.woff2')[len('/static/'):])
+        self.assertFalse(os.path.exists(font + '.gz'))
+
+    def test_pages_link_the_hashed_files(self):
+        response = self.client.get(reverse('student_list'))
+        self.assertContains(response, static('css/site.css'))
+        self.assertNotContains(response, 'cdn.jsdelivr.net')
+        self.assertNotContains(response, '<style>')
+
+    def test_missing_vendored_files_fall_back_to_the_cdn(self):
+        for directory in {path.split('/')[0] for _, path in ASSETS}:
+            shutil.rmtree(os.path.join(self.source, 'vendor', directory))
+        call_command('collectstatic', interactive=False, clear=True, verbosity=0)
+        # The manifest has no entry for them: linking them would raise
+        response = self.client.get(reverse('student_list'))
+        self.assertEqual(response.status_code, 200)
+        for url, _ in ASSETS:
+            self.assertContains(response, url)
+        self.assertContains(response, static('css/site.css'))
+
+    def test_finders_lookup_is_remembered(self):
+        # Without a manifest (runserver) the finders are asked once per file, not per page
+        with override_settings(STORAGES={
+            **settings.STORAGES,
+            'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        }):
+            with mock.patch('student_app.static_files.finders.find', wraps=finders.find) as find:
+                self.client.get(reverse('student_list'))
+                self.client.get(reverse('student_list') + '?page=1')
+        self.assertEqual(find.call_count, len(ASSETS))
+
+    def test_middleware_serves_compressed_immutable_files(self):
+        url = static('css/site.css')
+        response = self.client.get(url, headers={'Accept-Encoding': 'br, gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], static_files.IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertTrue(response['Content-Type'].startswith('text/css'))
+        with open(settings.BASE_DIR / 'static' / 'css' / 'site.css', 'rb') as original:
+            self.assertEqual(gzip.decompress(response.content), original.read())
+
+        plain = self.client.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(int(plain['Content-Length']), len(plain.content))
+
+        # Unhashed names may change: short caching and revalidation
+        unhashed = self.client.get('/static/css/site.css')
+        self.assertEqual(unhashed['Cache-Control'], static_files.CACHE_CONTROL)
+        again = self.client.get('/static/css/site.css', headers={'If-None-Match': unhashed['ETag']})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get('/static/missing.css').status_code, 404)
+
+    def test_vendor_static_downloads_referenced_files(self):
+        served = {
+            'all.min.css': b'.fa{src:url(../webfonts/fa.woff2)}.x{background:url(data:image/png;base64,AA)}',
+            'bootstrap.min.css': b'.btn{}\n/*# sourceMappingURL=bootstrap.min.css.map */',
+        }
+
+        def fake_urlopen(url, timeout):
+            name = url.rsplit('/', 1)[-1]
+            return io.BytesIO(served.get(name, f'<{name}>'.encode()))
+
+        vendor = os.path.join(self.source, 'downloaded')
+        with mock.patch('student_app.management.commands.vendor_static.urlopen', fake_urlopen), \
+                mock.patch('student_app.management.commands.vendor_static.vendor_dir', lambda: Path(vendor)):
+            call_command('vendor_static', stdout=io.StringIO())
+            call_command('vendor_static', check=True, stdout=io.StringIO())
+        for path in ('fontawesome-6.0.0/webfonts/fa.woff2', 'bootstrap-5.1.3/css/bootstrap.min.css.map',
+                     'bootstrap-5.1.3/js/bootstrap.min.js', 'popper-2.10.2/umd/popper.min.js'):
+            self.assertTrue(os.path.isfile(os.path.join(vendor, path)), path)
+
+
+class ResponseCacheTest(TestCase):
+    """
+    Test cases for the versioned whole-page cache.
+    """
+
+    def setUp(self):
+        response_cache.get_response_cache().clear()
+        response_cache.reset_stats()
+        self.student = make_student(1, first_name='Rajesh')
+
+    def test_hit_and_signal_invalidation(self):
+        url = reverse('student_detail', args=[self.student.pk])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(1):
+            # Only the conditional-GET lookup; the page itself comes from the cache
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertContains(response, 'Rajesh')
+
+        self.student.first_name = 'Ravi'
+        self.student.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Ravi')
+
+    def test_writes_without_signals_retire_pages(self):
+        # What this process sees when another process (run_jobs, an import,
+        # another worker) changes a student: no signal, no version bump here
+        detail = reverse('student_detail', args=[self.student.pk])
+        listing = reverse('student_list')
+        self.assertEqual(self.client.get(detail)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(listing)['X-Cache'], 'MISS')
+
+        Student.objects.filter(pk=self.student.pk).update(first_name='Ravi', updated_at=timezone.now())
+        response = self.client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Ravi')
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        response = self.client.get(listing)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'Ravi')
+
+    def test_list_search_is_normalised(self):
+        url = reverse('student_list')
+        self.assertEqual(self.client.get(url, {'search': 'Raj'})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url, {'search': '  RAJ '})['X-Cache'], 'HIT')
+
+        make_student(2)
+        self.assertEqual(self.client.get(url, {'search': 'raj'})['X-Cache'], 'MISS')
+        self.assertEqual(response_cache.stats()['hit'], 1)
+
+    def test_stale_page_served_while_another_request_rebuilds(self):
+        url = reverse('student_list')
+        self.client.get(url)
+        response_cache.invalidate_students()
+
+        # Simulate a concurrent request already rebuilding this page
+        page_key, _version_key = response_cache.list_page_keys(RequestFactory().get(url))
+        response_cache.get_response_cache().add(f'{page_key}:lock', 1)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'STALE')
+
+    def test_stats_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse('cache_stats')).status_code, 302)
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+        self.assertIn('hit_ratio', self.client.get(reverse('cache_stats')).json())
+
+
+class QueryPlanTest(TestCase):
+    """
+    Fails when a view or admin page starts reading the whole student table.
+    """
+
+    def test_no_full_table_scans(self):
+        load_students(60)
+        results = collect_plans()
+        self.assertGreater(len(results), 20)
+        problems = [
+            f"{result['scenario']}: {problem}\n  {result['sql']}"
+            for result in results for problem in result['problems']
+        ]
+        self.assertEqual(problems, [], '\n'.join(problems))
+
+    def test_scans_are_detected(self):
+        plan = explain('SELECT * FROM student_app_student WHERE address = \'x\'')
+        self.assertTrue(plan_problems(plan))
+
+    def test_command_fails_on_problems(self):
+        scan = {'scenario': 'scan', 'sql': 'SELECT 1', 'plan': ['SCAN student_app_student'],
+                'problems': ['full scan'], 'notes': []}
+        out = io.StringIO()
+        with mock.patch('student_app.management.commands.explain_student_queries.collect_plans',
+                        return_value=[scan]):
+            with self.assertRaises(CommandError) as raised:
+                call_command('explain_student_queries', rows=1, stdout=out)
+        self.assertEqual(raised.exception.returncode, 1)
+        self.assertIn('1 queries checked, 1 with problems.', str(raised.exception))
+        self.assertIn('!! full scan', out.getvalue())
+
+
+class SqliteProfileTest(TestCase):
+    """
+    Every new connection gets the SQLITE_PRAGMAS from settings.
+    """
+
+    def pragmas_of_new_database(self, names=None):
+        # A second connection to a fresh file, opened like Django opens any other
+        default = connections['default']
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = {**default.settings_dict, 'NAME': os.path.join(directory, 'profile.sqlite3')}
+            db = type(default)(settings_dict, alias='profile-test')
+            try:
+                db.ensure_connection()
+                return current_pragmas(db, names)
+            finally:
+                db.close()
+
+    def test_pragmas_applied_to_new_connections(self):
+        values = self.pragmas_of_new_database()
+        self.assertEqual(values['journal_mode'], 'wal')
+        self.assertEqual(values['synchronous'], 1)  # NORMAL
+        self.assertEqual(values['busy_timeout'], 5000)
+        self.assertEqual(values['temp_store'], 2)  # MEMORY
+
+    def test_pragmas_can_be_turned_off(self):
+        with self.settings(SQLITE_PRAGMAS={}):
+            values = self.pragmas_of_new_database(['journal_mode', 'synchronous'])
+        self.assertEqual(values, {'journal_mode': 'delete', 'synchronous': 2})
+
+
+class WriteQueueTest(TransactionTestCase):
+    """
+    Writes made outside a transaction go through one writer thread.
+    """
+
+    def setUp(self):
+        self.queue = WriteQueue(interval=0.05)
+        self.addCleanup(self.queue.stop)
+        # The views use the shared queue
+        self.addCleanup(get_write_queue().stop)
+
+    def test_writes_are_committed_in_one_batch(self):
+        futures = [self.queue.submit(build_student(n).save) for n in range(20)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(Student.objects.count(), 20)
+        self.assertEqual(self.queue.batches, 1)
+        self.assertEqual(self.queue.writes, 20)
+
+    def test_failed_write_does_not_affect_the_batch(self):
+        first = build_student(1, email='same@example.com')
+        clash = build_student(2, email='same@example.com')
+        futures = [self.queue.submit(first.save), self.queue.submit(clash.save)]
+        self.assertIsNone(futures[0].result(timeout=5))
+        with self.assertRaises(IntegrityError) as raised:
+            futures[1].result(timeout=5)
+        self.assertEqual(unique_field(raised.exception), 'email')
+        self.assertEqual(list(Student.objects.values_list('roll_number', flat=True)), [1])
+
+    def test_batches_take_the_write_lock_first(self):
+        calls = []
+        with mock.patch('student_app.write_queue.lock_for_write', side_effect=lambda *args: calls.append(args)):
+            self.queue.run(lambda: calls.append('write'))
+        self.assertEqual(calls, [(Student._meta.db_table, 'default'), 'write'])
+
+    @mock.patch('student_app.write_queue.RESULT_TIMEOUT', 0.1)
+    def test_timed_out_writes_never_run(self):
+        release = threading.Event()
+        blocking = self.queue.submit(lambda: release.wait(5))
+        late = build_student(2)
+        with self.assertRaises(TimeoutError):
+            self.queue.run(late.save)
+        release.set()
+        self.assertTrue(blocking.result(timeout=5))
+        self.queue.stop()
+        self.assertFalse(Student.objects.exists())
+
+    @mock.patch('student_app.write_queue.RESULT_TIMEOUT', 0.1)
+    def test_started_writes_are_waited_for(self):
+        def slow_save():
+            time.sleep(0.3)
+            build_student(1).save()
+            return 'saved'
+
+        self.assertEqual(self.queue.run(slow_save), 'saved')
+        self.assertTrue(Student.objects.exists())
+
+    def test_create_view_uses_the_queue(self):
+        data = {
+            'first_name': 'Asha', 'last_name': 'Rao', 'email': 'asha@example.com',
+            'roll_number': 77, 'grade': 'A', 'age': 20, 'date_of_birth': '2004-05-06',
+            'address': '1 Main Road', 'phone_number': '9876543210', 'is_active': 'on',
+        }
+        response = self.client.post(reverse('student_create'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Student.objects.filter(roll_number=77).exists())
+
+
+class JobQueueTest(TransactionTestCase):
+    """
+    Background jobs (jobs.py): the worker's threads need committed rows.
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(STUDENT_JOB_DIR=Path(directory), STUDENT_JOB_RETRY_DELAY=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def run_worker(self):
+        return jobs.Worker(threads=2, poll=0.01).run(once=True)
+
+    def test_worker_runs_jobs_and_reports_progress(self):
+        for n in range(1, 4):
+            make_student(n, grade='A')
+        report = jobs.enqueue('student_report')
+        export = jobs.enqueue('export_students', {'format': 'csv'})
+        grades = jobs.enqueue('update_grades', {'grade': 'B', 'from_grade': 'A'})
+        self.assertEqual(self.run_worker(), 3)
+
+        for job in (report, export, grades):
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.SUCCEEDED, 1), job.error)
+        self.assertEqual(report.result['counts']['total'], 3)
+        self.assertEqual(grades.result, {'updated': 3})
+        self.assertEqual((grades.progress_done, grades.percent), (3, 100))
+        self.assertEqual(counters.get_counts()['by_grade']['B'], 3)
+
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+        download = self.client.get(reverse('job_file', args=[export.pk]))
+        self.assertEqual(len(b''.join(download.streaming_content).decode().splitlines()), 4)
+        self.assertEqual(self.client.get(reverse('job_file', args=[report.pk])).status_code, 404)
+
+    def test_retries_then_fails(self):
+        calls = []
+
+        def flaky(context):
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError('database is locked')
+            return 'ok'
+
+        def broken(context):
+            raise RuntimeError('always')
+
+        def bad_params(context):
+            raise jobs.JobFailed('no such file')
+
+        with mock.patch.dict(jobs.REGISTRY, flaky=flaky, broken=broken, bad_params=bad_params):
+            retried = jobs.enqueue('flaky')
+            failed = jobs.enqueue('broken', max_attempts=2)
+            permanent = jobs.enqueue('bad_params')
+            with self.assertLogs('student_app.jobs', 'ERROR'):
+                self.run_worker()
+        for job in (retried, failed, permanent):
+            job.refresh_from_db()
+        self.assertEqual((retried.status, retried.attempts, retried.result), (Job.SUCCEEDED, 2, 'ok'))
+        self.assertEqual((failed.status, failed.attempts), (Job.FAILED, 2))
+        self.assertIn('RuntimeError: always', failed.error)
+        self.assertEqual((permanent.status, permanent.attempts), (Job.FAILED, 1))
+
+    def test_cancel_queued_and_running_jobs(self):
+        queued = jobs.enqueue('student_report')
+        self.assertTrue(jobs.cancel(queued.pk))
+        self.assertFalse(jobs.cancel(queued.pk))
+
+        def endless(context):
+            while True:
+                context.progress(1, force=True)
+
+        with mock.patch.dict(jobs.REGISTRY, endless=endless):
+            jobs.enqueue('endless')
+            running = jobs.claim('test')
+            self.assertEqual((running.kind, running.status), ('endless', Job.RUNNING))
+            self.assertTrue(jobs.cancel(running.pk))
+            jobs.run_job(running)
+        running.refresh_from_db()
+        self.assertEqual(running.status, Job.CANCELLED)
+        self.assertEqual(Job.objects.get(pk=queued.pk).status, Job.CANCELLED)
+
+    def test_cancelled_update_grades_retires_committed_chunks(self):
+        for n in range(1, 4):
+            make_student(n, grade='A')
+        jobs.enqueue('update_grades', {'grade': 'B', 'chunk_size': 1})
+        running = jobs.claim('test')
+        self.assertTrue(jobs.cancel(running.pk))
+        with mock.patch('student_app.response_cache.invalidate_all_students') as invalidate:
+            jobs.run_job(running)
+        running.refresh_from_db()
+        self.assertEqual(running.status, Job.CANCELLED)
+        # The first chunk committed before the cancellation was noticed
+        self.assertEqual(Student.objects.filter(grade='B').count(), 1)
+        invalidate.assert_called_once_with()
+
+    def test_import_reads_only_the_import_directory(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        outside = Path(directory) / 'outside.csv'
+        inside = Path(directory) / 'imports' / 'students.csv'
+        inside.parent.mkdir()
+        content = ImportStudentsCommandTest.HEADER + 'Asha,Rao,asha@example.com,1,A,20,2004-01-01,Pune,999,true\n'
+        outside.write_text(content)
+        inside.write_text(content)
+        (inside.parent / 'link.csv').symlink_to(outside)
+
+        with override_settings(STUDENT_IMPORT_DIR=inside.parent):
+            refused = [jobs.enqueue('import_students', {'path': path})
+                       for path in (str(outside), '../outside.csv', 'link.csv', 'missing.csv')]
+            imported = jobs.enqueue('import_students', {'path': 'students.csv'})
+            with self.assertLogs('student_app.jobs', 'ERROR'):
+                self.assertEqual(self.run_worker(), 5)
+        for job in refused:
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertIn('outside STUDENT_IMPORT_DIR', refused[0].error)
+        self.assertIn('No such file', refused[3].error)
+        imported.refresh_from_db()
+        self.assertEqual(imported.status, Job.SUCCEEDED, imported.error)
+        self.assertEqual(Student.objects.get().email, 'asha@example.com')
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = jobs.enqueue('student_report', max_attempts=1)
+        old = jobs.enqueue('student_report')
+        for claimed in (jobs.claim('gone'), jobs.claim('gone')):
+            Job.objects.filter(pk=claimed.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 2)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.FAILED)
+        self.assertEqual(Job.objects.get(pk=old.pk).status, Job.QUEUED)
+
+    def test_status_endpoints_and_command(self):
+        self.assertEqual(self.client.get(reverse('job_status', args=[1])).status_code, 302)
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+        response = self.client.post(reverse('job_create'), json.dumps({'kind': 'student_report'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        status = self.client.get(response['Location']).json()
+        self.assertEqual((status['kind'], status['status']), ('student_report', 'queued'))
+        bad = self.client.post(reverse('job_create'), json.dumps({'kind': 'nope'}), content_type='application/json')
+        self.assertEqual(bad.status_code, 400)
+
+        cancel_url = reverse('job_cancel', args=[status['id']])
+        self.assertEqual(self.client.post(cancel_url).json()['status'], 'cancelled')
+        self.assertEqual(self.client.post(cancel_url).status_code, 409)
+
+        out = io.StringIO()
+        call_command('run_jobs', enqueue='student_report', stdout=out)
+        call_command('run_jobs', once=True, poll=0.01, stdout=out)
+        self.assertIn('Ran 1 job(s).', out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.SUCCEEDED).count(), 1)
+
+        changelist = self.client.get(reverse('admin:student_app_job_changelist'))
+        self.assertContains(changelist, '100%')
+        self.assertContains(self.client.get(reverse('admin:student_app_job_add')), 'update_grades')
+
+
+class RolloverTest(TestCase):
+    """
+    Test cases for the set-based year-end rollover.
+    """
+
+    TODAY = date(2025, 2, 28)
+    TRANSITIONS = {'F': 'D', 'D': 'C'}
+
+    def setUp(self):
+        response_cache.get_response_cache().clear()
+        # Birthdays before, on and after TODAY, and on 29 February
+        births = [date(2004, 1, 15), date(2005, 2, 28), date(2006, 3, 1), date(2004, 2, 29), date(2007, 12, 31)]
+        self.students = [
+            make_student(n, date_of_birth=birth, age=10, grade=grade)
+            for n, (birth, grade) in enumerate(zip(births, 'FDCAF'), start=1)
+        ]
+
+    def test_matches_per_row_python(self):
+        before = rollover.snapshot()
+        make_student(9, date_of_birth=date(2000, 6, 1), age=age_on(date(2000, 6, 1), self.TODAY), grade='B')
+        untouched = Student.objects.get(roll_number=9).updated_at
+
+        # A chunk of 2 ids: several UPDATE statements, one of them empty
+        result = rollover.rollover(transitions=self.TRANSITIONS, today=self.TODAY, chunk_size=2)
+        self.assertEqual(result['updated'], 5)
+        self.assertEqual(result['chunks'], 3)
+        self.assertEqual(rollover.verify(before, self.TRANSITIONS, self.TODAY)['wrong'], 0)
+        self.assertEqual(
+            list(Student.objects.order_by('roll_number').values_list('age', 'grade')),
+            [(21, 'D'), (20, 'C'), (18, 'C'), (20, 'A'), (17, 'D'), (24, 'B')],
+        )
+        # Rows that were already right are not written
+        self.assertEqual(Student.objects.get(roll_number=9).updated_at, untouched)
+
+        # The triggers kept the counters in step
+        self.assertEqual(counters.get_counts()['by_grade'], {'A': 1, 'B': 1, 'C': 2, 'D': 2, 'F': 0})
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(rollover.rollover(transitions={}, today=self.TODAY)['updated'], 0)
+
+    def test_failed_chunk_still_retires_committed_pages(self):
+        def stop(done, total):
+            raise RuntimeError('interrupted')
+
+        with mock.patch('student_app.rollover.invalidate_all_students') as invalidate:
+            with self.assertRaisesMessage(RuntimeError, 'interrupted'):
+                rollover.rollover(transitions={}, today=self.TODAY, chunk_size=2, progress=stop)
+        self.assertEqual(Student.objects.exclude(age=10).count(), 2)
+        invalidate.assert_called_once_with()
+
+    def test_generic_age_expression_agrees(self):
+        ages = Student.objects.order_by('pk').annotate(
+            sqlite=rollover.age_expression(self.TODAY),
+            generic=rollover.age_expression(self.TODAY, vendor='other'),
+        ).values_list('sqlite', 'generic', 'date_of_birth')
+        for sqlite_age, generic_age, birth in ages:
+            self.assertEqual((sqlite_age, generic_age), (age_on(birth, self.TODAY),) * 2)
+
+    def test_transitions_are_checked(self):
+        self.assertEqual(rollover.parse_transitions(' f=d, D=C,A=A '), self.TRANSITIONS)
+        with self.assertRaises(ValueError):
+            rollover.parse_transitions('F=E')
+        with self.assertRaises(ValueError):
+            rollover.parse_transitions('F')
+
+    def test_cached_pages_are_retired(self):
+        url = reverse('student_detail', args=[self.students[0].pk])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        rollover.rollover(transitions={}, today=self.TODAY)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_command_and_admin_action(self):
+        out = io.StringIO()
+        call_command('rollover', '--map', 'F=D,D=C', '--as-of', '2025-02-28', '--dry-run', stdout=out)
+        self.assertIn('5 stale age(s); grade transitions (F->D, D->C): F: 2, D: 1.', out.getvalue())
+        self.assertEqual(Student.objects.filter(age=10).count(), 5)
+
+        call_command('rollover', '--map', 'F=D', '--as-of', '2025-02-28', '--verify', stdout=out)
+        self.assertIn('Verified 5 students and the counters.', out.getvalue())
+        self.assertFalse(Student.objects.filter(grade='F').exists())
+
+        StudentCounter.objects.filter(name='total').update(value=99)
+        with self.assertRaisesMessage(CommandError, '0 wrong value(s) in 5 students; 1 counter(s) corrected.') as raised:
+            call_command('rollover', '--as-of', '2025-02-28', '--verify', stdout=out)
+        self.assertEqual(raised.exception.returncode, 1)
+        self.assertIn('Counter total: stored 99, actual 5', out.getvalue())
+
+        self.client.force_login(User.objects.create_superuser('admin', 'a@example.com', 'pw'))
+        Student.objects.filter(roll_number=1).update(age=10)
+        with override_settings(STUDENT_GRADE_TRANSITIONS={'A': 'B'}):
+            response = self.client.post(reverse('admin:student_app_student_changelist'), {
+                'action': 'rollover_students',
+                '_selected_action': [self.students[0].pk, self.students[3].pk],
+            }, follow=True)
+        self.assertContains(response, 'Rolled over 2 student(s).')
+        self.assertEqual(Student.objects.get(roll_number=4).grade, 'B')
+        self.assertNotEqual(Student.objects.get(roll_number=1).age, 10)
+
+
+class SaveStudentFormTest(TestCase):
+    """
+    A duplicate saved after the form was validated becomes a form error.
+    """
+
+    def test_unique_clash_after_validation(self):
+        form = StudentForm(data={
+            'first_name': 'Asha', 'last_name': 'Rao', 'email': 'race@example.com',
+            'roll_number': 5, 'grade': 'A', 'age': 20, 'date_of_birth': '2004-05-06',
+            'address': '1 Main Road', 'phone_number': '9876543210',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        # Another request saves the same email in between
+        make_student(2, email='race@example.com')
+        self.assertIsNone(save_student_form(form))
+        self.assertIn('email', form.errors)
+
+
+class BenchmarkScenarioTest(TestCase):
+    """
+    Every `manage.py bench` scenario sends a request that succeeds.
+    """
+
+    def test_scenarios_run(self):
+        for n in range(1, 6):
+            make_student(n)
+        context = BenchContext()
+        for name in ['list', 'list_search', 'detail', 'create', 'update', 'admin_changelist']:
+            with self.subTest(scenario=name):
+                result = run_scenario(name, requests=3, concurrency=1, context=context)
+                self.assertEqual(result['requests'], 3)
+                self.assertEqual(result['errors'], 0, result['statuses'])
+                self.assertGreater(result['queries_per_request'], 0)
+                self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+        self.assertEqual(Student.objects.filter(first_name='Bench').count(), 3)
+
+
+class SyntheticStudentsTest(TestCase):
+    """
+    The synthetic data generator is repeatable, consistent and loads cleanly.
+    """
+
+    def test_same_seed_same_students(self):
+        self.assertEqual(generate_rows(1, 50, seed=3), generate_rows(1, 50, seed=3))
+        self.assertNotEqual(generate_rows(1, 50, seed=3), generate_rows(1, 50, seed=4))
+
+    def test_rows_are_consistent(self):
+        today = date(2025, 3, 1)
+        rows = generate_rows(100, 2000, seed=1, today=today)
+        self.assertEqual(len({row[2] for row in rows}), 2000)  # emails
+        self.assertEqual([row[3] for row in rows], list(range(100, 2100)))  # roll numbers
+        for row in rows:
+            self.assertEqual(age_on(date.fromisoformat(row[7]), today), row[5])
+            self.assertRegex(row[9], r'^[6-9]\d{9}$')
+            self.assertLessEqual(row[6], today.isoformat())
+
+    def test_load_keeps_search_counters_and_indexes(self):
+        make_student(1)
+        result = load_students(200, seed=5)
+        self.assertEqual(result['start'], 2)
+        self.assertEqual(Student.objects.count(), 201)
+        self.assertEqual(counters.get_total(), 201)
+        with connections['default'].cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'student_app_student'")
+            names = {row[0] for row in cursor.fetchall()}
+        self.assertTrue({'student_grade_idx', 'student_active_idx', 'student_app_counter_ai'} <= names)
+        if fts_enabled():
+            last_name = Student.objects.get(roll_number=2).last_name
+            self.assertIn(2, search_students(Student.objects.all(), last_name).values_list('roll_number', flat=True))
+        # The triggers work again after the load
+        make_student(999)
+        self.assertEqual(counters.get_total(), 202)
+
+
+class RequestTimingTest(TestCase):
+    """
+    Sampled requests get a Server-Timing header and a log line.
+    """
+
+    def test_server_timing_header_and_log(self):
+        make_student(1)
+        with self.assertLogs('student_app.requests', 'INFO') as logs:
+            response = self.client.get(reverse('student_detail', args=[Student.objects.get().pk]))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, view;dur')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+
+    def test_unsampled_requests_are_untouched(self):
+        with self.settings(STUDENT_TIMING_SAMPLE_RATE=0):
+            response = self.client.get(reverse('student_list'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_repeated_queries_are_flagged(self):
+        students = [make_student(n) for n in range(1, 7)]
+        with collect() as stats:
+            for student in students:
+                Student.objects.get(pk=student.pk)
+            Student.objects.get(pk=students[0].pk)
+        self.assertEqual(stats.queries, 7)
+        self.assertEqual(stats.duplicates, 1)
+        (sql, count), = stats.n_plus_one().items()
+        self.assertEqual(count, 7)
+
+
+class MetricsTest(TestCase):
+    """
+    /metrics reports per-URL-name counts and histograms, summed over workers.
+    """
+
+    def setUp(self):
+        metrics.reset()
+        response_cache.reset_stats()
+
+    def test_requests_are_counted_per_url_name(self):
+        student = make_student(1)
+        self.client.get(reverse('student_list'))
+        self.client.get(reverse('student_detail', args=[student.pk]))
+        self.client.get('/no-such-page/')
+        text = metrics.render()
+        self.assertIn('student_http_requests_total{method="GET",status="200",view="student_list"} 1', text)
+        self.assertIn('student_http_requests_total{method="GET",status="404",view="unmatched"} 1', text)
+        self.assertIn('student_http_request_duration_seconds_bucket{view="student_detail",le="+Inf"} 1', text)
+        self.assertIn('student_http_request_duration_seconds_count{view="student_detail"} 1', text)
+        self.assertIn('student_http_requests_in_flight{view="student_list"} 0', text)
+        self.assertRegex(text, r'student_db_queries_per_request_sum\{view="student_list"\} [1-9]')
+
+    def test_endpoint_is_restricted(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE student_http_request_duration_seconds histogram', response.content.decode())
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, 403)
+
+    def test_other_workers_files_are_added_up(self):
+        metrics.get_metrics().finished('student_list', 'GET', 200, 0.003, queries=4, in_flight=False)
+        other = metrics.Metrics()
+        other.finished('student_list', 'GET', 200, 0.2, queries=4, in_flight=False)
+        other.started('student_detail')
+        with tempfile.TemporaryDirectory() as directory:
+            live = os.path.join(directory, '1.json')
+            with open(live, 'w') as f:
+                json.dump(other.snapshot(), f)
+            # An exited worker: its counters count, its in-flight gauge doesn't
+            dead = os.path.join(directory, '2.json')
+            with open(dead, 'w') as f:
+                json.dump(other.snapshot(), f)
+            old = os.path.getmtime(dead) - metrics.STALE_AFTER - 1
+            os.utime(dead, (old, old))
+            text = metrics.render(metrics.Path(directory))
+        self.assertIn('student_http_requests_total{method="GET",status="200",view="student_list"} 3', text)
+        self.assertIn('student_http_request_duration_seconds_bucket{view="student_list",le="0.005"} 1', text)
+        self.assertIn('student_http_request_duration_seconds_bucket{view="student_list",le="0.25"} 3', text)
+        self.assertIn('student_db_queries_per_request_count{view="student_list"} 3', text)
+        self.assertIn('student_http_requests_in_flight{view="student_detail"} 1', text)
+
+
+class ProfilerTest(TestCase):
+    """
+    Staff can profile a request with ?profile=1 and find it in the admin.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        override = self.settings(STUDENT_PROFILE_DIR=self.directory, STUDENT_PROFILE_KEEP=2)
+        override.enable()
+        self.addCleanup(override.disable)
+        make_student(1)
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def test_only_staff_get_profiled(self):
+        response = self.client.get(reverse('student_list'), {'search': 'student', 'profile': '1'})
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_profile_files_and_query_plans(self):
+        self.client.force_login(self.admin)
+        # A cached copy of the page must not hide the view from the profiler
+        self.client.get(reverse('student_list'), {'search': 'student'})
+        response = self.client.get(reverse('student_list'), {'search': 'student'}, HTTP_X_PROFILE='1')
+        profile_id = response['X-Profile-Id']
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            [f'{profile_id}.collapsed', f'{profile_id}.json', f'{profile_id}.prof'],
+        )
+        record = profiling.load_profile(profile_id)
+        self.assertEqual(record['view'], 'student_list')
+        selects = [query for query in record['queries'] if 'student_app_student' in query['sql']]
+        self.assertTrue(selects)
+        self.assertTrue(all(query['plan'] for query in selects))
+        self.assertIn('student_list', profiling.top_functions(profile_id))
+
+        page = self.client.get(reverse('admin:student_app_student_profile', args=[profile_id]))
+        self.assertContains(page, 'Functions by cumulative time')
+        listing = self.client.get(reverse('admin:student_app_student_profiles'))
+        self.assertContains(listing, profile_id)
+        download = self.client.get(reverse('admin:student_app_student_profile_download', args=[profile_id, 'prof']))
+        self.assertEqual(download.status_code, 200)
+
+    def test_old_profiles_are_pruned(self):
+        self.client.force_login(self.admin)
+        ids = []
+        for second in range(3):
+            with mock.patch('time.strftime', return_value=f'20260101-00000{second}'):
+                ids.append(self.client.get(reverse('student_list'), {'profile': '1'})['X-Profile-Id'])
+        kept = [record['id'] for record in profiling.list_profiles()]
+        self.assertEqual(kept, ids[:0:-1])
+        self.assertEqual(len(os.listdir(self.directory)), 6)
+
+
+@override_settings(ROOT_URLCONF='student_project.urls_asgi')
+class AsyncViewsTest(TestCase):
+    """
+    Under ASGI the read-only pages are async views giving the same pages.
+    """
+
+    def setUp(self):
+        response_cache.get_response_cache().clear()
+        self.student = make_student(1, first_name='Rajesh')
+        make_student(2, first_name='Meena')
+
+    def test_routes_use_async_views(self):
+        for url in (reverse('student_list'), reverse('student_detail', args=[self.student.pk])):
+            self.assertTrue(iscoroutinefunction(resolve(url).func))
+        self.assertFalse(iscoroutinefunction(resolve(reverse('student_create')).func))
+
+    async def test_list_search_and_conditional_get(self):
+        response = await self.async_client.get(reverse('student_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Meena')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        # The SQL run in sync_to_async() threads is still measured
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+        again = await self.async_client.get(reverse('student_list'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+        found = await self.async_client.get(reverse('student_list'), {'search': 'rajesh'})
+        self.assertContains(found, 'Rajesh')
+        self.assertNotContains(found, 'Meena')
+
+    async def test_detail_and_page_cache(self):
+        url = reverse('student_detail', args=[self.student.pk])
+        first = await self.async_client.get(url)
+        second = await self.async_client.get(url)
+        self.assertContains(first, 'Rajesh')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        missing = await self.async_client.get(reverse('student_detail', args=[999999]))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_same_page_as_sync_view(self):
+        url = reverse('student_detail', args=[self.student.pk])
+        async_page = self.client.get(url)
+        response_cache.get_response_cache().clear()
+        with self.settings(ROOT_URLCONF='student_project.urls'):
+            sync_page = self.client.get(url)
+        self.assertEqual(async_page.content, sync_page.content)
+        self.assertEqual(async_page['ETag'], sync_page['ETag'])
@@ -0,0 +1,202 @@
+"""
+In-memory trigram index for substring search on student names and emails.
+
+The FTS5 index in search.py matches whole words and word prefixes, so a
+fragment from the middle of a word ("kum" in "Rakumar", "@example") is not
+found by it. A trigram index can: every string is split into overlapping
+3-character pieces ("kumar" -> "kum", "uma", "mar"), and the index maps
+each piece to the set of student ids containing it. A substring query only
+needs to intersect the sets for its own trigrams to get a short list of
+candidates, which one `pk__in` query then confirms.
+
+The index is optional. Turn it on in settings.py with:
+    STUDENT_SEARCH_TRIGRAM = True
+
+It is built from the database the first time it is needed and then kept
+up to date by the post_save / post_delete signals connected in apps.py.
+"""
+
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Student
+
+
+# Fields covered by the index
+INDEXED_FIELDS = ('first_name', 'last_name', 'email')
+
+# Queries shorter than this have no trigrams and cannot use the index
+MIN_QUERY_LENGTH = 3
+
+
+def trigrams(text):
+    """
+    Return the set of lowercase 3-character substrings of text.
+    """
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Posting lists from trigram to student ids.
+
+    All methods are thread-safe: a single lock guards the posting lists
+    because updates arrive from whichever thread saved the student.
+    """
+
+    def __init__(self):
+        # postings: trigram -> set of student ids containing it
+        self.postings = {}
+        # documents: student id -> its trigrams (needed to undo an entry)
+        self.documents = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def _row_trigrams(self, values):
+        grams = set()
+        for value in values:
+            grams |= trigrams(value or '')
+        return grams
+
+    def add(self, pk, values):
+        """
+        Index (or re-index) one student from its INDEXED_FIELDS values.
+        """
+        grams = self._row_trigrams(values)
+        with self.lock:
+            self._remove(pk)
+            self.documents[pk] = grams
+            for gram in grams:
+                self.postings.setdefault(gram, set()).add(pk)
+
+    def remove(self, pk):
+        """
+        Drop one student from the index.
+        """
+        with self.lock:
+            self._remove(pk)
+
+    def _remove(self, pk):
+        for gram in self.documents.pop(pk, ()):
+            ids = self.postings.get(gram)
+            if ids is not None:
+                ids.discard(pk)
+                if not ids:
+                    del self.postings[gram]
+
+    def build(self, rows):
+        """
+        Replace the whole index with rows of (pk, first_name, last_name, email).
+        """
+        with self.lock:
+            self.postings = {}
+            self.documents = {}
+            for pk, *values in rows:
+                self.add(pk, values)
+
+    def candidates(self, query):
+        """
+        Return the ids of students whose indexed fields may contain query.
+
+        Every real match is included; a few false positives are possible
+        (the trigrams can come from different fields), so the result must be
+        confirmed against the database. Returns None when the query is too
+        short to use the index.
+        """
+        grams = trigrams(query)
+        if len(query) < MIN_QUERY_LENGTH or not grams:
+            return None
+        with self.lock:
+            # Intersect the smallest posting lists first to keep sets small
+            lists = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+            result = set(lists[0])
+            for ids in lists[1:]:
+                result &= ids
+                if not result:
+                    break
+            return result
+
+
+# The process-wide index, built lazily by get_index()
+_index = None
+_index_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'STUDENT_SEARCH_TRIGRAM', False)
+
+
+def get_index():
+    """
+    Return the trigram index, building it on first use.
+
+    Returns None when STUDENT_SEARCH_TRIGRAM is off.
+    """
+    global _index
+    if not is_enabled():
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = TrigramIndex()
+                # values_list avoids creating a Student object for every row
+                rows = Student.objects.values_list('pk', *INDEXED_FIELDS).iterator(chunk_size=10000)
+                index.build(rows)
+                _index = index
+    return _index
+
+
+def reset_index():
+    """
+    Throw the index away; it will be rebuilt on the next get_index().
+    """
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def student_saved(sender, instance, **kwargs):
+    """
+    post_save handler: re-index the student once the transaction commits.
+    """
+    if _index is None:
+        # Not built yet; the build will read the committed row
+        return
+    pk = instance.pk
+    values = [getattr(instance, field) for field in INDEXED_FIELDS]
+    transaction.on_commit(lambda: _index is not None and _index.add(pk, values))
+
+
+def reindex(students):
+    """
+    Re-index the students of a queryset once the transaction commits.
+
+    For writes that send no post_save signal, such as the bulk_create()
+    upserts of import_students; single saves go through student_saved().
+    """
+    if _index is None:
+        return
+
+    def update():
+        index = _index
+        if index is None:
+            return
+        for pk, *values in students.values_list('pk', *INDEXED_FIELDS).iterator(chunk_size=10000):
+            index.add(pk, values)
+
+    transaction.on_commit(update)
+
+
+def student_deleted(sender, instance, **kwargs):
+    """
+    post_delete handler: remove the student once the transaction commits.
+    """
+    if _index is None:
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: _index is not None and _index.remove(pk))
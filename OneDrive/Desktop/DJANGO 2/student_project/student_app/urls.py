@@ -8,8 +8,8 @@ It defines the routes for student CRUD operations.
 from django.urls import path
 # path(): maps a URL pattern to a view
 
-from . import views
-# Import all views from this app
+from . import api, views
+# Import all views from this app, and the JSON API (see api.py)
 
 
 # URL patterns list
@@ -23,6 +23,91 @@ urlpatterns = [
         name='student_list'  # Name used in reverse() and templates
     ),
     
+    # Student Export
+    # URL: http://localhost:8000/export/?format=csv&search=raj
+    # Function: Stream students as a CSV, NDJSON or XLSX download
+    path(
+        'export/',
+        views.student_export,
+        name='student_export'
+    ),
+    
+    # Change Feed
+    # URL: http://localhost:8000/changes?since=1041
+    # Function: Stream the student inserts/updates/deletes after a sequence number
+    path(
+        'changes',
+        views.student_changes,
+        name='student_changes'
+    ),
+    
+    # Background Jobs (staff only)
+    # URL: http://localhost:8000/jobs/ (POST {"kind": ..., "params": {...}})
+    # Function: Queue a long operation for `manage.py run_jobs` (see jobs.py)
+    path(
+        'jobs/',
+        views.job_create,
+        name='job_create'
+    ),
+    
+    # URL: http://localhost:8000/jobs/1/
+    # Function: A job's status and progress as JSON, for polling
+    path(
+        'jobs/<int:pk>/',
+        views.job_status,
+        name='job_status'
+    ),
+    
+    # URL: http://localhost:8000/jobs/1/cancel/ (POST)
+    path(
+        'jobs/<int:pk>/cancel/',
+        views.job_cancel,
+        name='job_cancel'
+    ),
+    
+    # URL: http://localhost:8000/jobs/1/file/
+    # Function: Download the file a job wrote (e.g. an export)
+    path(
+        'jobs/<int:pk>/file/',
+        views.job_file,
+        name='job_file'
+    ),
+    
+    # Cache Statistics (staff only)
+    # URL: http://localhost:8000/cache-stats/
+    # Function: Page cache hit/miss counters as JSON
+    path(
+        'cache-stats/',
+        views.cache_stats,
+        name='cache_stats'
+    ),
+    
+    # Metrics (INTERNAL_IPS and staff only)
+    # URL: http://localhost:8000/metrics
+    # Function: Request latency, status and cache metrics for Prometheus
+    path(
+        'metrics',
+        views.metrics_view,
+        name='metrics'
+    ),
+    
+    # JSON API: student list and batch writes
+    # URL: http://localhost:8000/api/students/?fields=id,email&limit=500
+    # Function: GET a page of students; POST/PATCH/DELETE a JSON array of records
+    path(
+        'api/students/',
+        api.students,
+        name='api_students'
+    ),
+    
+    # JSON API: one student
+    # URL: http://localhost:8000/api/students/1/
+    path(
+        'api/students/<int:pk>/',
+        api.student,
+        name='api_student'
+    ),
+    
     # Student Detail View
     # URL: http://localhost:8000/student/1/
     # <int:pk> is a URL parameter that captures an integer (student ID)
@@ -0,0 +1,26 @@
+"""
+URL Configuration for the student_app under ASGI.
+
+The same routes and names as urls.py, but the read-only pages use the
+async views from async_views.py. student_project/asgi.py selects these
+patterns; under WSGI (manage.py runserver, gunicorn) urls.py is used.
+"""
+
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+
+# URL name -> async view replacing the sync one
+ASYNC_VIEWS = {
+    'student_list': async_views.student_list,      # also serves ?search=
+    'student_detail': async_views.student_detail,
+    'cache_stats': async_views.cache_stats,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name], name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
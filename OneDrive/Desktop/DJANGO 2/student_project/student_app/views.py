@@ -5,6 +5,9 @@ Views are Python functions or classes that receive a request and return a respon
 They contain the business logic for handling student data.
 """
 
+import json
+# json: reads the body of background job requests
+
 from django.shortcuts import render, redirect, get_object_or_404
 # render: renders a template with context
 # redirect: redirects to another URL
@@ -16,18 +19,79 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView, D
 from django.contrib import messages
 # messages: framework for displaying one-time notifications to users
 
-from django.db.models import Q
-# Q: allows complex database queries with OR, AND logic
+from django.contrib.admin.views.decorators import staff_member_required
+# staff_member_required: only lets logged-in staff users see a view
+
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseGone,
+    JsonResponse,
+)
+# Http404: exception that makes Django return a "page not found" response
+# HttpResponse / HttpResponseForbidden: plain responses (200 / 403)
+# HttpResponseBadRequest / HttpResponseGone: 400 and 410 responses
+# FileResponse: streams a file from disk
+# JsonResponse: returns data as JSON instead of HTML
+
+from django.conf import settings
+
+from django.db import IntegrityError
+# IntegrityError: raised when a save breaks a database constraint
 
-from django.urls import reverse_lazy
-# reverse_lazy: lazily evaluates URL reversal (used in class-based views)
+from django.views.decorators.http import require_POST
+# require_POST: answers other methods with 405 Method Not Allowed
 
-from .models import Student
+from django.urls import reverse, reverse_lazy
+# reverse / reverse_lazy: build URLs from their names (lazily for class-based views)
+
+from .models import Job, Student
 from .forms import StudentForm
+from .export import STREAMERS, export_response
+# export_response: streams students as CSV/NDJSON/XLSX without loading them all
+from .changelog import FeedExpired, changes_response
+# Change feed for systems that keep a copy of the students (see changelog.py)
+from . import jobs
+# Background jobs run by `manage.py run_jobs` (see jobs.py)
+from .conditional import student_detail_condition, student_list_condition
+# Decorators that answer "304 Not Modified" when the client's copy is current
+from .counters import get_counts
+# get_counts: pre-computed student totals (no COUNT(*) over the table)
+from .pagination import KeysetPaginator
+# KeysetPaginator: cursor-based pagination that stays fast on deep pages
+from . import metrics, response_cache
+from .response_cache import cache_student_detail, cache_student_list
+# Whole-page cache, invalidated when students change (see response_cache.py)
+from .lean_rows import LIST_FIELDS, render_list_page
+# render_list_page: the list page with rows built from a values() projection (see lean_rows.py)
+from .row_cache import render_rows
+# render_rows: table rows from the fragment cache (see row_cache.py)
+from .search import search_students
+# search_students: full-text search over names, email and roll number
+from .write_queue import run_write, unique_field
+# run_write: hands saves/deletes to the single writer thread (see write_queue.py)
+
+
+def save_student_form(form):
+    """
+    Save a valid StudentForm through the writer queue.
+    
+    Returns the saved student, or None if another request took the same
+    email or roll number after the form was validated - in that case the
+    clash is added to the form as an error, like the form's own check.
+    """
+    try:
+        return run_write(form.save)
+    except IntegrityError as exc:
+        field = unique_field(exc)
+        if field not in form.fields:
+            raise
+        form.add_error(field, form.instance.unique_error_message(Student, [field]))
+        return None
 
 
 # ==================== Function-Based Views ====================
 
+@student_list_condition
+@cache_student_list
 def student_list(request):
     """
     Display a list of all students.
@@ -40,28 +104,164 @@ def student_list(request):
     # Get the search query from URL parameters (if any)
     search_query = request.GET.get('search', '')
     
-    # If search query exists, filter students by name or email
+    # If search query exists, filter students by name, email or roll number
+    # search_students() uses the full-text index, so it doesn't scan the table
     if search_query:
-        # Q objects allow OR queries (| means OR, & means AND)
-        # icontains: case-insensitive 'contains' search
-        students = students.filter(
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(roll_number__icontains=search_query)
-        )
+        students = search_students(students, search_query)
+    
+    # Read the maintained counters instead of counting the whole table
+    counts = get_counts()
+    
+    # The table only shows a few columns: fetch just those, as dicts,
+    # unless settings ask for the row template (and Student objects)
+    lean = getattr(settings, 'STUDENT_LEAN_ROWS', True)
+    rows = students.values(*LIST_FIELDS) if lean else students
+    
+    # Only fetch one page of students at a time
+    # The ?cursor= token remembers where the previous page ended
+    page = KeysetPaginator(rows).get_page(request.GET.get('cursor'))
     
     # Create context dictionary to pass to template
     context = {
-        'students': students,  # List of student objects
+        'students': page.object_list,  # Students (or row dicts) on this page
+        'page_obj': page,  # Page with next/previous cursors
         'search_query': search_query,  # Current search query
-        'total_students': Student.objects.count(),  # Total student count
+        'total_students': counts['total'],  # Total student count
+        # Number of matching students: the total, unless a search narrowed it
+        'result_count': students.count() if search_query else counts['total'],
     }
     
+    if lean:
+        # Renders the rows without the template engine; very long pages are streamed
+        return render_list_page(request, 'student_app/student_list.html', context, page.object_list)
+    
+    context['student_rows'] = render_rows(page.object_list)  # Cached <tr> HTML for this page
+    
     # render() loads the template and fills it with context data
     return render(request, 'student_app/student_list.html', context)
 
 
+def student_export(request):
+    """
+    Download students as a file.
+    
+    URL parameters:
+        format: 'csv' (default), 'ndjson' or 'xlsx'
+        search: the same search as the student list page
+    
+    The file is streamed, so even very large exports start downloading
+    immediately and don't use much memory on the server.
+    """
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in STREAMERS:
+        raise Http404(f'Unknown export format: {fmt}')
+    
+    # Apply the same search as student_list
+    students = Student.objects.all()
+    search_query = request.GET.get('search', '')
+    if search_query:
+        students = search_students(students, search_query)
+    
+    return export_response(students, fmt)
+
+
+def student_changes(request):
+    """
+    Stream the student changes after a sequence number as NDJSON.
+    
+    URL parameters:
+        since: the last sequence number the caller has applied (default 0,
+               which gives every current student)
+        limit: the most changes to send (default: all up to now)
+    """
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+    except ValueError:
+        return HttpResponseBadRequest('since and limit must be whole numbers.')
+    
+    try:
+        return changes_response(max(since, 0), limit if limit is None else max(limit, 1))
+    except FeedExpired:
+        # Deletes after `since` have been compacted away: start again from 0
+        return HttpResponseGone('Changes after this position have been compacted; read again from since=0.')
+
+
+@staff_member_required
+@require_POST
+def job_create(request):
+    """
+    Queue a background job (staff only).
+    
+    The body is JSON: {"kind": "export_students", "params": {"format": "xlsx"}}.
+    Answers 202 with the job's status; poll the Location URL for progress.
+    """
+    try:
+        body = json.loads(request.body)
+        job = jobs.enqueue(body['kind'], body.get('params') or {})
+    except (ValueError, KeyError, TypeError, AttributeError) as exc:
+        return JsonResponse({'error': f'Send {{"kind": ..., "params": {{...}}}} with a known kind ({exc}).'}, status=400)
+    response = JsonResponse(jobs.job_status(job), status=202)
+    response['Location'] = reverse('job_status', args=[job.pk])
+    return response
+
+
+@staff_member_required
+def job_status(request, pk):
+    """
+    A background job's status and progress as JSON (staff only).
+    """
+    return JsonResponse(jobs.job_status(get_object_or_404(Job, pk=pk)))
+
+
+@staff_member_required
+@require_POST
+def job_cancel(request, pk):
+    """
+    Cancel a background job (staff only); answers with its status.
+    """
+    job = get_object_or_404(Job, pk=pk)
+    if not jobs.cancel(job.pk):
+        return JsonResponse({'error': f'Job {job.pk} has already finished.'}, status=409)
+    job.refresh_from_db()
+    return JsonResponse(jobs.job_status(job))
+
+
+@staff_member_required
+def job_file(request, pk):
+    """
+    Download the file a finished job wrote, e.g. an export (staff only).
+    """
+    job = get_object_or_404(Job, pk=pk, status=Job.SUCCEEDED)
+    name = job.result.get('file') if isinstance(job.result, dict) else None
+    file_path = jobs.job_dir() / name if name else None
+    if file_path is None or not file_path.is_file():
+        raise Http404('This job has no file.')
+    return FileResponse(file_path.open('rb'), as_attachment=True, filename=file_path.name)
+
+
+@staff_member_required
+def cache_stats(request):
+    """
+    Show this worker process's page cache hit/miss counters as JSON.
+    """
+    return JsonResponse(response_cache.stats())
+
+
+def metrics_view(request):
+    """
+    Prometheus metrics of all worker processes (see metrics.py).
+    
+    Open to the addresses in INTERNAL_IPS (where the scraper runs) and to
+    logged-in staff.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS and not request.user.is_staff:
+        return HttpResponseForbidden('Metrics are only available to INTERNAL_IPS and staff.')
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@student_detail_condition
+@cache_student_detail
 def student_detail(request, pk):
     """
     Display detailed information about a single student.
@@ -94,11 +294,9 @@ def student_create(request):
         # Create form instance with POST data
         form = StudentForm(request.POST)
         
-        # Validate the form
-        if form.is_valid():
-            # Save the form (creates a new Student object in database)
-            student = form.save()
-            
+        # Validate the form, then save it (creates a new Student object in database)
+        student = save_student_form(form) if form.is_valid() else None
+        if student is not None:
             # Add success message to display to user
             messages.success(
                 request,
@@ -137,11 +335,9 @@ def student_update(request, pk):
         # instance=student pre-fills the form with current data
         form = StudentForm(request.POST, instance=student)
         
-        # Validate the form
-        if form.is_valid():
-            # Save the changes to database
-            student = form.save()
-            
+        # Validate the form, then save the changes to database
+        saved = save_student_form(form) if form.is_valid() else None
+        if saved is not None:
             # Add success message
             messages.success(
                 request,
@@ -180,8 +376,8 @@ def student_delete(request, pk):
         # Store student name before deletion
         student_name = f'{student.first_name} {student.last_name}'
         
-        # Delete the student from database
-        student.delete()
+        # Delete the student from database (through the writer queue)
+        run_write(student.delete)
         
         # Add success message
         messages.success(
@@ -0,0 +1,220 @@
+"""
+One writer thread per process for student creates, updates and deletes.
+
+SQLite allows one writer at a time. When several request threads save at
+once they queue up on the database lock, each waiting (busy_timeout) and
+each paying for its own commit. Instead, run_write() hands the save to a
+single writer thread, which:
+
+1. waits a few milliseconds (STUDENT_WRITE_QUEUE_INTERVAL) for more writes
+   to arrive,
+2. runs the whole batch in one transaction - each write in its own
+   savepoint, so one failing write (e.g. a duplicate email) is rolled back
+   on its own and the others still commit,
+3. commits once and hands every caller its own result or exception.
+
+Usage:
+    student = run_write(form.save)
+    run_write(student.delete)
+
+A write made inside a transaction (transaction.atomic(), the admin, the
+tests) runs directly in the calling thread instead: it must be part of the
+caller's transaction, and the writer thread could not see its rows.
+
+The queue is per process. Across several worker processes SQLite's lock
+and busy_timeout still decide who writes next, but each process then takes
+the lock once per batch instead of once per save.
+"""
+
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, close_old_connections, connections, transaction
+
+from .models import Student
+from .sqlite_profile import lock_for_write
+
+
+logger = logging.getLogger(__name__)
+
+# How long a caller waits for the writer to start its write before giving
+# up (seconds); see WriteQueue.run()
+RESULT_TIMEOUT = 30
+
+# Most writes committed together in one transaction
+MAX_BATCH = 200
+
+UNIQUE_FAILED = re.compile(r'UNIQUE constraint failed: \w+\.(\w+)')
+
+
+def queue_enabled():
+    return getattr(settings, 'STUDENT_WRITE_QUEUE', True)
+
+
+class WriteQueue:
+    """
+    A queue of write functions, run in batches by one background thread.
+    """
+
+    def __init__(self, interval=None, max_batch=MAX_BATCH, using=DEFAULT_DB_ALIAS):
+        # None reads STUDENT_WRITE_QUEUE_INTERVAL each batch
+        self.interval = interval
+        self.max_batch = max_batch
+        self.using = using
+        self.jobs = queue.SimpleQueue()
+        self.thread = None
+        self.pid = None
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, func):
+        """
+        Queue func and return a Future for its result.
+        """
+        self._ensure_thread()
+        future = Future()
+        self.jobs.put((func, future))
+        return future
+
+    def run(self, func):
+        """
+        Queue func, wait for its batch to commit, and return its result
+        (or raise its exception).
+
+        If the writer hasn't started func after RESULT_TIMEOUT seconds, func
+        is cancelled, so it never runs, and TimeoutError is raised. A write
+        that has started is waited for to the end: giving up on it could
+        report a failure for a write that then commits.
+        """
+        future = self.submit(func)
+        try:
+            return future.result(timeout=RESULT_TIMEOUT)
+        except TimeoutError:
+            if future.cancel():
+                raise
+        return future.result()
+
+    def stop(self):
+        """
+        Finish the queued writes and stop the writer thread.
+        """
+        with self.lock:
+            thread = self.thread
+            self.thread = None
+        if thread is not None and thread.is_alive():
+            self.jobs.put(None)
+            thread.join()
+
+    def _ensure_thread(self):
+        # A forked worker process doesn't inherit the parent's thread
+        with self.lock:
+            if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+                self.pid = os.getpid()
+                self.thread = threading.Thread(target=self._loop, name='student-writer', daemon=True)
+                self.thread.start()
+
+    def _loop(self):
+        try:
+            while True:
+                first = self.jobs.get()
+                if first is None:
+                    return
+                batch = [first]
+                stopping = self._collect(batch)
+                self._write(batch)
+                if stopping:
+                    return
+        finally:
+            connections[self.using].close()
+
+    def _collect(self, batch):
+        """
+        Add the writes that arrive within `interval` to the batch.
+        Returns True if stop() was called meanwhile.
+        """
+        interval = self.interval
+        if interval is None:
+            interval = getattr(settings, 'STUDENT_WRITE_QUEUE_INTERVAL', 0.005)
+        deadline = time.monotonic() + interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self.jobs.get(timeout=remaining) if remaining > 0 else self.jobs.get_nowait()
+            except queue.Empty:
+                return False
+            if job is None:
+                return True
+            batch.append(job)
+        return False
+
+    def _write(self, batch):
+        # Drop the connection if it broke or reached CONN_MAX_AGE
+        close_old_connections()
+        outcomes = []
+        try:
+            with transaction.atomic(using=self.using):
+                # A student write updates the FTS5 search index, which reads
+                # before it writes: without the lock taken first, a commit
+                # from another process in between fails the whole batch
+                lock_for_write(Student._meta.db_table, self.using)
+                for func, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((future, True, func()))
+                    except Exception as exc:
+                        outcomes.append((future, False, exc))
+        except Exception as exc:
+            # The commit itself failed: none of the batch was saved
+            logger.exception('Student write batch of %d failed', len(batch))
+            for _func, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.writes += len(outcomes)
+        for future, ok, value in outcomes:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+_queue = WriteQueue()
+
+
+def get_write_queue():
+    return _queue
+
+
+def run_write(func, using=DEFAULT_DB_ALIAS):
+    """
+    Run a write function through the writer thread and return its result.
+
+    Runs it directly when the queue is turned off (STUDENT_WRITE_QUEUE) or
+    the caller is already inside a transaction.
+    """
+    if not queue_enabled() or connections[using].in_atomic_block:
+        # A savepoint keeps the same "one write fails alone" behaviour
+        with transaction.atomic(using=using):
+            return func()
+    return _queue.run(func)
+
+
+def unique_field(exc):
+    """
+    Return the field name of a UNIQUE constraint error, or None.
+    """
+    if not isinstance(exc, IntegrityError):
+        return None
+    match = UNIQUE_FAILED.search(str(exc))
+    return match.group(1) if match else None
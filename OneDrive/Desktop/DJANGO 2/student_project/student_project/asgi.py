@@ -3,14 +3,24 @@ ASGI config for student_project project.
 
 ASGI (Asynchronous Server Gateway Interface) is used for async web servers.
 This is the entry point for ASGI servers like Uvicorn, Daphne, etc.
+
+    uvicorn student_project.asgi:application --workers 4
+
+Under ASGI the student list and detail pages are served by async views
+(see student_app/async_views.py): StudentASGIHandler routes every request
+with student_project/urls_asgi.py instead of ROOT_URLCONF.
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 # Set the Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_project.settings')
 
-# Get the ASGI application
-application = get_asgi_application()
+# Set up Django (what get_asgi_application() does), then create the application
+django.setup(set_prefix=False)
+
+from student_app.asgi import StudentASGIHandler  # noqa: E402 (needs Django set up)
+
+application = StudentASGIHandler()
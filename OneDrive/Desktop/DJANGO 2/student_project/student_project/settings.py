@@ -11,6 +11,7 @@ Key areas include:
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -50,11 +51,20 @@ INSTALLED_APPS = [
 
 # MIDDLEWARE is a list of hooks/processes that run on every request and response
 MIDDLEWARE = [
+    # Serves collected static files (hashed, precompressed) before anything
+    # else runs (see student_app/static_files.py)
+    'student_app.static_files.StaticFilesMiddleware',
+    # Measures SQL/template/view time; adds Server-Timing (see student_app/instrumentation.py)
+    'student_app.instrumentation.RequestTimingMiddleware',
+    # Request counts and latency per URL name for /metrics (see student_app/metrics.py)
+    'student_app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',  # Adds security headers
     'django.contrib.sessions.middleware.SessionMiddleware',  # Session handling
     'django.middleware.common.CommonMiddleware',  # Common utilities (CSRF protection, etc.)
     'django.middleware.csrf.CsrfViewMiddleware',  # Cross-Site Request Forgery protection
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # User authentication
+    # ?profile=1 for staff: cProfile + SQL plans (see student_app/profiling.py)
+    'student_app.profiling.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',  # Message framework
     'django.middleware.clickjacking.XFrameOptionsMiddleware',  # Clickjacking protection
 ]
@@ -70,10 +80,20 @@ TEMPLATES = [
         # DIR specifies additional directories to search for templates
         # BASE_DIR / 'templates' means a 'templates' folder in the project root
         'DIRS': [BASE_DIR / 'templates'],
-        # APP_DIRS = True makes Django search for templates inside each app's 'templates' folder
-        'APP_DIRS': True,
+        # Templates are found in DIRS and in each app's 'templates' folder
+        # (what APP_DIRS = True would do) by the loaders listed in OPTIONS
+        'APP_DIRS': False,
         # OPTIONS contains template processing options
         'OPTIONS': {
+            # Compiled templates are kept in memory; the project's own HTML
+            # templates lose their comments and indentation when first loaded
+            # (see student_app/template_loader.py)
+            'loaders': [
+                ('student_app.template_loader.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             # context_processors are functions that add variables to every template
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -99,9 +119,44 @@ DATABASES = {
         'ENGINE': 'django.db.backends.sqlite3',
         # This creates a 'db.sqlite3' file in the BASE_DIR
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep each worker's connection open for up to 10 minutes instead of
+        # reconnecting (and re-running SQLITE_PRAGMAS) on every request
+        'CONN_MAX_AGE': 600,
+        # Check a kept connection still works before reusing it
+        'CONN_HEALTH_CHECKS': True,
+        # Tests use a database file too, not SQLite's in-memory database:
+        # there, threads share one cache and a second writer fails at once
+        # with "database table is locked" instead of waiting its turn.
+        # The file is named after the test run's process, so two runs on one
+        # machine (two checkouts, CI jobs) don't delete each other's database;
+        # set STUDENT_TEST_DB to choose it (e.g. to reuse it with --keepdb).
+        # setdefault: processes the run starts inherit the same name
+        'TEST': {
+            'NAME': os.environ.setdefault(
+                'STUDENT_TEST_DB',
+                str(Path(tempfile.gettempdir()) / f'student_project_test_{os.getpid()}.sqlite3'),
+            ),
+        },
     }
 }
 
+# SQLITE_PRAGMAS are run on every new SQLite connection
+# (see student_app/sqlite_profile.py). Set to {} to use SQLite's defaults.
+SQLITE_PRAGMAS = {
+    # Write-ahead log: readers and the writer don't block each other
+    'journal_mode': 'WAL',
+    # Safe with WAL; commits don't wait for the disk every time
+    'synchronous': 'NORMAL',
+    # Wait up to 5 seconds for a lock instead of "database is locked"
+    'busy_timeout': 5000,
+    # Page cache per connection: negative means KiB, so about 20 MB
+    'cache_size': -20000,
+    # Read the database file through up to 128 MB of memory-mapped I/O
+    'mmap_size': 128 * 1024 * 1024,
+    # Keep temporary tables and sort data in memory
+    'temp_store': 'MEMORY',
+}
+
 
 # Password validation
 # PASSWORD_VALIDATORS check password strength when users create/change passwords
@@ -142,10 +197,28 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 # STATICFILES_DIRS tells Django where to find additional static files
+# static/css/site.css holds the site's own styles; static/vendor/ holds
+# Bootstrap and Font Awesome (python manage.py vendor_static downloads them)
 STATICFILES_DIRS = [
     BASE_DIR / 'static',
 ]
 
+# STORAGES sets where uploads and collected static files are stored.
+# collectstatic gives every static file a content-hashed name and writes
+# .gz/.br copies (see student_app/static_storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'student_app.static_storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT from the Django process (see student_app/static_files.py).
+# Set to False when a proxy or CDN in front serves the static files.
+STUDENT_SERVE_STATIC = True
+
 # Media files (User uploads)
 # MEDIA_URL is the URL prefix for user-uploaded files
 MEDIA_URL = '/media/'
@@ -156,3 +229,131 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Default primary key field type
 # This specifies the default field type for primary keys
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Student search
+# STUDENT_SEARCH_TRIGRAM keeps an in-memory trigram index of names and
+# emails so that fragments like "kum" or "@example" match mid-word.
+# It costs memory in every worker process, so it is off by default.
+STUDENT_SEARCH_TRIGRAM = False
+
+
+# Caching
+# CACHES configures where Django stores cached data.
+# LocMemCache keeps entries in each process's memory. To share the cached
+# student rows between worker processes, point 'fragments' at a file cache:
+#     'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#     'LOCATION': BASE_DIR / 'cache' / 'fragments',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered <tr> rows of the student list (see student_app/row_cache.py)
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'student-fragments',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+# Which CACHES alias holds the student list row fragments
+STUDENT_ROW_CACHE = 'fragments'
+
+# The student list fetches only the columns it shows and builds the rows
+# without the template engine (see student_app/lean_rows.py). Set to False to
+# render student_app/_student_row.html (through the fragment cache) instead,
+# e.g. while changing the row markup.
+STUDENT_LEAN_ROWS = True
+
+# List pages with at least this many rows are streamed to the browser
+STUDENT_LIST_STREAM_ROWS = 1000
+
+# Strip HTML comments and indentation from the project's templates as they
+# are loaded (see student_app/template_loader.py). Turn off to match the
+# line numbers in a template error to the file.
+STUDENT_MINIFY_TEMPLATES = True
+
+# Most records one JSON API request may create, update or delete
+# (see student_app/api.py); a batch is written in one transaction
+STUDENT_API_MAX_BATCH = 500
+
+# Delete entries of the student change feed are kept this many days by
+# `manage.py student_changes --compact` (see student_app/changelog.py);
+# a consumer that falls further behind must copy the table again
+STUDENT_CHANGES_RETENTION_DAYS = 30
+
+# Background jobs run by `manage.py run_jobs` (see student_app/jobs.py):
+# where their files (exports) are written, how often a failing job is
+# tried, and the seconds to wait before the first retry (doubled each time)
+STUDENT_JOB_DIR = BASE_DIR / 'jobs'
+STUDENT_JOB_MAX_ATTEMPTS = 3
+STUDENT_JOB_RETRY_DELAY = 30
+
+# The import_students job only reads files inside this directory (paths
+# are relative to it); anything else is refused, since jobs are queued
+# over HTTP
+STUDENT_IMPORT_DIR = BASE_DIR / 'imports'
+
+# Grade changes applied by the year-end rollover (`manage.py rollover` and
+# the admin action; see student_app/rollover.py), e.g. {'F': 'D', 'D': 'C'}.
+# Empty: the rollover only recomputes ages
+STUDENT_GRADE_TRANSITIONS = {}
+
+# Which CACHES alias holds whole student pages (see student_app/response_cache.py)
+# Writes from any process retire the pages; with several worker processes
+# a shared backend also lets them share the rebuilt pages
+STUDENT_RESPONSE_CACHE = 'default'
+
+# Student creates/updates/deletes are handed to one writer thread per
+# process, which commits them in batches (see student_app/write_queue.py)
+STUDENT_WRITE_QUEUE = True
+
+# Seconds the writer waits for more writes before committing a batch
+STUDENT_WRITE_QUEUE_INTERVAL = 0.005
+
+# Share of requests measured by RequestTimingMiddleware (0.0 - 1.0).
+# Measuring every request is fine in development; in production a small
+# sample (e.g. 0.05) keeps the overhead negligible.
+STUDENT_TIMING_SAMPLE_RATE = 1.0
+
+# Directory where each worker process writes its numbers for /metrics to
+# add up (see student_app/metrics.py). None keeps them in the process that
+# serves /metrics, which is enough for runserver. With several workers use a
+# directory they all share, and empty it when the server restarts, e.g.
+#     STUDENT_METRICS_DIR = BASE_DIR / 'metrics'
+STUDENT_METRICS_DIR = None
+
+# Addresses allowed to read /metrics without logging in (the Prometheus server)
+INTERNAL_IPS = ['127.0.0.1', '::1']
+
+# Where staff request profiles (?profile=1) are saved, and how many are kept
+STUDENT_PROFILE_DIR = BASE_DIR / 'profiles'
+STUDENT_PROFILE_KEEP = 50
+
+# LOGGING sends the per-request timing lines to the console while DEBUG is
+# on (the test runner turns DEBUG off, which keeps test output clean).
+# In production, add a handler that writes to your log collector.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'require_debug_true': {
+            '()': 'django.utils.log.RequireDebugTrue',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'filters': ['require_debug_true'],
+        },
+    },
+    'loggers': {
+        'student_app.requests': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,18 @@
+"""
+URL Configuration used when the project runs under ASGI.
+
+Identical to urls.py except that the student pages come from
+student_app/urls_async.py, which routes the read-only pages to async views.
+asgi.py sets this module as each request's urlconf.
+"""
+
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    # Django admin panel (synchronous views, as under WSGI)
+    path('admin/', admin.site.urls),
+    
+    # Student pages, with async list/detail views
+    path('', include('student_app.urls_async')),
+]